@@ -1,5 +1,17 @@
 // Arduino sketch to simulate 30 sensors and send real values for sensors 1 and 16
 
+// Set to 1 to stream compact binary frames (see flask-server/protocol.py)
+// instead of JSON lines. The server auto-detects either format.
+#define USE_BINARY_FRAMES 0
+
+#define NUM_SENSORS 30
+#define BINARY_VERSION 2
+
+// Baud negotiation (see flask-server/handshake.py)
+#define BASE_BAUD 9600
+#define BAUD_REVERT_MS 1500
+const long SUPPORTED_BAUDS[] = {115200, 230400, 500000, 1000000};
+
 int smoothedReading;
 int smoothingArrA[5] = {0, 0, 0, 0, 0}; // For sensor 1 (pin 11)
 int smoothingArrB[5] = {0, 0, 0, 0, 0}; // For sensor 16 (pin 7)
@@ -27,9 +39,127 @@ int smooth(int pressureReading, int line) {
   return sum / 5;         
 }
 
+uint16_t frameSeq = 0;
+
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), matches protocol.crc16()
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Send one binary frame: sync, version, seq, millis, 30 values, CRC (little-endian)
+void sendBinaryFrame(uint16_t seq, uint32_t timestamp, const uint8_t *values) {
+  uint8_t frame[2 + 7 + NUM_SENSORS + 2];
+  frame[0] = 0xAA;
+  frame[1] = 0x55;
+  frame[2] = BINARY_VERSION;
+  frame[3] = seq & 0xFF;
+  frame[4] = seq >> 8;
+  for (int i = 0; i < 4; i++) {
+    frame[5 + i] = (timestamp >> (8 * i)) & 0xFF;
+  }
+  memcpy(&frame[9], values, NUM_SENSORS);
+  uint16_t crc = crc16(&frame[2], 7 + NUM_SENSORS);
+  frame[9 + NUM_SENSORS] = crc & 0xFF;
+  frame[10 + NUM_SENSORS] = crc >> 8;
+  Serial.write(frame, sizeof(frame));
+}
+
+long pendingBaud = 0;          // Rate switched to but not yet committed
+unsigned long pendingSince = 0;
+char commandBuf[64];
+uint8_t commandLen = 0;
+
+// Reads a numeric field such as "rate":115200 from a command line
+long commandNumber(const char *command, const char *key) {
+  const char *p = strstr(command, key);
+  return p ? atol(p + strlen(key)) : 0;
+}
+
+bool isSupportedBaud(long rate) {
+  for (unsigned int i = 0; i < sizeof(SUPPORTED_BAUDS) / sizeof(SUPPORTED_BAUDS[0]); i++) {
+    if (SUPPORTED_BAUDS[i] == rate) {
+      return true;
+    }
+  }
+  return false;
+}
+
+void switchBaud(long rate) {
+  Serial.flush();
+  Serial.end();
+  Serial.begin(rate);
+}
+
+void handleCommand(const char *command) {
+  if (strstr(command, "\"cmd\":\"baud\"")) {
+    long rate = commandNumber(command, "\"rate\":");
+    if (!isSupportedBaud(rate)) {
+      Serial.print("{\"status\":\"baud_nak\",\"rate\":");
+      Serial.print(rate);
+      Serial.println("}");
+      return;
+    }
+    // Acknowledge at the old rate, then switch; revert unless committed
+    Serial.print("{\"status\":\"baud_ack\",\"rate\":");
+    Serial.print(rate);
+    Serial.println("}");
+    switchBaud(rate);
+    pendingBaud = rate;
+    pendingSince = millis();
+  }
+  else if (strstr(command, "\"cmd\":\"test\"")) {
+    // Known test pattern the server can verify byte for byte
+    long count = commandNumber(command, "\"count\":");
+    uint8_t values[NUM_SENSORS];
+    for (long seq = 0; seq < count; seq++) {
+      for (int i = 0; i < NUM_SENSORS; i++) {
+        values[i] = (seq * 7 + i) % 101;
+      }
+      sendBinaryFrame(seq, millis(), values);
+    }
+    Serial.println("{\"status\":\"test_done\"}");
+    pendingSince = millis();
+  }
+  else if (strstr(command, "\"cmd\":\"commit\"") && pendingBaud) {
+    Serial.print("{\"status\":\"baud_commit\",\"rate\":");
+    Serial.print(pendingBaud);
+    Serial.println("}");
+    pendingBaud = 0;
+  }
+}
+
+// Handle any complete command lines from the server
+void pollCommands() {
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == '\n') {
+      commandBuf[commandLen] = '\0';
+      handleCommand(commandBuf);
+      commandLen = 0;
+    }
+    else if (commandLen < sizeof(commandBuf) - 1) {
+      commandBuf[commandLen++] = c;
+    }
+  }
+
+  // No commit in time: the server could not read us, go back to the base rate
+  if (pendingBaud && millis() - pendingSince > BAUD_REVERT_MS) {
+    switchBaud(BASE_BAUD);
+    pendingBaud = 0;
+  }
+}
+
 void setup() {
   // Initialize serial communication at 9600 baud rate
-  Serial.begin(9600);
+  // (the server may negotiate a faster rate after the ready message)
+  Serial.begin(BASE_BAUD);
   
   // Wait for serial port to connect
   while (!Serial) {
@@ -43,37 +173,55 @@ void setup() {
 }
 
 void loop() {
+  pollCommands();
+
+  // Keep the line quiet while a new baud rate is being verified
+  if (pendingBaud) {
+    return;
+  }
+
   // Read and smooth the real sensor values (map from 0-1023 to 0-100)
   int sensor1Value = map(smooth(analogRead(11), 1), 0, 1023, 0, 100);
   int sensor16Value = map(smooth(analogRead(7), 0), 0, 1023, 0, 100);
   
-  // Start building JSON data string
-  String jsonData = "{";
-  
+  // Sequence number and timestamp let the server detect lost frames and jitter
+  uint16_t seq = frameSeq++;
+  unsigned long timestamp = millis();
+
   // Generate values for all 30 sensors (mix of real and random)
-  for (int i = 1; i <= 30; i++) {
-    jsonData += "\"sensor_" + String(i) + "\":";
-    
+  uint8_t values[NUM_SENSORS];
+  for (int i = 1; i <= NUM_SENSORS; i++) {
     // Use real values for sensors 1 and 16, random for others
     if (i == 1) {
-      jsonData += String(sensor1Value);
-    } 
+      values[i - 1] = sensor1Value;
+    }
     else if (i == 16) {
-      jsonData += String(sensor16Value);
-    } 
+      values[i - 1] = sensor16Value;
+    }
     else {
-      jsonData += String(random(101)); // Random value between 0-100
+      values[i - 1] = random(101); // Random value between 0-100
     }
+  }
+
+#if USE_BINARY_FRAMES
+  sendBinaryFrame(seq, timestamp, values);
+#else
+  // Start building JSON data string
+  String jsonData = "{";
+  
+  for (int i = 1; i <= NUM_SENSORS; i++) {
+    jsonData += "\"sensor_" + String(i) + "\":" + String(values[i - 1]);
     
     // Add comma for all but last element
-    if (i < 30) {
+    if (i < NUM_SENSORS) {
       jsonData += ",";
     }
   }
   
   // End JSON string
-  jsonData += "}";
+  jsonData += ",\"seq\":" + String(seq) + ",\"t\":" + String(timestamp) + "}";
   
   // Send JSON string over serial
   Serial.println(jsonData);
+#endif
 }
\ No newline at end of file
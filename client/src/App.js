@@ -1,5 +1,5 @@
 // src/App.js
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 import FootDiagram from './components/FootDiagram';
 import SensorButtons from './components/SensorButtons';
@@ -19,11 +19,29 @@ function App() {
   const [activeView, setActiveView] = useState('dashboard');
   const [availablePorts, setAvailablePorts] = useState([]);
   const [selectedPort, setSelectedPort] = useState('');
+  const [devices, setDevices] = useState([]);
+  const [activeDevice, setActiveDevice] = useState(null);
+  // Socket handlers are registered once, so they read the active device from a ref
+  const activeDeviceRef = useRef(null);
+
+  const selectDevice = (deviceId) => {
+    activeDeviceRef.current = deviceId;
+    setActiveDevice(deviceId);
+  };
+
+  // Events from other devices are ignored; the first device seen becomes active
+  const isActiveDevice = (deviceId) => {
+    if (!deviceId) return true;
+    if (!activeDeviceRef.current) {
+      selectDevice(deviceId);
+    }
+    return activeDeviceRef.current === deviceId;
+  };
 
   // Function to fetch available ports
-  const fetchPorts = async () => {
+  const fetchPorts = async (refresh = false) => {
     try {
-      const response = await fetch('http://localhost:5000/api/ports');
+      const response = await fetch(`http://localhost:5000/api/ports${refresh ? '?refresh=1' : ''}`);
       if (response.ok) {
         const ports = await response.json();
         setAvailablePorts(ports);
@@ -55,6 +73,9 @@ function App() {
       
       const result = await response.json();
       console.log(result);
+      if (result.device_id) {
+        selectDevice(result.device_id);
+      }
     } catch (error) {
       console.error('Error connecting:', error);
     } finally {
@@ -67,11 +88,16 @@ function App() {
     setIsLoading(true);
     try {
       const response = await fetch('http://localhost:5000/api/disconnect', {
-        method: 'POST'
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ device_id: activeDevice })
       });
       
       const result = await response.json();
       console.log(result);
+      selectDevice(null);
     } catch (error) {
       console.error('Error disconnecting:', error);
     } finally {
@@ -105,16 +131,31 @@ function App() {
     });
     
     socket.on('sensor_update', (data) => {
-      setSensorValues(data);
+      if (isActiveDevice(data.device_id)) {
+        setSensorValues(data.sensor_data);
+      }
     });
 
     socket.on('classification_update', (data) => {
-      setClassification(data || 'Unknown');
+      if (isActiveDevice(data && data.device_id)) {
+        setClassification((data && data.classification) || 'Unknown');
+      }
     });
     
     socket.on('arduino_status', (status) => {
       console.log('Received Arduino status:', status);
-      setArduinoStatus(status);
+      if (isActiveDevice(status.device_id)) {
+        setArduinoStatus(status);
+      }
+    });
+
+    socket.on('devices_update', (deviceList) => {
+      setDevices(deviceList);
+    });
+
+    // The server watches for plugged/unplugged ports and pushes the new list
+    socket.on('ports_changed', (data) => {
+      setAvailablePorts(data.ports);
     });
     
     // Initial HTTP request to get data and status 
@@ -126,6 +167,9 @@ function App() {
           setSensorValues(data.sensor_data);
           setArduinoStatus(data.arduino_status);
           setClassification(data.classification || 'Normal');
+          if (data.device_id && !activeDeviceRef.current) {
+            selectDevice(data.device_id);
+          }
         }
       } catch (error) {
         console.error('Error fetching initial data:', error);
@@ -161,6 +205,27 @@ function App() {
               Receiving Data...
             </span>
           )}
+
+          {devices.length > 1 && (
+            <select
+              className="device-select"
+              value={activeDevice || ''}
+              onChange={(e) => {
+                const device = devices.find(d => d.device_id === e.target.value);
+                selectDevice(e.target.value);
+                if (device) {
+                  setArduinoStatus(device.status);
+                  setClassification(device.classification);
+                }
+              }}
+            >
+              {devices.map((device) => (
+                <option key={device.device_id} value={device.device_id}>
+                  {device.device_id} ({device.port})
+                </option>
+              ))}
+            </select>
+          )}
         </div>
       </header>
       
@@ -186,7 +251,7 @@ function App() {
             ))}
           </select>
           <button 
-              onClick={fetchPorts} 
+              onClick={() => fetchPorts(true)} 
             disabled={isLoading || arduinoStatus.connected}
             className="button refresh"
               title="Refresh available ports"
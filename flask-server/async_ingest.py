@@ -0,0 +1,155 @@
+# async_ingest.py
+"""Single-threaded asyncio ingestion core for many serial ports.
+
+One event loop thread owns every serial port opened through the engine. Each
+port is opened non-blocking and its file descriptor registered with
+``loop.add_reader()``; when the OS reports data the callback drains the port
+through a SerialReader and hands every decoded frame to the shared pipeline
+(``on_frame``). Idle ports cost nothing, so one core handles dozens of socks
+instead of one sleeping OS thread per device.
+
+``add_reader()`` needs selectable file descriptors, which serial ports are on
+Linux and macOS but not on Windows; there the thread-per-device reader in
+server.py remains the ingestion path.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from handshake import negotiate_baud
+from serial_reader import SerialReader
+
+# add_reader() on serial fds only works with the selector loop on POSIX
+SUPPORTED = os.name == "posix"
+# Baud handshakes block for seconds; run plenty side by side so bringing a
+# rack of devices online doesn't queue them behind each other
+HANDSHAKE_WORKERS = 64
+
+
+class AsyncIngestEngine:
+    """Runs an asyncio loop in a background thread and multiplexes serial ports on it.
+
+    ``on_frame(session, kind, seq, payload, device_time, rx_time)`` is called
+    for every decoded frame and ``on_status(session, connected, message)``
+    whenever a port opens, fails or closes. Both run on the loop thread.
+    """
+
+    def __init__(self, on_frame, on_status):
+        self.on_frame = on_frame
+        self.on_status = on_status
+        self.loop = None
+        self.thread = None
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._opening = set()
+        self._handshakes = ThreadPoolExecutor(max_workers=HANDSHAKE_WORKERS, thread_name_prefix="handshake")
+
+    def start(self):
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run, daemon=True, name="async-ingest")
+            self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def port_count(self):
+        return len(self._sessions)
+
+    def is_attached(self, session):
+        """True while the session's port is open or being opened on the loop"""
+        return session in self._sessions or session in self._opening
+
+    def add_port(self, session, baud_rate=9600, negotiate=False):
+        """Open ``session.port`` on the loop; returns a concurrent Future of success.
+
+        With ``negotiate`` the baud handshake runs in the loop's executor
+        before the port is registered, so it never blocks other devices.
+        """
+        self.start()
+        session.engine = self
+        self._opening.add(session)
+        return asyncio.run_coroutine_threadsafe(self._open(session, baud_rate, negotiate), self.loop)
+
+    def remove_port(self, session, message="Arduino disconnected", timeout=1.0):
+        """Unregister and close a session's port, waiting for the loop to do it"""
+        if self.loop is None or session not in self._sessions:
+            return
+        if threading.current_thread() is self.thread:
+            self._close(session, message)
+            return
+        future = asyncio.run_coroutine_threadsafe(self._remove(session, message), self.loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            print(f"Error removing {session.device_id} from async ingest: {e}")
+
+    async def _open(self, session, baud_rate, negotiate):
+        try:
+            return await self._open_port(session, baud_rate, negotiate)
+        finally:
+            self._opening.discard(session)
+
+    async def _open_port(self, session, baud_rate, negotiate):
+        try:
+            # timeout=0 makes reads non-blocking; the loop tells us when data is ready
+            ser = serial.Serial(session.port, baud_rate, timeout=0)
+            session.ser = ser
+            if negotiate:
+                session.negotiation = await self.loop.run_in_executor(self._handshakes, negotiate_baud, ser)
+        except Exception as e:
+            if session.stopping:
+                return False
+            print(f"Failed to connect to Arduino on {session.port}: {e}")
+            if session.ser is not None and session.ser.is_open:
+                session.ser.close()
+            self.on_status(session, False, f"Arduino connection failed: {str(e)}")
+            return False
+        if session.stopping:
+            ser.close()
+            return False
+        session.baud_rate = ser.baudrate
+        reader = SerialReader(ser)
+        session.decoder = reader.decoder
+        self.loop.add_reader(ser.fileno(), self._on_readable, session, reader)
+        self._sessions.add(session)
+        print(f"Connected to Arduino on {session.port} at {ser.baudrate} baud (device {session.device_id}, async)")
+        self.on_status(session, True, f"Connected to Arduino on {session.port} at {ser.baudrate} baud")
+        return True
+
+    async def _remove(self, session, message):
+        self._close(session, message)
+
+    def _on_readable(self, session, reader):
+        try:
+            frames = reader.read()
+        except Exception as e:
+            # Unplugged devices report readable with no data, which pyserial raises on
+            print(f"Error reading from serial port {session.port}: {e}")
+            self._close(session, "Arduino disconnected")
+            return
+        for kind, seq, payload, device_time, rx_time in frames:
+            try:
+                self.on_frame(session, kind, seq, payload, device_time, rx_time)
+            except Exception as e:
+                print(f"Error handling frame from {session.device_id}: {e}")
+
+    def _close(self, session, message):
+        if session not in self._sessions:
+            return
+        self._sessions.discard(session)
+        ser = session.ser
+        if ser is not None:
+            try:
+                self.loop.remove_reader(ser.fileno())
+            except Exception:
+                pass
+            if ser.is_open:
+                ser.close()
+        self.on_status(session, False, message)
@@ -0,0 +1,182 @@
+# bench_classify.py
+"""Frames per second through classification: min/max rules vs region masks.
+
+Compares classify_sensor_state as it was (min()/max() over slices of the
+frame for each class) with the mask version in classify.py, frame by frame
+and with classify_batch over the whole set. Frames mix the four postures,
+values right at the thresholds (4-6, 89-91) and random noise, first all
+different and then held for 100 frames each, as a foot at rest would be.
+Every classifier must agree with the old rules on every frame.
+
+The held frames are then classified with 16 more posture classes. Rules
+are compiled to masks and states are cached, so the rate should not drop;
+only a region with thresholds of its own adds a translate per frame.
+
+Then a minute of 100 Hz postures with sensor noise around the thresholds
+goes through StableClassifier. It reports how often the label flickers
+without it and how many classification_update messages are left, against
+one per frame before.
+
+Run from flask-server/:  python benchmarks/bench_classify.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from classify import (  # noqa: E402
+    DEFAULT_CONFIG, MAX_THRESHOLD, MIN_THRESHOLD, RULES, StableClassifier, classify, classify_batch, compile_rules
+)
+from frame import NUM_SENSORS  # noqa: E402
+from server import SIMULATION_PATTERNS  # noqa: E402
+
+FRAMES = 20000
+REPEAT = 5
+
+
+def minmax_classify(values):
+    """classify_sensor_state before classify.py, for comparison"""
+    if min(values) >= MAX_THRESHOLD:
+        return "Foot On Ground"
+    if max(values) <= MIN_THRESHOLD:
+        return "Foot In Air"
+    heel_max = min(values[15:18]) >= MAX_THRESHOLD
+    heel_rest_zero = max(values[:15]) <= MIN_THRESHOLD and max(values[18:]) <= MIN_THRESHOLD
+    if heel_max and heel_rest_zero:
+        return "Heel Touch"
+    toe_max = min(values[20:30]) >= MAX_THRESHOLD
+    toe_rest_zero = max(values[:20]) <= MIN_THRESHOLD
+    if toe_max and toe_rest_zero:
+        return "Toe Touch"
+    return "Unclassified"
+
+
+def make_frames(count, seed=1):
+    rng = random.Random(seed)
+    patterns = list(SIMULATION_PATTERNS.values())
+    frames = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            # A posture with noise that may push a sensor across a threshold
+            base = rng.choice(patterns)
+            values = [
+                min(100, max(0, v + rng.choice((-11, -10, -9, 0, 0, 0, 4, 5, 6)))) if rng.random() < 0.05 else v
+                for v in base
+            ]
+            values = [rng.choice((89, 90, 91, 100)) if v == 100 else rng.choice((0, 4, 5, 6)) if v == 0 else v
+                      for v in values] if rng.random() < 0.5 else values
+        else:
+            values = [rng.randint(0, 100) for _ in range(NUM_SENSORS)]
+        frames.append(bytes(values))
+    return frames
+
+
+def held(frames, run=100, seed=2):
+    """Frames held for ``run`` frames each, like a foot resting in one posture"""
+    rng = random.Random(seed)
+    return [values for values in rng.sample(frames, len(frames) // run) for _ in range(run)]
+
+
+def bench(name, frames):
+    block = b"".join(frames)
+    expected = [minmax_classify(values) for values in frames]
+    assert [classify(values) for values in frames] == expected
+    assert classify_batch(block) == expected
+    assert classify_batch(frames) == expected
+    labels = {label: expected.count(label) for label in set(expected)}
+    print(f"{name}: {len(frames)} frames, {labels}")
+
+    runs = {
+        "min/max rules": lambda: [minmax_classify(values) for values in frames],
+        "region masks": lambda: [classify(values) for values in frames],
+        "classify_batch": lambda: classify_batch(block),
+    }
+    baseline = None
+    for label, run in runs.items():
+        seconds = min(timeit.repeat(run, number=1, repeat=REPEAT))
+        baseline = baseline or seconds
+        print(f"  {label:<16} {len(frames) / seconds:>12,.0f} frames/s  {baseline / seconds:5.1f}x")
+
+
+def extended_config(band_thresholds):
+    """The default rules plus 16 classes over 8 bands of sensors"""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    for n in range(1, 9):
+        region = {"sensors": f"{n * 3 - 2}-{n * 3}"}
+        config["regions"][f"band{n}"] = dict(region, **band_thresholds)
+        config["classes"].append({"label": f"Band {n}", "priority": 5, "when": {"only": f"band{n}"}})
+        config["classes"].append({
+            "label": f"Band {n} partial",
+            "priority": 1,
+            "when": {"all": [{"any_active": f"band{n}"}, {"not": {"any_active": "heel"}}, {"inactive": "toe"}]}
+        })
+    return config
+
+
+def many_classes(frames):
+    block = b"".join(frames)
+    runs = (
+        ("4 classes", RULES),
+        ("20 classes", compile_rules(extended_config({}))),
+        # Each distinct threshold pair costs one more translate per frame
+        ("20, 2 thresholds", compile_rules(extended_config({"active": 75}))),
+    )
+    print("more classes, same frames (held postures):")
+    for label, rules in runs:
+        classify_batch(block, rules)  # Warm the state cache, as a running device would
+        seconds = min(timeit.repeat(lambda: [classify(values, rules) for values in frames], number=1, repeat=REPEAT))
+        print(f"  {label:<16} {len(frames) / seconds:>12,.0f} frames/s")
+
+
+def noisy_walk(seconds=60, rate=100.0, spikes=0.01, hold=3.0, seed=3):
+    """``(timestamp, values)`` of postures held ``hold`` seconds each, every
+    sensor jittering by +/-2 and spiking by up to +/-8 on a ``spikes``
+    fraction of frames"""
+    rng = random.Random(seed)
+    patterns = list(SIMULATION_PATTERNS.values())
+    frames = []
+    base = None
+    for n in range(int(seconds * rate)):
+        if n % int(hold * rate) == 0:
+            # Levels a few units inside the thresholds, where spikes cross them
+            base = [94 if v else 2 for v in rng.choice(patterns)]
+        values = bytes(
+            max(0, min(100, v + rng.randint(-2, 2) + (rng.randint(-8, 8) if rng.random() < spikes else 0)))
+            for v in base
+        )
+        frames.append((n / rate, values))
+    return frames
+
+
+def events():
+    frames = noisy_walk()
+    labels = [classify(values) for _, values in frames]
+    flips = sum(1 for a, b in zip(labels, labels[1:]) if a != b)
+    print(f"noisy postures: {len(frames)} frames at 100 Hz, {flips} label changes without state")
+    no_hysteresis = compile_rules(dict(DEFAULT_CONFIG, thresholds={"hysteresis": 0}))
+    for name, options in (("no hysteresis, min_dwell=0", {"rules": no_hysteresis, "min_dwell": 0}),
+                          ("hysteresis, min_dwell=0", {"rules": RULES, "min_dwell": 0}),
+                          ("defaults", {"rules": RULES})):
+        classifier = StableClassifier(**options)
+        sent = 0
+        for timestamp, values in frames:
+            _, event = classifier.update(values, timestamp)
+            sent += event is not None
+        print(f"  {name:<42} {classifier.transitions:5} transitions {sent:6} messages"
+              f" ({len(frames) / sent:.0f}x fewer)")
+
+
+def main():
+    frames = make_frames(FRAMES)
+    bench("every frame different", frames)
+    bench("postures held for 1 s", held(frames))
+    many_classes(held(frames))
+    events()
+
+
+if __name__ == "__main__":
+    main()
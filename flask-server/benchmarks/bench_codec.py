@@ -0,0 +1,119 @@
+# bench_codec.py
+"""Size and speed of delta-coded frames against raw records and JSON.
+
+Encodes frame streams with codec.py and reports bytes per frame next to a
+raw segment record (42 bytes) and a sensor_update JSON message, plus
+encode/decode frames per second. Every stream is decoded again and checked
+against the input. Streams are simulated like virtual_arduino.py does
+("random" wander and the "sequence" patterns, with and without noise), and
+``--recording`` adds the frames of a recording directory.
+
+Run from flask-server/:
+    python benchmarks/bench_codec.py --frames 20000 --recording recordings/COM3/20250101-120000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from codec import KEYFRAME_INTERVAL, DeltaDecoder, DeltaEncoder  # noqa: E402
+from frame import NUM_SENSORS, SENSOR_NAMES  # noqa: E402
+from recorder import NO_SEQ, RECORD_SIZE, open_segment, select_segments  # noqa: E402
+from virtual_arduino import PATTERNS  # noqa: E402
+
+RATE = 100.0  # Simulated frames per second
+
+
+def simulated(count, profile, noise, seed=1):
+    """``(timestamp, seq, values)`` frames like a VirtualArduino would send"""
+    rng = random.Random(seed)
+    values = [rng.randint(0, 100) for _ in range(NUM_SENSORS)]
+    names = list(PATTERNS)
+    frames = []
+    for seq in range(count):
+        if profile == "sequence":
+            base = PATTERNS[names[int(seq / RATE // 10) % len(names)]]
+            targets = [base(i) for i in range(1, NUM_SENSORS + 1)]
+        else:
+            targets = [v + rng.randint(-10, 10) for v in values]
+        values = [max(0, min(100, t + (rng.randint(-noise, noise) if noise else 0))) for t in targets]
+        # Serial arrival jitter of a millisecond or so
+        timestamp = 1700000000.0 + seq / RATE + rng.random() * 0.002
+        frames.append((timestamp, seq, bytes(values)))
+    return frames
+
+
+def recorded(path, count):
+    frames = []
+    for segment_path in select_segments(path):
+        with open_segment(segment_path) as reader:
+            for timestamp, seq, values in reader.unpack(0, count - len(frames)):
+                frames.append((timestamp, None if seq == NO_SEQ else seq, values))
+        if len(frames) >= count:
+            break
+    return frames
+
+
+def json_size(frames):
+    sizes = [
+        len(json.dumps({
+            "device_id": "COM3",
+            "sensor_data": dict(zip(SENSOR_NAMES, values)),
+            "timestamp": timestamp
+        }))
+        for timestamp, _, values in frames[:1000]
+    ]
+    return sum(sizes) / len(sizes)
+
+
+def run(name, frames):
+    encoder = DeltaEncoder(KEYFRAME_INTERVAL)
+    started = time.perf_counter()
+    encoded = [encoder.encode(timestamp, seq, values) for timestamp, seq, values in frames]
+    encode_time = time.perf_counter() - started
+
+    stream = b"".join(encoded)
+    decoder = DeltaDecoder()
+    decoded = []
+    pos = 0
+    started = time.perf_counter()
+    while pos < len(stream):
+        timestamp, seq, values, pos = decoder.decode(stream, pos)
+        decoded.append((timestamp, seq, values))
+    decode_time = time.perf_counter() - started
+
+    for (t1, s1, v1), (t2, s2, v2) in zip(frames, decoded):
+        if abs(t1 - t2) > 1e-6 or s1 != s2 or bytes(v1) != v2:
+            raise AssertionError(f"{name}: frame differs after decoding")
+    if len(decoded) != len(frames):
+        raise AssertionError(f"{name}: decoded {len(decoded)} of {len(frames)} frames")
+
+    per_frame = len(stream) / len(frames)
+    print(f"{name:<24} {per_frame:8.1f} {RECORD_SIZE / per_frame:9.1f}x {json_size(frames):8.0f}"
+          f" {len(frames) / encode_time:12,.0f} {len(frames) / decode_time:12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--recording", action="append", default=[], help="recording directory to include")
+    args = parser.parse_args()
+
+    print(f"keyframe every {KEYFRAME_INTERVAL} frames; raw record {RECORD_SIZE} bytes")
+    print(f"{'stream':<24} {'B/frame':>8} {'vs raw':>10} {'JSON B':>8} {'encode fps':>12} {'decode fps':>12}")
+    for profile, noise in (("sequence", 0), ("sequence", 2), ("sequence", 5), ("random", 5)):
+        run(f"{profile}, noise {noise}", simulated(args.frames, profile, noise))
+    for path in args.recording:
+        frames = recorded(path, args.frames)
+        if frames:
+            run(os.path.basename(os.path.normpath(path)), frames)
+        else:
+            print(f"{path}: no recorded frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_frame.py
+"""Frames per second through parse -> classify -> serialize.
+
+Compares the original per-frame path (json.loads, copy into the sensor_N
+dict, classify by building sensor_N keys, json.dumps of the dict) with the
+Frame path (fast-path parse into the Frame's buffer, classify on the buffer,
+to_dict() only for the outgoing message).
+
+Run from flask-server/:  python benchmarks/bench_frame.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from frame import NUM_SENSORS, Frame, empty_sensor_data  # noqa: E402
+from protocol import encode_json_frame, parse_sensor_line  # noqa: E402
+from server import classify_sensor_state  # noqa: E402
+
+FRAMES = 2000
+REPEAT = 5
+
+
+def legacy_classify(values):
+    """classify_sensor_state as it was before Frame, for comparison"""
+    all_values = [values.get(f"sensor_{i}", 0) for i in range(1, 31)]
+    if all(v >= 90 for v in all_values):
+        return "Foot On Ground"
+    if all(v <= 5 for v in all_values):
+        return "Foot In Air"
+    heel_max = all(values.get(f"sensor_{i}", 0) >= 90 for i in range(16, 19))
+    heel_rest_zero = all(values.get(f"sensor_{i}", 0) <= 5 for i in list(range(1, 16)) + list(range(19, 31)))
+    if heel_max and heel_rest_zero:
+        return "Heel Touch"
+    toe_max = all(values.get(f"sensor_{i}", 0) >= 90 for i in range(21, 31))
+    toe_rest_zero = all(values.get(f"sensor_{i}", 0) <= 5 for i in range(1, 21))
+    if toe_max and toe_rest_zero:
+        return "Toe Touch"
+    return "Unclassified"
+
+
+def make_lines(count):
+    random.seed(1)
+    patterns = [
+        lambda: [random.randint(0, 100) for _ in range(NUM_SENSORS)],
+        lambda: [random.randint(0, 5) for _ in range(NUM_SENSORS)],
+        lambda: [random.randint(95, 100) if 16 <= i <= 18 else 0 for i in range(1, NUM_SENSORS + 1)],
+    ]
+    return [encode_json_frame(patterns[n % len(patterns)]()).strip() for n in range(count)]
+
+
+def bench(label, func, count):
+    best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    print(f"{label:<34} {best / count * 1e6:7.2f} us/frame  {count / best:10.0f} frames/s")
+    return best
+
+
+def main():
+    lines = make_lines(FRAMES)
+
+    sensor_data = empty_sensor_data()
+
+    def legacy():
+        for line in lines:
+            obj = json.loads(line)
+            for key, value in obj.items():
+                if key in sensor_data:
+                    sensor_data[key] = value
+            classification = legacy_classify(sensor_data)
+            json.dumps({"sensor_data": sensor_data, "classification": classification})
+
+    frame = Frame()
+
+    def framed():
+        values = frame.values
+        for line in lines:
+            parse_sensor_line(line, values)
+            classification = classify_sensor_state(values)
+            json.dumps({"sensor_data": frame.to_dict(), "classification": classification})
+
+    # Same answers on every frame before timing anything
+    for line in lines:
+        parse_sensor_line(line, frame.values)
+        assert classify_sensor_state(frame.values) == legacy_classify(json.loads(line))
+
+    before = bench("dict pipeline (before)", legacy, FRAMES)
+    after = bench("Frame pipeline (after)", framed, FRAMES)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# bench_gait.py
+"""Gait metrics from simulated walking against the known gait, and frames/s.
+
+Two socks walk at a set cadence and stance share of the stride. The left
+and right feet are half a stride apart, so each foot's stance overlaps the
+other's for (stance share - 50%) of the stride twice per stride. Each
+stance loads the heel first, then the whole foot, then the toe. The load
+ramps in and out over a few frames and every sensor has +/-3 noise plus
+occasional spikes. Frames arrive at 100 Hz with a millisecond of jitter.
+GaitTracker's cadence, stance, swing and double support times are printed
+next to the true values; stance reads a frame or two long, since the load
+ramps off below the contact threshold after the simulated toe off.
+
+Then the update rate per frame goes through for a standing foot, a walking
+foot and random frames.
+
+Run from flask-server/:  python benchmarks/bench_gait.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from frame import NUM_SENSORS  # noqa: E402
+from gait import HEEL_SENSORS, TOE_SENSORS, GaitGroup, GaitTracker  # noqa: E402
+
+RATE = 100.0
+RAMP = 0.03  # Seconds for the load to come on or off
+REPEAT = 5
+
+
+def foot_values(phase, stance, rng, spikes=0.01):
+    """Sensor values at ``phase`` (0-1) of a stride that starts with stance"""
+    heel = mid = toe = 0.0
+    if phase < stance:
+        t = phase / stance  # Through the stance phase
+        heel = 90.0 if t < 0.6 else 0.0
+        mid = 70.0 if 0.15 < t < 0.8 else 0.0
+        toe = 90.0 if t > 0.3 else 0.0
+    values = []
+    for sensor in range(1, NUM_SENSORS + 1):
+        level = heel if sensor in HEEL_SENSORS else toe if sensor in TOE_SENSORS else mid
+        level += rng.randint(-3, 3)
+        if rng.random() < spikes:
+            level += rng.randint(-15, 15)
+        values.append(max(0, min(100, int(level))))
+    return values
+
+
+def ramp(values, previous, weight):
+    return bytes(int(p + (v - p) * weight) for v, p in zip(values, previous))
+
+
+def walk(seconds, cadence, stance, seed=1):
+    """``[(timestamp, left, right)]`` for ``cadence`` steps/min with stance
+    taking a ``stance`` share of each stride"""
+    rng = random.Random(seed)
+    stride = 120.0 / cadence
+    weight = min(1.0, 1.0 / (RAMP * RATE))
+    left = right = bytes(NUM_SENSORS)
+    frames = []
+    for n in range(int(seconds * RATE)):
+        t = n / RATE
+        left = ramp(foot_values((t / stride) % 1.0, stance, rng), left, weight)
+        right = ramp(foot_values((t / stride + 0.5) % 1.0, stance, rng), right, weight)
+        frames.append((1700000000.0 + t + rng.random() * 0.001, left, right))
+    return frames
+
+
+def accuracy(cadence, stance_share):
+    frames = walk(60, cadence, stance_share)
+    group = GaitGroup("bench")
+    left = GaitTracker("left", group)
+    right = GaitTracker("right", group)
+    events = 0
+    for timestamp, left_values, right_values in frames:
+        events += left.update(left_values, timestamp) is not None
+        events += right.update(right_values, timestamp) is not None
+
+    stride = 120.0 / cadence
+    truth = {
+        "cadence": cadence,
+        "stance_time": stride * stance_share,
+        "swing_time": stride * (1 - stance_share),
+        "double_support_time": stride * (stance_share - 0.5),
+    }
+    measured = left.summary()
+    steps = left.steps + right.steps
+    print(f"{cadence} steps/min, stance {stance_share:.0%}: {steps} steps"
+          f" (expected ~{int(cadence)}), {events} events from {len(frames)} frames per foot")
+    for key, expected in truth.items():
+        print(f"  {key:<20} {measured[key]:>8} expected {expected:8.3f}")
+
+
+def rates():
+    frames = walk(20, 110, 0.62)
+    rng = random.Random(2)
+    runs = {
+        "standing": [bytes([90] * NUM_SENSORS)] * len(frames),
+        "walking": [values for _, values, _ in frames],
+        "random": [bytes(rng.randint(0, 100) for _ in range(NUM_SENSORS)) for _ in frames],
+    }
+    times = [timestamp for timestamp, _, _ in frames]
+    print("GaitTracker.update:")
+    for name, values in runs.items():
+        def run():
+            tracker = GaitTracker("bench", GaitGroup("bench"))
+            for timestamp, frame in zip(times, values):
+                tracker.update(frame, timestamp)
+        seconds = min(timeit.repeat(run, number=1, repeat=REPEAT))
+        print(f"  {name:<10} {len(values) / seconds:>12,.0f} frames/s")
+
+
+def main():
+    for cadence, stance in ((90, 0.65), (110, 0.62), (140, 0.58)):
+        accuracy(cadence, stance)
+    rates()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench_ingest.py
+"""End-to-end ingestion throughput and latency with virtual socks.
+
+Starts ``--devices`` virtual Arduinos on ptys, connects each through the
+regular /api/connect route and lets them stream for ``--seconds``. Reports
+frames delivered to the publish pipeline per second, frames lost (as seen
+by the per-device sequence trackers), and the send-to-handler latency
+matched by sequence number.
+
+Run from flask-server/:
+    python benchmarks/bench_ingest.py --devices 20 --rate 100 --format binary
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import server  # noqa: E402
+from virtual_arduino import VirtualArduino  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=100.0, help="frames per second per device")
+    parser.add_argument("--format", choices=["json", "binary"], default="binary")
+    parser.add_argument("--ingest", choices=["async", "thread"], default=server.INGEST_MODE)
+    parser.add_argument("--negotiate", action="store_true", help="run baud negotiation on connect")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    virtual = {}
+    latencies = []
+    received = {}
+
+    # Time every frame as it reaches the shared pipeline
+    handle = server.handle_serial_frame
+
+    def timed_handle(session, kind, seq, payload, device_time, rx_time):
+        now = time.time()
+        device = virtual.get(session.device_id)
+        received[session.device_id] = received.get(session.device_id, 0) + 1
+        if device is not None and seq is not None and seq in device.sent_at:
+            latencies.append(now - device.sent_at[seq])
+        handle(session, kind, seq, payload, device_time, rx_time)
+
+    server.handle_serial_frame = timed_handle
+    server.ingest_engine.on_frame = timed_handle
+
+    client = server.app.test_client()
+    for n in range(args.devices):
+        device = VirtualArduino(rate=args.rate, fmt=args.format, noise=3, seed=n)
+        port = device.start()
+        device_id = f"virtual-{n}"
+        virtual[device_id] = device
+        response = client.post("/api/connect", json={
+            "port": port, "device_id": device_id,
+            "ingest": args.ingest, "negotiate": args.negotiate
+        })
+        if not response.get_json().get("success"):
+            print(f"Connect to {port} failed: {response.get_json()}")
+
+    # Let every connection come up before measuring
+    deadline = time.time() + (15 if args.negotiate else 5)
+    while time.time() < deadline:
+        if all(s.status.get("connected") and s.first_frame for s in server.devices.sessions()):
+            break
+        time.sleep(0.1)
+
+    sent_before = {k: d.frames_sent for k, d in virtual.items()}
+    received_before = dict(received)
+    latencies.clear()
+    time.sleep(args.seconds)
+    sent = sum(d.frames_sent - sent_before[k] for k, d in virtual.items())
+    got = sum(received.get(k, 0) - received_before.get(k, 0) for k in virtual)
+    links = [s.link.summary() for s in server.devices.sessions() if s.device_id in virtual]
+
+    for device_id in virtual:
+        server.stop_device(device_id)
+    for device in virtual.values():
+        device.stop()
+
+    print(f"{args.devices} devices x {args.rate:g} Hz, {args.format}, {args.ingest} ingest, {args.seconds:g}s")
+    print(f"  sent       {sent / args.seconds:10.0f} frames/s")
+    print(f"  received   {got / args.seconds:10.0f} frames/s  (lost {max(0, sent - got)})")
+    print(f"  link       lost {sum(l['lost'] for l in links)}"
+          f"  duplicates {sum(l['duplicates'] for l in links)}"
+          f"  reordered {sum(l['reordered'] for l in links)}"
+          f"  max jitter {max((l['jitter_ms'] for l in links), default=0):.2f} ms")
+    if latencies:
+        print(f"  latency    p50 {percentile(latencies, 0.5) * 1e3:.2f} ms"
+              f"  p99 {percentile(latencies, 0.99) * 1e3:.2f} ms"
+              f"  max {max(latencies) * 1e3:.2f} ms")
+    else:
+        print("  latency    n/a (no frames matched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_parse.py
+"""Per-line cost of decoding firmware sensor lines.
+
+Compares the original path (json.loads, then copy every key into the
+sensor_N dict) with the schema-specialised parser writing into a
+preallocated buffer, and the full FrameDecoder on a stream of lines.
+
+Run from flask-server/:  python benchmarks/bench_parse.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from protocol import NUM_SENSORS, FrameDecoder, encode_json_frame, parse_sensor_line  # noqa: E402
+
+LINES = 2000
+REPEAT = 5
+
+
+def make_lines(count):
+    random.seed(1)
+    return [
+        encode_json_frame([random.randint(0, 100) for _ in range(NUM_SENSORS)]).strip()
+        for _ in range(count)
+    ]
+
+
+def bench(label, func, count):
+    best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+    per_line = best / count * 1e6
+    print(f"{label:<38} {per_line:7.2f} us/line  {count / best:10.0f} lines/s")
+    return per_line
+
+
+def main():
+    lines = make_lines(LINES)
+    sensor_data = {f"sensor_{i}": 0 for i in range(1, NUM_SENSORS + 1)}
+    values = bytearray(NUM_SENSORS)
+
+    def baseline():
+        for line in lines:
+            arduino_data = json.loads(line)
+            for key, value in arduino_data.items():
+                if key in sensor_data:
+                    sensor_data[key] = value
+
+    def fast():
+        for line in lines:
+            parse_sensor_line(line, values)
+
+    stream = b"\r\n".join(lines) + b"\r\n"
+
+    def decoder():
+        FrameDecoder().feed(stream)
+
+    before = bench("json.loads + dict copy (before)", baseline, LINES)
+    after = bench("parse_sensor_line (after)", fast, LINES)
+    bench("FrameDecoder.feed, whole stream", decoder, LINES)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+# classify.py
+"""Foot contact classification with rules compiled to sensor masks.
+
+Each value is first reduced to a 2-bit state: bit 0 set when the sensor is
+active (>= its active threshold), bit 1 when it is inactive (<= its
+inactive threshold). A frame's states are computed with one
+``bytes.translate`` per threshold group and read as one integer with
+``int.from_bytes``. Sensor ``n`` (1-based) of group ``g`` sits in the byte
+at bit ``8 * (g * NUM_SENSORS + n - 1)``. The integer holds the "active"
+and "inactive" bitsets of every group, built without a Python-level loop.
+With the default rules there is a single group.
+
+Rules are declared as data (see DEFAULT_CONFIG and
+classification_rules.json, loaded by rules.py):
+
+- ``thresholds``: default ``active``/``inactive`` thresholds and
+  ``hysteresis`` band.
+- ``regions``: named sensor sets such as ``"16-18"``, ``[1, 2, 5]`` or
+  ``{"sensors": "21-30", "active": 80}``, optionally with their own
+  thresholds.
+- ``classes``: ``{"label", "priority", "when"}``; higher priority is tried
+  first.
+
+A ``when`` condition is one of ``{"active": R}`` / ``{"inactive": R}``
+(every sensor of R), ``{"any_active": R}`` / ``{"any_inactive": R}``,
+``{"only": R}`` (R active, every other sensor inactive), ``{"all": [...]}``,
+``{"any": [...]}`` or ``{"not": ...}``. R is a region name or a list of
+them, and an object with several keys needs all of them.
+
+compile_rules() turns each condition into a disjunction of ``(mask,
+value)`` terms, so a frame matches a class when ``state & mask == value``
+for one of its terms. The label of every distinct state is cached. Frames
+at rest repeat a handful of states, so adding a class costs nothing per
+frame once its states are cached.
+
+classify() labels one frame on its own. A live device uses a
+StableClassifier instead, which keeps state across frames so that noise
+near the thresholds does not make the label flicker:
+
+- hysteresis: a sensor stays active until it drops below ``active -
+  hysteresis``, and inactive until it rises above ``inactive +
+  hysteresis``. Entering either state still takes the plain threshold.
+  Each frame is translated with a second, widened set of tables and
+  combined with the previous state in one bitwise expression.
+- dwell: a new label only replaces the current one after it has held for
+  ``min_dwell`` seconds.
+- events: ``update()`` reports which frames are worth sending to clients.
+  Those are label transitions, plus a heartbeat every ``heartbeat``
+  seconds that repeats the current label.
+"""
+import os
+
+from frame import NUM_SENSORS
+
+MAX_THRESHOLD = 90  # At or above: "maximum pressure", the sensor is active
+MIN_THRESHOLD = 5  # At or below: "zero pressure", the sensor is inactive
+
+# StableClassifier defaults: hysteresis in sensor units on both thresholds
+# (unless the rules set their own), and seconds a label must hold / between
+# repeats of an unchanged label
+HYSTERESIS = int(os.environ.get("SMARTSOCK_HYSTERESIS", 5))
+MIN_DWELL = float(os.environ.get("SMARTSOCK_MIN_DWELL", 0.1))
+HEARTBEAT = float(os.environ.get("SMARTSOCK_CLASSIFICATION_HEARTBEAT", 1.0))
+
+ACTIVE = 0x01
+INACTIVE = 0x02
+UNCLASSIFIED = "Unclassified"
+
+# A condition may not expand to more terms than this
+MAX_TERMS = 4096
+# Distinct frame states whose label a RuleSet remembers
+CACHE_SIZE = 65536
+
+# The rules classify_sensor_state has always applied
+DEFAULT_CONFIG = {
+    "thresholds": {"active": MAX_THRESHOLD, "inactive": MIN_THRESHOLD, "hysteresis": HYSTERESIS},
+    "regions": {
+        "foot": f"1-{NUM_SENSORS}",
+        "heel": "16-18",
+        "toe": "21-30"
+    },
+    "classes": [
+        {"label": "Foot On Ground", "priority": 40, "when": {"active": "foot"}},
+        {"label": "Foot In Air", "priority": 30, "when": {"inactive": "foot"}},
+        {"label": "Heel Touch", "priority": 20, "when": {"only": "heel"}},
+        {"label": "Toe Touch", "priority": 10, "when": {"only": "toe"}}
+    ]
+}
+
+
+def state_table(active_at, inactive_at):
+    """Value -> state byte table for bytes.translate"""
+    return bytes(
+        ACTIVE if value >= active_at else INACTIVE if value <= inactive_at else 0
+        for value in range(256)
+    )
+
+
+class RuleSet:
+    """Compiled classification rules; see compile_rules()"""
+
+    def __init__(self, groups, classes, default=UNCLASSIFIED, source=None, regions=None):
+        self.groups = groups  # (active, inactive, hysteresis) of each threshold group
+        self.classes = classes  # (label, priority, [(mask, value)]), highest priority first
+        self.default = default
+        self.source = source  # Where the rules came from, for display
+        self.regions = regions or {}  # Region name -> its 1-based sensor numbers
+        self.tables = [state_table(active, inactive) for active, inactive, _ in groups]
+        # States a sensor keeps once it is in them
+        self.held_tables = [state_table(active - band, inactive + band) for active, inactive, band in groups]
+        self._cache = {}
+
+    def state(self, values, tables=None):
+        """A frame's state integer (see the module docstring)"""
+        tables = self.tables if tables is None else tables
+        if len(tables) == 1:
+            return int.from_bytes(values.translate(tables[0]), "little")
+        return int.from_bytes(b"".join([values.translate(table) for table in tables]), "little")
+
+    def match(self, state):
+        """Label of the highest-priority class a state integer satisfies"""
+        label = self._cache.get(state)
+        if label is None:
+            label = self.default
+            for name, _, terms in self.classes:
+                if any(state & mask == value for mask, value in terms):
+                    label = name
+                    break
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[state] = label
+        return label
+
+    def labels(self):
+        return [label for label, _, _ in self.classes]
+
+    def describe(self):
+        return {
+            "source": self.source,
+            "thresholds": [
+                {"active": active, "inactive": inactive, "hysteresis": band}
+                for active, inactive, band in self.groups
+            ],
+            "classes": [
+                {"label": label, "priority": priority, "terms": len(terms)}
+                for label, priority, terms in self.classes
+            ],
+            "default": self.default
+        }
+
+
+def parse_sensors(spec):
+    """1-based sensor numbers of ``spec``: 5, "1-3,7", or a list of either"""
+    if isinstance(spec, bool):
+        raise ValueError(f"invalid sensor list {spec!r}")
+    if isinstance(spec, int):
+        parts = [spec]
+    elif isinstance(spec, str):
+        parts = [part.strip() for part in spec.split(",") if part.strip()]
+    elif isinstance(spec, list):
+        parts = spec
+    else:
+        raise ValueError(f"invalid sensor list {spec!r}")
+    sensors = set()
+    for part in parts:
+        if isinstance(part, str) and "-" in part:
+            first, _, last = part.partition("-")
+            try:
+                numbers = range(int(first), int(last) + 1)
+            except ValueError:
+                raise ValueError(f"invalid sensor range '{part}'") from None
+        elif isinstance(part, list):
+            numbers = parse_sensors(part)
+        else:
+            try:
+                numbers = [int(part)]
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid sensor number {part!r}") from None
+        for sensor in numbers:
+            if not 1 <= sensor <= NUM_SENSORS:
+                raise ValueError(f"sensor numbers run from 1 to {NUM_SENSORS}, got {sensor}")
+            sensors.add(sensor)
+    return sorted(sensors)
+
+
+def _thresholds(spec, default):
+    active = spec.get("active", default[0])
+    inactive = spec.get("inactive", default[1])
+    band = spec.get("hysteresis", default[2])
+    for name, value in (("active", active), ("inactive", inactive), ("hysteresis", band)):
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 255:
+            raise ValueError(f"threshold '{name}' must be an integer from 0 to 255, got {value!r}")
+    if inactive + band >= active - band:
+        raise ValueError(
+            f"inactive {inactive} and active {active} thresholds must stay apart by more than twice "
+            f"the hysteresis ({band})"
+        )
+    return active, inactive, band
+
+
+def _bits(sensors, state, group):
+    bits = 0
+    for sensor in sensors:
+        bits |= state << (8 * (group * NUM_SENSORS + sensor - 1))
+    return bits
+
+
+def _and_term(a, b):
+    """Conjunction of two ``(mask, value)`` terms, or None if they contradict"""
+    (mask_a, value_a), (mask_b, value_b) = a, b
+    if (value_a ^ value_b) & mask_a & mask_b:
+        return None
+    value = value_a | value_b
+    if value & (value >> 1) & int.from_bytes(b"\x01" * ((value.bit_length() + 7) // 8), "little"):
+        return None  # Some sensor would have to be active and inactive at once
+    return mask_a | mask_b, value
+
+
+def _limit(terms):
+    terms = list(dict.fromkeys(terms))
+    if len(terms) > MAX_TERMS:
+        raise ValueError(f"condition expands to more than {MAX_TERMS} terms; simplify it")
+    return terms
+
+
+def _and(a, b):
+    return _limit(term for x in a for y in b if (term := _and_term(x, y)) is not None)
+
+
+def _not(terms):
+    result = [(0, 0)]  # Always true
+    for mask, value in terms:
+        # Not this term: one of its required bits differs
+        negated = []
+        bits = mask
+        while bits:
+            bit = bits & -bits
+            negated.append((bit, ~value & bit))
+            bits ^= bit
+        result = _and(result, negated)
+    return result
+
+
+class _Compiler:
+    def __init__(self, config):
+        if not isinstance(config, dict):
+            raise ValueError("rules must be a JSON object")
+        thresholds = config.get("thresholds", {})
+        if not isinstance(thresholds, dict):
+            raise ValueError("'thresholds' must be an object")
+        self.default = _thresholds(thresholds, (MAX_THRESHOLD, MIN_THRESHOLD, HYSTERESIS))
+        self.groups = [self.default]
+        self.regions = {}
+        regions = config.get("regions", {})
+        if not isinstance(regions, dict):
+            raise ValueError("'regions' must be an object")
+        for name, spec in regions.items():
+            try:
+                if isinstance(spec, dict):
+                    if "sensors" not in spec:
+                        raise ValueError("needs 'sensors'")
+                    sensors = parse_sensors(spec["sensors"])
+                    group = self._group(_thresholds(spec, self.default))
+                else:
+                    sensors = parse_sensors(spec)
+                    group = 0
+            except ValueError as e:
+                raise ValueError(f"region '{name}': {e}") from None
+            self.regions[name] = (sensors, group)
+
+    def _group(self, thresholds):
+        if thresholds not in self.groups:
+            self.groups.append(thresholds)
+        return self.groups.index(thresholds)
+
+    def _region(self, ref):
+        """``[(sensors, group)]`` of a region name or list of names"""
+        names = ref if isinstance(ref, list) else [ref]
+        parts = []
+        for name in names:
+            if not isinstance(name, str) or name not in self.regions:
+                raise ValueError(f"unknown region {name!r}")
+            parts.append(self.regions[name])
+        return parts
+
+    def _all(self, ref, state):
+        bits = sum(_bits(sensors, state, group) for sensors, group in self._region(ref))
+        term = _and_term((bits, bits), (0, 0))
+        return [] if term is None else [term]
+
+    def _any(self, ref, state):
+        return _limit(
+            (bit, bit) for sensors, group in self._region(ref) for sensor in sensors
+            for bit in [_bits([sensor], state, group)]
+        )
+
+    def condition(self, when):
+        """``[(mask, value)]`` terms of a condition, any of which must hold"""
+        if not isinstance(when, dict) or not when:
+            raise ValueError(f"a condition must be a non-empty object, got {when!r}")
+        terms = [(0, 0)]
+        for key, arg in when.items():
+            if key == "active":
+                part = self._all(arg, ACTIVE)
+            elif key == "inactive":
+                part = self._all(arg, INACTIVE)
+            elif key == "any_active":
+                part = self._any(arg, ACTIVE)
+            elif key == "any_inactive":
+                part = self._any(arg, INACTIVE)
+            elif key == "only":
+                inside = {sensor for sensors, _ in self._region(arg) for sensor in sensors}
+                rest = _bits([s for s in range(1, NUM_SENSORS + 1) if s not in inside], INACTIVE, 0)
+                part = _and(self._all(arg, ACTIVE), [(rest, rest)])
+            elif key in ("all", "any"):
+                if not isinstance(arg, list) or not arg:
+                    raise ValueError(f"'{key}' takes a non-empty list of conditions")
+                part = self.condition(arg[0])
+                for item in arg[1:]:
+                    other = self.condition(item)
+                    part = _and(part, other) if key == "all" else _limit(part + other)
+            elif key == "not":
+                part = _not(self.condition(arg))
+            else:
+                raise ValueError(f"unknown condition '{key}'")
+            terms = _and(terms, part)
+        return terms
+
+
+def compile_rules(config, source=None):
+    """A RuleSet from a rules config (see the module docstring); raises ValueError"""
+    compiler = _Compiler(config)
+    classes = config.get("classes")
+    if not isinstance(classes, list) or not classes:
+        raise ValueError("'classes' must be a non-empty list")
+    compiled = []
+    for position, spec in enumerate(classes):
+        if not isinstance(spec, dict) or not isinstance(spec.get("label"), str) or "when" not in spec:
+            raise ValueError(f"class {position + 1} needs a 'label' and a 'when' condition")
+        priority = spec.get("priority", 0)
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+            raise ValueError(f"class '{spec['label']}': priority must be a number")
+        try:
+            terms = compiler.condition(spec["when"])
+        except ValueError as e:
+            raise ValueError(f"class '{spec['label']}': {e}") from None
+        compiled.append((spec["label"], priority, terms))
+    # Highest priority first; equal priorities keep their order in the file
+    compiled.sort(key=lambda item: -item[1])
+    default = config.get("default", UNCLASSIFIED)
+    if not isinstance(default, str):
+        raise ValueError("'default' must be a label")
+    regions = {name: sensors for name, (sensors, _) in compiler.regions.items()}
+    return RuleSet(compiler.groups, compiled, default, source, regions)
+
+
+RULES = compile_rules(DEFAULT_CONFIG, source="built-in")
+_active = RULES
+
+
+def active_rules():
+    """The RuleSet in use (replaced by rules.py when the rules file changes)"""
+    return _active
+
+
+def set_rules(rules):
+    global _active
+    _active = rules
+
+
+def classify(values, rules=None):
+    """Classify one frame: NUM_SENSORS values (bytes or bytearray, or a sequence of ints)"""
+    rules = rules or _active
+    if not isinstance(values, (bytes, bytearray)):
+        values = bytes(values)
+    return rules.match(rules.state(values))
+
+
+def _block(frames):
+    if isinstance(frames, bytes):
+        return frames
+    try:
+        view = memoryview(frames)  # array("B"), mmap, a uint8 numpy array ...
+    except TypeError:
+        return b"".join(bytes(row) for row in frames)
+    if view.itemsize != 1:
+        raise ValueError("frames must hold one byte per sensor value")
+    return view.tobytes()
+
+
+def classify_batch(frames, rules=None):
+    """Labels of many frames, in order, for offline use.
+
+    ``frames`` is a row-major block of NUM_SENSORS values per frame (bytes,
+    a recording's values, a C-contiguous uint8 array of shape (n, 30)) or
+    an iterable of rows. The whole block is translated to states in one
+    call per threshold group. Each distinct state is matched once, since
+    long runs of frames usually share a handful of them.
+    """
+    rules = rules or _active
+    block = _block(frames)
+    if len(block) % NUM_SENSORS:
+        raise ValueError(f"frames must hold a multiple of {NUM_SENSORS} values, got {len(block)}")
+    planes = [block.translate(table) for table in rules.tables]
+    offsets = range(0, len(block), NUM_SENSORS)
+    if len(planes) == 1:
+        states = planes[0]
+        keys = [states[lo:lo + NUM_SENSORS] for lo in offsets]
+    else:
+        keys = [b"".join([plane[lo:lo + NUM_SENSORS] for plane in planes]) for lo in offsets]
+    labels = {key: rules.match(int.from_bytes(key, "little")) for key in set(keys)}
+    return [labels[key] for key in keys]
+
+
+class StableClassifier:
+    """Classifies one device's frames with hysteresis, a minimum dwell time
+    and transition-only events; used by the thread that publishes its frames.
+
+    With ``rules`` None it follows the active rules, picking up a reloaded
+    rules file on the next frame.
+    """
+
+    def __init__(self, rules=None, min_dwell=MIN_DWELL, heartbeat=HEARTBEAT):
+        self.rules = rules
+        self.min_dwell = min_dwell
+        self.heartbeat = heartbeat
+        self.reset()
+
+    def reset(self):
+        """Forget the history, e.g. when a replay jumps back in time"""
+        self.label = None  # Current stable label
+        self.state = 0  # Sensor states of the last frame, hysteresis applied
+        self.pending = None  # Label waiting out its dwell time
+        self.pending_since = None
+        self.last_time = None
+        self.last_event = None  # When the label was last reported
+        self.transitions = 0
+        self.events = 0
+        self._rules = None  # RuleSet self.state was computed with
+
+    def update(self, values, timestamp):
+        """``(label, event)`` for the next frame.
+
+        ``event`` is "transition" when the stable label changed, "heartbeat"
+        when it is due to be repeated and None otherwise. The first frame
+        is a transition to its own label.
+        """
+        if self.last_time is not None and timestamp < self.last_time:
+            self.reset()
+        self.last_time = timestamp
+        rules = self.rules or _active
+        if rules is not self._rules:
+            # States of different rule sets do not line up
+            self._rules = rules
+            self.state = 0
+        if not isinstance(values, (bytes, bytearray)):
+            values = bytes(values)
+        entered = rules.state(values)
+        held = rules.state(values, rules.held_tables)
+        # A sensor is in a state if it crossed the threshold into it, or was
+        # already in it and has not left the widened band yet
+        self.state = state = entered | (held & self.state)
+        label = rules.match(state)
+
+        event = None
+        if self.label is None:
+            self.label = label
+            event = "transition"
+        elif label == self.label:
+            self.pending = None
+        else:
+            if label != self.pending:
+                self.pending = label
+                self.pending_since = timestamp
+            if timestamp - self.pending_since >= self.min_dwell:
+                self.label = label
+                self.pending = None
+                event = "transition"
+        if event is not None:
+            self.transitions += 1
+        elif timestamp - self.last_event >= self.heartbeat:
+            event = "heartbeat"
+        if event is not None:
+            self.last_event = timestamp
+            self.events += 1
+        return self.label, event
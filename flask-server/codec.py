@@ -0,0 +1,192 @@
+# codec.py
+"""Compact delta encoding of frame streams.
+
+Sensor values are 0-100 and change slowly, so most of a frame is the same as
+the one before it. A stream of ``(timestamp, seq, values)`` frames is
+encoded as keyframes, which stand alone, and delta frames, which only carry
+what changed since the previous frame:
+
+    keyframe
+        tag (KEYFRAME, plus HAS_SEQ when the frame has a sequence number)
+        timestamp, double, little-endian
+        seq, uint32 little-endian (only with HAS_SEQ)
+        NUM_SENSORS values, one byte each
+    delta frame
+        tag (0, plus HAS_SEQ)
+        timestamp change in microseconds, zigzag varint
+        seq change, zigzag varint (only with HAS_SEQ)
+        changed-sensor mask, uint32 little-endian (bit 0 = sensor_1)
+        value change of each changed sensor in order, zigzag varint
+
+A varint stores 7 bits per byte, low bits first, with the top bit set on
+every byte but the last; zigzag maps small negative numbers to small
+positive ones (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...), so a change of up to
++/-63 takes one byte. An unchanged frame at 100 Hz is 7 bytes against 42
+for a raw record and about 500 for a ``sensor_update`` JSON message.
+
+Delta timestamps are rounded to the microsecond; the encoder works from the
+timestamps the decoder will reconstruct, so the error never accumulates.
+A decoder can start at any keyframe, which the encoder emits every
+``keyframe_interval`` frames and whenever ``force_keyframe()`` is called.
+"""
+import struct
+
+from frame import NUM_SENSORS
+
+KEYFRAME = 0x01
+HAS_SEQ = 0x02
+# Frames between keyframes on a live stream: a client that joins mid-stream
+# waits at most this long for its first frame
+KEYFRAME_INTERVAL = 100
+
+_TIME = struct.Struct("<d")
+_SEQ = struct.Struct("<I")
+_MASK = struct.Struct("<I")
+
+
+def zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def unzigzag(z):
+    return (z >> 1) ^ -(z & 1)
+
+
+def write_varint(out, value):
+    """Append ``value`` (>= 0) to bytearray ``out`` as a varint"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """``(value, next position)`` of the varint at ``data[pos]``"""
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result = byte & 0x7F
+    shift = 7
+    pos += 1
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class DeltaEncoder:
+    """Encodes a stream of frames; one encoder per stream, used by one thread"""
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval  # 0: only forced keyframes
+        self.frames = 0
+        self._values = None
+        self._time = None
+        self._seq = None
+        self._force = True
+
+    def force_keyframe(self):
+        """Make the next frame a keyframe (e.g. when a client joins the stream)"""
+        self._force = True
+
+    def encode(self, timestamp, seq, values, keyframe=False):
+        """Encoded bytes of one frame; ``values`` is NUM_SENSORS bytes"""
+        previous = self._values
+        tag = HAS_SEQ if seq is not None else 0
+        interval = self.keyframe_interval
+        if (keyframe or self._force or previous is None
+                or (seq is None) != (self._seq is None)
+                or (interval and self.frames % interval == 0)):
+            self._force = False
+            out = bytearray((tag | KEYFRAME,))
+            out += _TIME.pack(timestamp)
+            if seq is not None:
+                out += _SEQ.pack(seq)
+            out += values
+            self._time = timestamp
+        else:
+            out = bytearray((tag,))
+            micros = round((timestamp - self._time) * 1e6)
+            write_varint(out, zigzag(micros))
+            # The decoder's timestamp, so rounding errors never add up
+            self._time += micros / 1e6
+            if seq is not None:
+                write_varint(out, zigzag(seq - self._seq))
+            if values == previous:
+                out += b"\0\0\0\0"
+            else:
+                mask = 0
+                changes = bytearray()
+                bit = 1
+                for new, old in zip(values, previous):
+                    if new != old:
+                        mask |= bit
+                        change = new - old
+                        # zigzag of a value change, one byte up to +/-63
+                        write_varint(changes, (change << 1) ^ (change >> 63))
+                    bit <<= 1
+                out += _MASK.pack(mask)
+                out += changes
+        self._values = bytes(values)
+        self._seq = seq
+        self.frames += 1
+        return bytes(out)
+
+
+class DeltaDecoder:
+    """Decodes what a DeltaEncoder produced, starting at a keyframe"""
+
+    def __init__(self):
+        self.values = None
+        self.timestamp = None
+        self.seq = None
+
+    def reset(self):
+        self.values = None
+
+    def decode(self, data, pos=0):
+        """``(timestamp, seq, values, next position)`` of the frame at ``data[pos]``.
+
+        ``values`` is bytes; ``seq`` is None for frames without one. Raises
+        ValueError for a delta frame before any keyframe and IndexError if
+        ``data`` ends inside the frame.
+        """
+        tag = data[pos]
+        pos += 1
+        if tag & KEYFRAME:
+            self.timestamp = _TIME.unpack_from(data, pos)[0]
+            pos += 8
+            if tag & HAS_SEQ:
+                self.seq = _SEQ.unpack_from(data, pos)[0]
+                pos += 4
+            else:
+                self.seq = None
+            end = pos + NUM_SENSORS
+            if end > len(data):
+                raise IndexError("frame truncated")
+            self.values = bytes(data[pos:end])
+            return self.timestamp, self.seq, self.values, end
+        if self.values is None:
+            raise ValueError("delta frame without a keyframe")
+        micros, pos = read_varint(data, pos)
+        self.timestamp += unzigzag(micros) / 1e6
+        if tag & HAS_SEQ:
+            change, pos = read_varint(data, pos)
+            self.seq += unzigzag(change)
+        else:
+            self.seq = None
+        mask = _MASK.unpack_from(data, pos)[0]
+        pos += 4
+        if mask:
+            values = bytearray(self.values)
+            while mask:
+                low = mask & -mask
+                index = low.bit_length() - 1
+                change, pos = read_varint(data, pos)
+                values[index] += (change >> 1) ^ -(change & 1)
+                mask ^= low
+            self.values = bytes(values)
+        return self.timestamp, self.seq, self.values, pos
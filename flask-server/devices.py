@@ -0,0 +1,229 @@
+# devices.py
+"""Per-device session state and the registry of connected socks.
+
+Every connected serial port or simulated source gets its own DeviceSession,
+which carries everything that used to be module-level globals in server.py:
+the latest Frame of sensor values, classification, connection status, reader thread
+and counters. The registry maps device ids to sessions so one server process
+can ingest many socks at once.
+"""
+import os
+import re
+import threading
+import time
+
+from classify import StableClassifier
+from codec import DeltaEncoder
+from frame import FrameBuffer
+from gait import GaitTracker
+from history import HistoryBuffer
+from link_stats import SequenceTracker
+
+
+def default_device_id(port):
+    """Derive a URL-safe device id from a port name.
+
+    "COM3" -> "COM3", "/dev/ttyUSB0" -> "ttyUSB0", "Simulated:sequence" -> "sim-sequence",
+    "Replay:ttyUSB0/20250101-120000" -> "replay-ttyUSB0"
+    """
+    if port.startswith("Simulated"):
+        mode_key = port.split(":", 1)[1] if ":" in port else ""
+        return f"sim-{mode_key or 'sequence'}"
+    if port.startswith("Replay:"):
+        source = port.split(":", 1)[1].split("/", 1)[0]
+        return "replay-" + re.sub(r"[^A-Za-z0-9_.-]", "-", source or "recording")
+    name = os.path.basename(port.rstrip("/\\")) or port
+    return re.sub(r"[^A-Za-z0-9_.-]", "-", name)
+
+
+class DeviceSession:
+    """State for one sock: latest frame, classification, status, thread and stats"""
+
+    def __init__(self, device_id, port, mode):
+        self.device_id = device_id
+        self.port = port
+        self.mode = mode  # "arduino", "simulation" or "replay"
+        # Writer fills frames.back; everyone else reads the frames.latest snapshot
+        self.frames = FrameBuffer()
+        self.history = HistoryBuffer()  # Recent frames for charts, bounded
+        self.classifier = StableClassifier()  # Debounced label and classification_update events
+        self.gait = GaitTracker(device_id)  # Steps, cadence and gait phases of this foot
+        self.last_seq = None  # Sequence number of the latest frame
+        self.connected_at = None  # When the current connection came up
+        self.first_frame = None  # (rx_time, seq, device_time) of the first frame on this connection
+        self.baud_rate = None  # Serial rate in use, after negotiation
+        self.negotiate = False  # Run the baud handshake when (re)opening the port
+        self.negotiation = None  # Result of the last handshake (see handshake.negotiate_baud)
+        self.decoder = None  # FrameDecoder of the active serial reader
+        self.link = SequenceTracker()  # Lost/duplicate/reordered frames and jitter
+        self.session_id = None  # Row in the session store
+        self.replay = None  # ReplayPlayer, in replay mode
+        self.encoder = DeltaEncoder()  # sensor_frame stream for delta subscribers
+        self.status = {
+            "connected": False,
+            "message": "Not connected",
+            "port": port,
+            "mode": "none",
+            "device_id": device_id,
+            "baud_rate": None,
+            "negotiation": None,
+            "line_error_rate": None,
+            "history_bytes": self.history.nbytes()
+        }
+        self.ingest = None  # "thread" or "async" once a reader is attached
+        self.thread = None
+        self.engine = None  # AsyncIngestEngine owning the port, in async mode
+        self.ser = None
+        self.stopping = False
+        self.stats = {
+            "frames": 0,
+            "started_at": time.time(),
+            "reconnects": 0,
+            "reconnect_attempts": 0,
+            "stalls": 0,
+            "gaps": 0,
+            "gap_seconds": 0.0,
+            "frames_lost_in_gaps": 0
+        }
+
+    @property
+    def frame(self):
+        """The frame being written - only for the device's reader thread"""
+        return self.frames.back
+
+    @property
+    def latest(self):
+        """The last published Snapshot, safe to read from any thread"""
+        return self.frames.latest
+
+    @property
+    def classification(self):
+        return self.frames.latest.classification
+
+    @property
+    def last_frame_time(self):
+        return self.frames.latest.timestamp
+
+    def line_error_rate(self):
+        """Fraction of received frames/lines that failed CRC or parsing"""
+        decoder = self.decoder
+        if decoder is None:
+            return None
+        errors = decoder.crc_errors + decoder.parse_errors
+        total = decoder.frames + errors
+        return errors / total if total else 0.0
+
+    def set_status(self, connected, message, mode=None):
+        if connected and not self.status.get("connected"):
+            self.connected_at = time.time()
+            self.first_frame = None
+            self.link.reconnected()
+        self.status = {
+            "connected": connected,
+            "message": message,
+            "port": self.port,
+            "mode": mode if mode is not None else (self.mode if connected else "none"),
+            "device_id": self.device_id,
+            "baud_rate": self.baud_rate,
+            "negotiation": self.negotiation,
+            "line_error_rate": self.line_error_rate(),
+            "history_bytes": self.history.nbytes()
+        }
+        return self.status
+
+    def refresh_status(self):
+        """Update the live link counters in the status dict"""
+        self.status = dict(self.status, baud_rate=self.baud_rate, line_error_rate=self.line_error_rate())
+        return self.status
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, target, *args):
+        self.thread = threading.Thread(target=target, args=(self,) + args, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Ask the reader thread to finish, close the port and wait briefly"""
+        self.stopping = True
+        if self.engine is not None:
+            self.engine.remove_port(self)
+        if self.replay is not None:
+            self.replay.stop()  # Wakes a player waiting for its next frame
+        ser = self.ser
+        if ser and ser.is_open:
+            ser.close()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+        if self.replay is not None and not self.is_alive():
+            self.replay.close()
+
+    def summary(self, sensor_data=False):
+        """Device info for clients; ``sensor_data`` adds the latest values"""
+        latest = self.latest
+        summary = {
+            "device_id": self.device_id,
+            "port": self.port,
+            "mode": self.mode,
+            "ingest": self.ingest,
+            "status": self.refresh_status(),
+            "classification": latest.classification,
+            "last_frame_time": latest.timestamp,
+            "stats": dict(self.stats),
+            "link": self.link.summary(),
+            "gait": self.gait.summary()
+        }
+        if self.replay is not None:
+            summary["replay"] = self.replay.state()
+        if sensor_data:
+            summary["sensor_data"] = latest.to_dict()
+        return summary
+
+
+class DeviceRegistry:
+    """Thread-safe map of device id -> DeviceSession"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def add(self, session):
+        """Register a session, returning any session it replaced"""
+        with self._lock:
+            # Re-insert so a replaced session becomes the newest again
+            previous = self._sessions.pop(session.device_id, None)
+            self._sessions[session.device_id] = session
+        return previous
+
+    def get(self, device_id):
+        with self._lock:
+            return self._sessions.get(device_id)
+
+    def remove(self, device_id):
+        with self._lock:
+            return self._sessions.pop(device_id, None)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def unique_id(self, base):
+        """Return ``base`` or ``base-2``, ``base-3``... if already taken"""
+        with self._lock:
+            if base not in self._sessions:
+                return base
+            n = 2
+            while f"{base}-{n}" in self._sessions:
+                n += 1
+            return f"{base}-{n}"
+
+    def primary(self):
+        """The most recently registered session, used by the legacy single-device endpoints"""
+        with self._lock:
+            if not self._sessions:
+                return None
+            return next(reversed(self._sessions.values()))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
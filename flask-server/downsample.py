@@ -0,0 +1,211 @@
+# downsample.py
+"""Downsampling of multi-channel sensor series for charts.
+
+A series is a run of frames: timestamps plus a row-major block of
+NUM_SENSORS uint8 values per frame. It is cut into buckets of consecutive
+frames and each bucket is reduced across all sensor channels at once:
+
+- "stride": the first frame of every bucket (what /api/history always did)
+- "mean": the per-sensor mean of the bucket
+- "minmax": the per-sensor minimum, maximum and mean of the bucket, so a
+  chart can draw the envelope and spikes never disappear
+- "lttb": Largest-Triangle-Three-Buckets, which keeps the real frame of
+  each bucket that forms the largest triangle with the frame kept before it
+  and the mean of the next bucket
+
+LTTB here picks one frame per bucket for all sensors, scoring each frame by
+the sum of its triangle areas over the channels, so every sensor shares the
+same time axis. Like MinMaxLTTB, only the frames holding some channel's
+minimum or maximum in the bucket are scored; those are found with C-level
+``min``/``max``/``bytes.index`` over per-channel columns, which keeps the
+Python work per bucket small.
+
+Buckets are consumed from iterators, so a source can read them lazily (see
+export.py) and never hold more than two buckets at once.
+"""
+import math
+
+from frame import NUM_SENSORS, SENSOR_NAMES
+
+MODES = ("stride", "mean", "minmax", "lttb")
+
+
+def split_columns(values, width=NUM_SENSORS):
+    """Per-channel ``bytes`` of a row-major block (bytes) of ``width`` values per row"""
+    return [values[i::width] for i in range(width)]
+
+
+def stride_bounds(count, max_points):
+    step = max(1, math.ceil(count / max_points))
+    return [(lo, min(lo + step, count)) for lo in range(0, count, step)]
+
+
+def bucket_bounds(count, buckets):
+    """Split rows ``0..count`` into ``buckets`` ranges of near-equal size"""
+    buckets = max(1, min(buckets, count))
+    return [(i * count // buckets, (i + 1) * count // buckets) for i in range(buckets)]
+
+
+def lttb_bounds(count, max_points):
+    """LTTB buckets: the first and last row on their own, the rest split evenly"""
+    if max_points < 3 or count <= max_points:
+        return bucket_bounds(count, min(count, max_points))
+    inner = max_points - 2
+    span = count - 2
+    bounds = [(0, 1)]
+    bounds.extend((1 + i * span // inner, 1 + (i + 1) * span // inner) for i in range(inner))
+    bounds.append((count - 1, count))
+    return bounds
+
+
+def plan(count, max_points, mode):
+    """Bucket bounds that reduce ``count`` rows to at most ``max_points`` points"""
+    max_points = max(1, int(max_points))
+    if mode == "stride":
+        return stride_bounds(count, max_points)
+    if mode == "lttb":
+        return lttb_bounds(count, max_points)
+    return bucket_bounds(count, max_points)
+
+
+def iter_buckets(timestamps, values, bounds):
+    """``(timestamps, values)`` of each bucket of an in-memory series"""
+    for lo, hi in bounds:
+        yield timestamps[lo:hi], values[lo * NUM_SENSORS:hi * NUM_SENSORS]
+
+
+def aggregate(buckets, extremes=True):
+    """Yield ``(first timestamp, last timestamp, mins, maxs, means)`` per bucket.
+
+    ``mins`` and ``maxs`` are bytes of NUM_SENSORS values (None without
+    ``extremes``, which saves two of the three passes), ``means`` floats.
+    """
+    for bucket in buckets:
+        timestamps, values = bucket[0], bucket[1]
+        count = len(timestamps)
+        columns = split_columns(values)
+        yield (
+            timestamps[0],
+            timestamps[-1],
+            bytes(map(min, columns)) if extremes else None,
+            bytes(map(max, columns)) if extremes else None,
+            [sum(column) / count for column in columns]
+        )
+
+
+def lttb(buckets):
+    """Yield ``(bucket, index)`` of the frame LTTB keeps from each bucket.
+
+    ``bucket`` is the item taken from ``buckets`` (timestamps and values
+    first; anything after them is passed through), ``index`` a row in it.
+    The first row of the first bucket and the last row of the last bucket
+    are always kept.
+    """
+    buckets = iter(buckets)
+    current = next(buckets, None)
+    if current is None:
+        return
+    yield current, 0
+    kept_time = current[0][0]
+    kept = current[1][:NUM_SENSORS]
+    current = next(buckets, None)
+    while current is not None:
+        following = next(buckets, None)
+        timestamps, values = current[0], current[1]
+        if following is None:
+            yield current, len(timestamps) - 1
+            return
+
+        # The third corner: the mean frame of the next bucket
+        next_times = following[0]
+        size = len(next_times)
+        mean_time = sum(next_times) / size
+        mean = [sum(column) / size for column in split_columns(following[1])]
+        dt_mean = kept_time - mean_time
+        rise = [m - k for m, k in zip(mean, kept)]
+
+        candidates = set()
+        for column in split_columns(values):
+            candidates.add(column.index(max(column)))
+            candidates.add(column.index(min(column)))
+
+        best = 0
+        best_area = -1.0
+        for index in sorted(candidates):
+            dt = kept_time - timestamps[index]
+            row = values[index * NUM_SENSORS:(index + 1) * NUM_SENSORS]
+            # Twice the triangle area per channel, summed
+            area = sum(abs(dt_mean * (y - k) - dt * r) for y, k, r in zip(row, kept, rise))
+            if area > best_area:
+                best_area = area
+                best = index
+        yield current, best
+        kept_time = timestamps[best]
+        kept = values[best * NUM_SENSORS:(best + 1) * NUM_SENSORS]
+        current = following
+
+
+def reduce_rows(buckets, mode):
+    """Yield ``(timestamp, seq, values)`` rows that represent ``buckets``.
+
+    Buckets are ``(timestamps, values, seqs)``. "stride" and "lttb" keep real
+    frames; "mean" yields one rounded mean frame per bucket and "minmax" two
+    frames per bucket, the minimums at its first timestamp and the maximums
+    at its last, both with seq None.
+    """
+    if mode == "lttb":
+        for (timestamps, values, seqs), index in lttb(buckets):
+            yield timestamps[index], seqs[index], values[index * NUM_SENSORS:(index + 1) * NUM_SENSORS]
+    elif mode == "stride":
+        for timestamps, values, seqs in buckets:
+            yield timestamps[0], seqs[0], values[:NUM_SENSORS]
+    elif mode == "mean":
+        for first, _, _, _, means in aggregate(buckets, extremes=False):
+            yield first, None, bytes(round(m) for m in means)
+    elif mode == "minmax":
+        for first, last, mins, maxs, _ in aggregate(buckets):
+            yield first, None, mins
+            yield last, None, maxs
+    else:
+        raise ValueError(f"unknown downsampling mode '{mode}'")
+
+
+def _named(columns):
+    return dict(zip(SENSOR_NAMES, columns))
+
+
+def downsample(timestamps, values, max_points, mode):
+    """Reduce an in-memory series to at most ``max_points`` points per sensor.
+
+    ``values`` is bytes, row-major. Returns ``{"timestamps", "values"}``
+    with ``values`` mapping sensor names to lists; "minmax" adds ``"min"``
+    and ``"max"`` with the same shape and ``"values"`` holds the means.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown downsampling mode '{mode}'")
+    bounds = plan(len(timestamps), max_points, mode)
+    buckets = iter_buckets(timestamps, values, bounds)
+    if mode in ("mean", "minmax"):
+        times, mins, maxs, means = [], [], [], []
+        for first, _, low, high, mean in aggregate(buckets, extremes=mode == "minmax"):
+            times.append(first)
+            mins.append(low)
+            maxs.append(high)
+            means.append(mean)
+        result = {
+            "timestamps": times,
+            "values": _named([round(m, 2) for m in column] for column in zip(*means))
+        }
+        if mode == "minmax":
+            result["min"] = _named(list(column) for column in split_columns(b"".join(mins)))
+            result["max"] = _named(list(column) for column in split_columns(b"".join(maxs)))
+        return result
+    if mode == "lttb":
+        rows = [(bucket[0][index], bucket[1][index * NUM_SENSORS:(index + 1) * NUM_SENSORS])
+                for bucket, index in lttb(buckets)]
+    else:
+        rows = [(bucket[0][0], bucket[1][:NUM_SENSORS]) for bucket in buckets]
+    return {
+        "timestamps": [t for t, _ in rows],
+        "values": _named(list(column) for column in split_columns(b"".join(v for _, v in rows)))
+    }
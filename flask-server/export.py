@@ -0,0 +1,193 @@
+# export.py
+"""Streaming export of recordings as CSV, NDJSON or NumPy ``.npy``.
+
+Exports are generators: segments are memory-mapped and read CHUNK_FRAMES
+records at a time, each chunk is encoded and yielded straight to the HTTP
+response, and nothing else is held. A multi-GB recording therefore exports
+in constant memory and the first bytes go out as soon as the request
+arrives.
+
+The ``.npy`` stream is a NumPy 1.0 format header followed by the raw
+records: a segment record (``<f8`` timestamp, ``<u4`` seq, 30 ``u1``
+values, 42 bytes) is exactly one element of the packed structured dtype
+NPY_DESCR, so the data of raw segments is sent without re-encoding and
+loads with ``numpy.load(f)``. Delta segments are decoded into the same
+layout a chunk at a time.
+
+With ``max_points`` the frames are reduced with one of the downsample.py
+modes while they are read, one bucket at a time, and the same row format
+is written for the result.
+"""
+import struct
+from itertools import islice
+
+from downsample import plan, reduce_rows
+from frame import NUM_SENSORS, SENSOR_NAMES
+from recorder import NO_SEQ, open_segment, select_segments
+
+CHUNK_FRAMES = 4096
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "npy": ("application/octet-stream", "npy"),
+}
+
+NPY_DESCR = f"[('timestamp', '<f8'), ('seq', '<u4'), ('values', '|u1', ({NUM_SENSORS},))]"
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# One NPY_DESCR element, which is also the layout of a segment record
+_NPY_ROW = struct.Struct(f"<dI{NUM_SENSORS}s")
+
+
+def npy_header(count):
+    """NPY 1.0 header for ``count`` records, padded to 64 bytes like numpy writes it"""
+    header = f"{{'descr': {NPY_DESCR}, 'fortran_order': False, 'shape': ({count},), }}"
+    padding = -(len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header
+
+
+def open_selection(path, start=None, end=None):
+    """``[(reader, lo, hi)]`` for every segment holding records in [start, end].
+
+    Segments outside the range are skipped using the recording's catalog,
+    without being opened. The caller closes the readers (see
+    ``close_selection``).
+    """
+    selection = []
+    try:
+        for segment in select_segments(path, start, end):
+            try:
+                reader = open_segment(segment)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable segment {segment}: {e}")
+                continue
+            if reader.num_sensors != NUM_SENSORS:
+                print(f"Skipping segment {segment} with {reader.num_sensors} sensors")
+                reader.close()
+                continue
+            lo, hi = reader.select(start, end)
+            if lo < hi:
+                selection.append((reader, lo, hi))
+            else:
+                reader.close()
+    except BaseException:
+        close_selection(selection)
+        raise
+    return selection
+
+
+def close_selection(selection):
+    for reader, _, _ in selection:
+        reader.close()
+
+
+def iter_chunks(selection, chunk=CHUNK_FRAMES):
+    """Yield ``(reader, lo, hi)`` index ranges of at most ``chunk`` records"""
+    for reader, lo, hi in selection:
+        for first in range(lo, hi, chunk):
+            yield reader, first, min(first + chunk, hi)
+
+
+def iter_rows(selection):
+    """Every selected record as ``(timestamp, seq, values)``"""
+    for reader, lo, hi in iter_chunks(selection):
+        yield from reader.unpack(lo, hi)
+
+
+def iter_buckets(selection, bounds):
+    """``(timestamps, values, seqs)`` of each of the consecutive buckets ``bounds``,
+    read in order across segments"""
+    rows = iter_rows(selection)
+    for lo, hi in bounds:
+        timestamps, seqs, values = zip(*islice(rows, hi - lo))
+        yield timestamps, b"".join(values), seqs
+
+
+def _row_chunks(rows, chunk=CHUNK_FRAMES):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv(chunks):
+    yield ("timestamp,seq," + ",".join(SENSOR_NAMES) + "\n").encode("ascii")
+    for rows in chunks:
+        lines = []
+        for timestamp, seq, values in rows:
+            lines.append(f"{timestamp!r},{'' if seq == NO_SEQ else seq},{','.join(map(str, values))}\n")
+        yield "".join(lines).encode("ascii")
+
+
+# One NDJSON line, same shape as a sensor_update message; filled with str.format
+# because json.dumps of a 30-key dict per frame is the slow part of the export
+_NDJSON_LINE = (
+    '{{"timestamp":{!r},"seq":{},"sensor_data":{{'
+    + ",".join(f'"{name}":{{}}' for name in SENSOR_NAMES)
+    + "}}}}\n"
+)
+
+
+def _ndjson(chunks):
+    line = _NDJSON_LINE.format
+    for rows in chunks:
+        lines = []
+        for timestamp, seq, values in rows:
+            lines.append(line(timestamp, "null" if seq == NO_SEQ else seq, *values))
+        yield "".join(lines).encode("ascii")
+
+
+def _raw(selection, fmt):
+    if fmt == "npy":
+        yield npy_header(sum(hi - lo for _, lo, hi in selection))
+        for reader, lo, hi in iter_chunks(selection):
+            yield bytes(reader.block(lo, hi))
+        return
+    chunks = (reader.unpack(lo, hi) for reader, lo, hi in iter_chunks(selection))
+    yield from _ENCODERS[fmt](chunks)
+
+
+def _downsampled(selection, fmt, max_points, mode):
+    total = sum(hi - lo for _, lo, hi in selection)
+    if mode == "minmax":
+        # Two rows per bucket
+        bounds = plan(total, max(1, max_points // 2), mode)
+        count = 2 * len(bounds)
+    else:
+        bounds = plan(total, max_points, mode)
+        count = len(bounds)
+    rows = (
+        (timestamp, NO_SEQ if seq is None else seq, values)
+        for timestamp, seq, values in reduce_rows(iter_buckets(selection, bounds), mode)
+    )
+    if fmt == "npy":
+        yield npy_header(count)
+        pack = _NPY_ROW.pack
+        for batch in _row_chunks(rows):
+            yield b"".join([pack(*row) for row in batch])
+        return
+    yield from _ENCODERS[fmt](_row_chunks(rows))
+
+
+_ENCODERS = {"csv": _csv, "ndjson": _ndjson}
+
+
+def export_recording(path, fmt, start=None, end=None, max_points=None, mode="lttb"):
+    """Generator of encoded chunks of a recording's frames in [start, end].
+
+    With ``max_points``, more frames than that are reduced to about
+    ``max_points`` rows with a downsample.py ``mode``. Segments stay mapped
+    only while the generator runs; closing it (as the web server does when
+    a client disconnects) releases them.
+    """
+    selection = open_selection(path, start, end)
+    try:
+        if max_points and sum(hi - lo for _, lo, hi in selection) > max_points:
+            yield from _downsampled(selection, fmt, max_points, mode)
+        else:
+            yield from _raw(selection, fmt)
+    finally:
+        close_selection(selection)
@@ -0,0 +1,140 @@
+# frame.py
+"""Compact in-memory representation of one reading of all sensors.
+
+The original server kept every reading as a ``{"sensor_1": v, ...}`` dict,
+so each frame built and hashed dozens of ``f"sensor_{i}"`` strings on the
+hot path. A Frame keeps the values in one preallocated uint8 buffer indexed
+0..NUM_SENSORS-1 (sensor_1 is index 0), the same form the wire decoder
+produces, and the legacy dict is only built at the API and Socket.IO
+boundary with ``to_dict()``.
+
+Frames are filled in place by a single writer (the device's reader or
+simulation thread). What other threads see is a Snapshot: an immutable copy
+the writer publishes by swapping one reference once a frame is complete
+(see FrameBuffer), so readers never take a lock and never see a frame that
+mixes two readings.
+"""
+from collections import namedtuple
+
+from protocol import NUM_SENSORS
+
+# Name <-> index tables, computed once
+SENSOR_NAMES = tuple(f"sensor_{i}" for i in range(1, NUM_SENSORS + 1))
+SENSOR_INDEX = {name: index for index, name in enumerate(SENSOR_NAMES)}
+
+
+def empty_sensor_data():
+    return dict.fromkeys(SENSOR_NAMES, 0)
+
+
+def clamp(value):
+    """Fit a reported value into a uint8 slot (the sensors report 0-100)"""
+    return max(0, min(255, int(value)))
+
+
+class Frame:
+    """One reading: NUM_SENSORS uint8 values plus when and which frame it was"""
+
+    __slots__ = ("values", "timestamp", "seq")
+
+    def __init__(self, values=None, timestamp=None, seq=None):
+        self.values = bytearray(values) if values is not None else bytearray(NUM_SENSORS)
+        if len(self.values) != NUM_SENSORS:
+            raise ValueError(f"expected {NUM_SENSORS} sensor values, got {len(self.values)}")
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def __len__(self):
+        return NUM_SENSORS
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def get(self, name, default=None):
+        """Value of a sensor by its legacy name"""
+        index = SENSOR_INDEX.get(name)
+        return default if index is None else self.values[index]
+
+    def set(self, name, value):
+        """Set a sensor by its legacy name; returns False for unknown names
+        and values that are not numbers"""
+        index = SENSOR_INDEX.get(name)
+        if index is None:
+            return False
+        try:
+            self.values[index] = clamp(value)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        return True
+
+    def fill(self, payload):
+        """Copy NUM_SENSORS values (bytes, or any sequence of ints) in one go"""
+        if len(payload) != NUM_SENSORS:
+            raise ValueError(f"expected {NUM_SENSORS} sensor values, got {len(payload)}")
+        self.values[:] = payload
+
+    def update(self, mapping):
+        """Apply a ``{"sensor_N": v}`` mapping; returns True if any sensor changed.
+
+        A value that is not a number (``"x"``, ``null``, NaN from a garbled
+        line) is skipped and the sensor keeps its previous value.
+        """
+        updated = False
+        for name, value in mapping.items():
+            index = SENSOR_INDEX.get(name)
+            if index is not None:
+                try:
+                    self.values[index] = clamp(value)
+                except (TypeError, ValueError, OverflowError):
+                    continue
+                updated = True
+        return updated
+
+    def copy(self):
+        return Frame(self.values, self.timestamp, self.seq)
+
+    def to_dict(self):
+        """The legacy ``{"sensor_1": v, ...}`` form, for JSON responses and events"""
+        return dict(zip(SENSOR_NAMES, self.values))
+
+    @classmethod
+    def from_dict(cls, mapping, timestamp=None, seq=None):
+        frame = cls(timestamp=timestamp, seq=seq)
+        frame.update(mapping)
+        return frame
+
+
+class Snapshot(namedtuple("Snapshot", "values timestamp seq classification")):
+    """Immutable published frame; ``values`` is a ``bytes`` copy of the buffer"""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return dict(zip(SENSOR_NAMES, self.values))
+
+
+EMPTY_SNAPSHOT = Snapshot(bytes(NUM_SENSORS), None, None, "Normal")
+
+
+class FrameBuffer:
+    """Double buffer between one writer thread and any number of readers.
+
+    The writer fills ``back`` in place, then calls ``publish()``, which
+    freezes it into a new Snapshot and makes it ``latest`` with a single
+    attribute assignment (atomic under the GIL). Readers load ``latest``
+    once and use that object; it never changes underneath them.
+    """
+
+    __slots__ = ("back", "latest")
+
+    def __init__(self):
+        self.back = Frame()
+        self.latest = EMPTY_SNAPSHOT
+
+    def publish(self, classification, timestamp=None):
+        back = self.back
+        if timestamp is not None:
+            back.timestamp = timestamp
+        snapshot = Snapshot(bytes(back.values), back.timestamp, back.seq, classification)
+        self.latest = snapshot
+        return snapshot
@@ -0,0 +1,250 @@
+# gait.py
+"""Streaming gait-cycle detection for each foot.
+
+A GaitTracker follows one sock's frames through a two-phase state machine,
+driven by the summed load of the "heel" and "toe" regions of the
+classification rules in use (the built-in ones if a rules file leaves them
+out). A reloaded rules file is picked up on the next frame:
+
+    swing  --(heel or toe load >= contact_on)-->  stance   "heel_strike"
+    stance --(heel and toe load < contact_off)--> swing    "toe_off"
+
+The gap between the two thresholds is hysteresis. A phase must also last
+``min_phase`` seconds before it can end, so noise never registers as a step.
+A stride runs from one heel strike to the next of the same foot. Its stance
+time runs from heel strike to toe off, and its swing time from toe off to
+the next heel strike. Cadence is reported in steps per minute for both feet
+(two steps per stride).
+
+The feet of one subject share a GaitGroup. It measures double support, the
+periods when two or more of its feet are in stance at once. A tracker
+without a group reports no double support.
+
+All metrics are means over the last ``window`` cycles, kept as running
+sums. Every frame costs two C-level region sums and a few comparisons,
+with no per-frame work that grows with the history. Cycles longer than
+MAX_CYCLE seconds (the wearer stopped or sat down) are not counted.
+"""
+import threading
+from collections import deque
+from operator import itemgetter
+
+from classify import DEFAULT_CONFIG, active_rules, parse_sensors
+
+HEEL_REGION = "heel"
+TOE_REGION = "toe"
+# Built-in regions, for rules that do not define them
+HEEL_SENSORS = parse_sensors(DEFAULT_CONFIG["regions"][HEEL_REGION])
+TOE_SENSORS = parse_sensors(DEFAULT_CONFIG["regions"][TOE_REGION])
+CONTACT_ON = 40  # Mean region value at which the region is loaded
+CONTACT_OFF = 20  # Mean region value below which it is unloaded again
+MIN_PHASE = 0.08  # Seconds a stance or swing phase lasts at least
+MAX_CYCLE = 3.0  # Longer strides, stances or swings are pauses, not walking
+WINDOW = 8  # Gait cycles in the rolling means
+
+
+class RollingMean:
+    """Mean of the last ``size`` values, updated in O(1)"""
+
+    def __init__(self, size=WINDOW):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def clear(self):
+        self.values.clear()
+        self.total = 0.0
+
+    @property
+    def mean(self):
+        return self.total / len(self.values) if self.values else None
+
+
+def _rounded(value, digits=3):
+    return None if value is None else round(value, digits)
+
+
+def _region_sum(sensors):
+    """Fast ``values -> summed load`` of 1-based sensor numbers"""
+    if len(sensors) == 1:
+        index = sensors[0] - 1
+        return lambda values: values[index]
+    getter = itemgetter(*(sensor - 1 for sensor in sensors))
+    return lambda values: sum(getter(values))
+
+
+class GaitGroup:
+    """The feet of one subject, for double support; shared by their trackers"""
+
+    def __init__(self, subject, window=WINDOW):
+        self.subject = subject
+        self.double_support = RollingMean(window)
+        self._stance = set()  # Feet in stance
+        self._double_since = None
+        self._lock = threading.Lock()
+
+    def stance_start(self, foot, timestamp):
+        with self._lock:
+            self._stance.add(foot)
+            if len(self._stance) >= 2 and self._double_since is None:
+                self._double_since = timestamp
+
+    def stance_end(self, foot, timestamp):
+        with self._lock:
+            self._stance.discard(foot)
+            if len(self._stance) < 2 and self._double_since is not None:
+                period = timestamp - self._double_since
+                self._double_since = None
+                if 0 <= period <= MAX_CYCLE:
+                    self.double_support.add(period)
+
+    def leave(self, foot):
+        """Forget a foot that stopped streaming, without ending a period"""
+        with self._lock:
+            self._stance.discard(foot)
+            if len(self._stance) < 2:
+                self._double_since = None
+
+
+class GaitTracker:
+    """Gait-cycle state machine of one foot; updated by the thread that
+    publishes its frames.
+
+    The heel and toe sensors come from ``rules``, or with None from the
+    active rules as they are reloaded; ``heel`` and ``toe`` fix them instead.
+    """
+
+    def __init__(self, foot, group=None, rules=None, heel=None, toe=None, contact_on=CONTACT_ON,
+                 contact_off=CONTACT_OFF, min_phase=MIN_PHASE, window=WINDOW):
+        self.foot = foot  # Name of this foot in its group (the device id)
+        self.group = group
+        self.rules = rules
+        self.heel = heel
+        self.toe = toe
+        self.contact_on = contact_on
+        self.contact_off = contact_off
+        self.min_phase = min_phase
+        self._rules = None  # RuleSet the region sums were built from
+        self._use_regions(rules or active_rules())
+        self.stride = RollingMean(window)
+        self.stance = RollingMean(window)
+        self.swing = RollingMean(window)
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when a replay jumps back in time"""
+        if self.group is not None:
+            self.group.leave(self.foot)
+        self.phase = None  # "stance" or "swing" once the first frame is in
+        self.phase_since = None
+        self.last_time = None
+        self.last_strike = None
+        self.last_toe_off = None
+        self.contact = None  # Region that touched down first at the last strike
+        self.steps = 0
+        self.stride.clear()
+        self.stance.clear()
+        self.swing.clear()
+
+    def _use_regions(self, rules):
+        heel = self.heel or rules.regions.get(HEEL_REGION) or HEEL_SENSORS
+        toe = self.toe or rules.regions.get(TOE_REGION) or TOE_SENSORS
+        self._heel = _region_sum(heel)
+        self._toe = _region_sum(toe)
+        # Thresholds on the region sums, so no division per frame
+        self._heel_on = self.contact_on * len(heel)
+        self._heel_off = self.contact_off * len(heel)
+        self._toe_on = self.contact_on * len(toe)
+        self._toe_off = self.contact_off * len(toe)
+        self._rules = rules
+
+    def join(self, group):
+        """Move this foot to another subject's group"""
+        if self.group is not None:
+            self.group.leave(self.foot)
+        self.group = group
+        if group is not None and self.phase == "stance":
+            group.stance_start(self.foot, self.last_time)
+
+    def leave(self):
+        if self.group is not None:
+            self.group.leave(self.foot)
+
+    def _enter(self, phase, timestamp):
+        self.phase = phase
+        self.phase_since = timestamp
+        if self.group is not None:
+            if phase == "stance":
+                self.group.stance_start(self.foot, timestamp)
+            else:
+                self.group.stance_end(self.foot, timestamp)
+
+    def update(self, values, timestamp):
+        """Feed one frame; returns "heel_strike", "toe_off" or None"""
+        rules = self.rules or active_rules()
+        if rules is not self._rules:
+            self._use_regions(rules)
+        if self.last_time is not None and timestamp < self.last_time:
+            self.reset()
+        self.last_time = timestamp
+        heel = self._heel(values)
+        toe = self._toe(values)
+
+        if self.phase == "stance":
+            if (heel < self._heel_off and toe < self._toe_off
+                    and timestamp - self.phase_since >= self.min_phase):
+                if self.last_strike is not None and timestamp - self.last_strike <= MAX_CYCLE:
+                    self.stance.add(timestamp - self.last_strike)
+                self.last_toe_off = timestamp
+                self._enter("swing", timestamp)
+                return "toe_off"
+            return None
+
+        if heel >= self._heel_on or toe >= self._toe_on:
+            if self.phase is None:
+                # Already standing on the first frame: no strike to time from
+                self._enter("stance", timestamp)
+                return None
+            if timestamp - self.phase_since < self.min_phase:
+                return None
+            if self.last_strike is not None:
+                stride = timestamp - self.last_strike
+                if stride <= MAX_CYCLE:
+                    self.stride.add(stride)
+                if self.last_toe_off is not None and self.last_toe_off > self.last_strike:
+                    swing = timestamp - self.last_toe_off
+                    if swing <= MAX_CYCLE:
+                        self.swing.add(swing)
+            self.contact = "heel" if heel >= self._heel_on else "toe"
+            self.last_strike = timestamp
+            self.steps += 1
+            self._enter("stance", timestamp)
+            return "heel_strike"
+
+        if self.phase is None:
+            self._enter("swing", timestamp)
+        return None
+
+    def summary(self):
+        stride = self.stride.mean
+        return {
+            "subject": None if self.group is None else self.group.subject,
+            "phase": self.phase,
+            "steps": self.steps,
+            "contact": self.contact,
+            "cadence": None if not stride else round(120.0 / stride, 1),
+            "stride_time": _rounded(stride),
+            "stance_time": _rounded(self.stance.mean),
+            "swing_time": _rounded(self.swing.mean),
+            "double_support_time": None if self.group is None else _rounded(self.group.double_support.mean),
+            "last_heel_strike": self.last_strike,
+            "last_toe_off": self.last_toe_off
+        }
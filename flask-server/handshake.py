@@ -0,0 +1,159 @@
+# handshake.py
+"""Baud rate negotiation between the server and the sock firmware.
+
+The sketches start at 9600 baud, which caps the whole system at a few dozen
+binary frames per second. After the ``{"status":"ready"}`` banner the server
+proposes faster rates, highest first:
+
+    server -> {"cmd":"baud","rate":R}         (at 9600)
+    sock   -> {"status":"baud_ack","rate":R}  (at 9600, then both switch to R)
+    server -> {"cmd":"test","count":N}        (at R)
+    sock   -> N binary test frames + {"status":"test_done"}
+    server -> {"cmd":"commit"}                (if the burst was clean enough)
+    sock   -> {"status":"baud_commit","rate":R}
+
+The firmware reverts to 9600 on its own if no commit arrives within
+FIRMWARE_REVERT_SECONDS, so a garbled rate always recovers and the next
+lower rate is tried. Firmware that does not understand the command never
+acks, and the connection simply stays at the base rate.
+
+The sketch only reads commands between the sensor lines it prints, and at
+9600 baud a line takes about half a second to send. So the ack can come
+that much later. The server waits for it at least FIRMWARE_REVERT_SECONDS
+(and two line times), so a late ack is not taken for missing support. A
+firmware that did switch reverts by itself before the next attempt.
+"""
+import json
+import time
+
+import serial
+
+from protocol import NUM_SENSORS, FrameDecoder, encode_json_frame
+
+BASE_BAUD_RATE = 9600
+HANDSHAKE_RATES = (1000000, 500000, 230400, 115200)
+TEST_BURST_FRAMES = 50
+# Highest fraction of the test burst that may be lost or corrupted
+MAX_TEST_ERROR_RATE = 0.02
+# Must match BAUD_REVERT_MS in the sketch
+FIRMWARE_REVERT_SECONDS = 1.5
+# Longest sensor line the firmware prints, and bits per byte on the wire
+SENSOR_LINE_BYTES = len(encode_json_frame([100] * NUM_SENSORS, seq=0xFFFF, device_time=0xFFFFFFFF))
+BITS_PER_BYTE = 10
+
+
+def ack_timeout(base_rate):
+    """Seconds to wait for the baud_ack: the firmware may finish two sensor
+    lines first, and never less than its own revert time"""
+    return max(FIRMWARE_REVERT_SECONDS, 2 * SENSOR_LINE_BYTES * BITS_PER_BYTE / base_rate + 0.1)
+
+
+def test_frame_values(seq):
+    """Known payload of test frame ``seq`` - must match the sketch"""
+    return bytes((seq * 7 + i) % 101 for i in range(NUM_SENSORS))
+
+
+def send_command(ser, **command):
+    ser.write((json.dumps(command, separators=(",", ":")) + "\n").encode("ascii"))
+    ser.flush()
+
+
+def read_messages(ser, decoder, timeout, until=None):
+    """Collect decoded messages for up to ``timeout`` seconds.
+
+    Stops early once ``until(message)`` returns True for a message.
+    """
+    messages = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        chunk = ser.read(ser.in_waiting or 1)
+        if not chunk:
+            continue
+        for message in decoder.feed(chunk):
+            messages.append(message)
+            if until is not None and until(message):
+                return messages, True
+    return messages, False
+
+
+def is_status(status, rate=None):
+    def check(message):
+        kind, _seq, payload, _device_time = message
+        if kind != "json" or not isinstance(payload, dict):
+            return False
+        if payload.get("status") != status:
+            return False
+        return rate is None or payload.get("rate") == rate
+    return check
+
+
+def run_test_burst(ser, count):
+    """Ask for ``count`` test frames and return the fraction lost or corrupted"""
+    decoder = FrameDecoder()
+    send_command(ser, cmd="test", count=count)
+    # Time to transmit the burst at the new rate, plus slack
+    timeout = 0.5 + count * 40 * 10 / ser.baudrate
+    messages, _done = read_messages(ser, decoder, timeout, until=is_status("test_done"))
+    good = sum(
+        1 for kind, seq, payload, _device_time in messages
+        if kind == "binary" and seq < count and payload == test_frame_values(seq)
+    )
+    return 1.0 - min(good, count) / count
+
+
+def negotiate_baud(ser, rates=HANDSHAKE_RATES, burst=TEST_BURST_FRAMES,
+                   max_error_rate=MAX_TEST_ERROR_RATE, ready_timeout=3.0):
+    """Negotiate the fastest working baud rate on an open port.
+
+    Returns ``{"baud_rate", "negotiated", "test_error_rate"}``. The port is
+    left at the returned rate.
+    """
+    base_rate = ser.baudrate
+    saved_timeout = ser.timeout
+    ser.timeout = 0.05
+    result = {"baud_rate": base_rate, "negotiated": False, "test_error_rate": None}
+    decoder = FrameDecoder()
+    try:
+        # Opening the port resets most boards; wait for the banner
+        read_messages(ser, decoder, ready_timeout, until=is_status("ready"))
+
+        for rate in rates:
+            if rate <= base_rate:
+                continue
+            send_command(ser, cmd="baud", rate=rate)
+            ack, nak = is_status("baud_ack", rate), is_status("baud_nak")
+            messages, answered = read_messages(ser, decoder, ack_timeout(base_rate), until=lambda m: ack(m) or nak(m))
+            if answered and nak(messages[-1]):
+                continue
+            if not answered:
+                # Firmware without negotiation support
+                print(f"No baud negotiation from {ser.port}; staying at {base_rate}")
+                break
+
+            try:
+                ser.baudrate = rate
+            except (ValueError, serial.SerialException) as e:
+                # The host driver can't do this rate; the sock will revert
+                print(f"Cannot set {rate} baud on {ser.port}: {e}")
+                error_rate = 1.0
+            else:
+                time.sleep(0.05)
+                ser.reset_input_buffer()
+                error_rate = run_test_burst(ser, burst)
+            if error_rate <= max_error_rate:
+                send_command(ser, cmd="commit")
+                _messages, committed = read_messages(ser, FrameDecoder(), 0.5, until=is_status("baud_commit", rate))
+                if committed:
+                    print(f"Negotiated {rate} baud on {ser.port} (test error rate {error_rate:.1%})")
+                    result.update(baud_rate=rate, negotiated=True, test_error_rate=error_rate)
+                    return result
+            print(f"{rate} baud failed on {ser.port} (test error rate {error_rate:.1%}); falling back")
+
+            # Let the firmware time out and revert, then try the next rate
+            ser.baudrate = base_rate
+            time.sleep(FIRMWARE_REVERT_SECONDS + 0.1)
+            ser.reset_input_buffer()
+            decoder = FrameDecoder()
+        return result
+    finally:
+        ser.timeout = saved_timeout
@@ -0,0 +1,139 @@
+# history.py
+"""Fixed-capacity in-memory history of each device's frames.
+
+Frames are stored in one preallocated row-major uint8 buffer of
+capacity x NUM_SENSORS values (a 2-D time x sensors array, flattened) plus a
+parallel ``array("d")`` of timestamps. Once full, the oldest rows are
+overwritten, so memory is bounded at about ``capacity * (NUM_SENSORS + 8)``
+bytes per device no matter how long it streams.
+
+Queries find their time range by binary search and pull each sensor's column
+straight out of the buffer with a strided slice, so there is no per-frame
+Python object on either the write or the read path. Other downsampling modes
+(see downsample.py) copy the matching rows out under the lock and reduce
+them after releasing it.
+"""
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from downsample import downsample
+from frame import NUM_SENSORS, SENSOR_NAMES
+
+# Frames kept per device: 10 minutes at 100 Hz, about 2.3 MB
+DEFAULT_CAPACITY = int(os.environ.get("SMARTSOCK_HISTORY_FRAMES", 60000))
+DEFAULT_MAX_POINTS = 1000
+
+
+class HistoryBuffer:
+    """Ring buffer of (timestamp, NUM_SENSORS values) rows for one device.
+
+    One writer calls ``append()``; any thread may call ``query()``.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("history capacity must be at least 1")
+        self.capacity = capacity
+        self.values = bytearray(capacity * NUM_SENSORS)
+        self._view = memoryview(self.values)  # Zero-copy slicing for queries
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.head = 0  # Physical row the next frame goes to
+        self.count = 0
+        self.total = 0  # Frames ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        return len(self.values) + self.timestamps.itemsize * self.capacity
+
+    def append(self, values, timestamp):
+        """Store one frame's NUM_SENSORS values (bytes-like)"""
+        with self._lock:
+            row = self.head
+            start = row * NUM_SENSORS
+            self.values[start:start + NUM_SENSORS] = values
+            self.timestamps[row] = timestamp
+            self.head = (row + 1) % self.capacity
+            if self.count < self.capacity:
+                self.count += 1
+            self.total += 1
+
+    def clear(self):
+        with self._lock:
+            self.head = 0
+            self.count = 0
+
+    def _segments(self):
+        """Physical row ranges holding the frames, oldest first"""
+        if self.count < self.capacity:
+            return [(0, self.count)]
+        if self.head == 0:
+            return [(0, self.capacity)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def _find(self, segments, start, end):
+        """Physical row ranges with timestamps in [start, end], oldest first"""
+        times = self.timestamps
+        ranges = []
+        for lo, hi in segments:
+            if start is not None:
+                lo = bisect_left(times, start, lo, hi)
+            if end is not None:
+                hi = bisect_right(times, end, lo, hi)
+            if lo < hi:
+                ranges.append((lo, hi))
+        return ranges
+
+    def query(self, start=None, end=None, max_points=DEFAULT_MAX_POINTS, mode="stride"):
+        """Frames with ``start <= timestamp <= end`` (either bound optional).
+
+        Returns ``{"total", "step", "mode", "timestamps", "values"}`` where
+        ``values`` maps each sensor name to its list of readings. When more
+        than ``max_points`` frames match, they are reduced with ``mode``
+        (see downsample.py): by default every ``step``-th frame is returned.
+        """
+        max_points = max(1, int(max_points))
+        with self._lock:
+            ranges = self._find(self._segments(), start, end)
+            total = sum(hi - lo for lo, hi in ranges)
+            step = max(1, math.ceil(total / max_points))
+            if mode == "stride" or step == 1:
+                result = self._strided(ranges, step)
+            else:
+                timestamps = array("d")
+                values = bytearray()
+                for lo, hi in ranges:
+                    timestamps.extend(self.timestamps[lo:hi])
+                    values += self._view[lo * NUM_SENSORS:hi * NUM_SENSORS]
+                result = None
+        if result is None:
+            result = downsample(timestamps, bytes(values), max_points, mode)
+        result.update(total=total, step=step, mode=mode)
+        return result
+
+    def _strided(self, ranges, step):
+        """Every ``step``-th row of ``ranges``, straight from the buffer"""
+        timestamps = []
+        columns = [[] for _ in range(NUM_SENSORS)]
+        skip = 0  # Rows to skip at the start of the next range to keep the stride
+        for lo, hi in ranges:
+            first = lo + skip
+            if first < hi:
+                timestamps.extend(self.timestamps[first:hi:step])
+                block = self._view[first * NUM_SENSORS:hi * NUM_SENSORS]
+                stride = step * NUM_SENSORS
+                for i in range(NUM_SENSORS):
+                    columns[i].extend(block[i::stride].tolist())
+                taken = (hi - first + step - 1) // step
+                skip = first + taken * step - hi
+            else:
+                skip = first - hi
+        return {
+            "timestamps": timestamps,
+            "values": dict(zip(SENSOR_NAMES, columns))
+        }
@@ -0,0 +1,132 @@
+# link_stats.py
+"""Per-device accounting of lost, duplicated and reordered frames.
+
+The firmware stamps every frame with a 16-bit sequence number and its
+``millis()`` clock. ``SequenceTracker`` compares consecutive frames as they
+arrive and keeps:
+
+- ``lost``: sequence numbers skipped (minus those that turned up late)
+- ``duplicates``: a sequence number seen twice
+- ``reordered``: a frame that arrived after a later one
+- ``resets``: the device rebooted (reset on port open, say). Seen from its
+  clock going backwards, or, for frames without device time, from its
+  sequence number jumping back further than the reorder window. Right after
+  a reconnect any step back counts as a reset
+- ``jitter_ms``: interarrival jitter as in RFC 3550 - the smoothed variation
+  of (host arrival spacing - device send spacing), so a steady transport
+  delay counts as zero and only fluctuations show up
+
+Recent sequence numbers are remembered in a 64-bit bitmap, so telling a late
+frame from a duplicate costs O(1) per frame.
+"""
+
+SEQ_MODULO = 1 << 16
+TIME_MODULO = 1 << 32
+# Sequence numbers behind the newest one that are still tracked individually
+WINDOW = 64
+_WINDOW_MASK = (1 << WINDOW) - 1
+# A device clock jump backwards by more than this is a reboot, not wraparound
+RESET_THRESHOLD_MS = 1000
+
+
+class SequenceTracker:
+    """Gap, duplicate, reorder and jitter counters for one frame stream"""
+
+    def __init__(self):
+        self.received = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+        self.unsequenced = 0  # Frames without a sequence number
+        self.jitter = 0.0  # Seconds
+        self.last_seq = None
+        self.last_device_time = None
+        self.last_rx_time = None
+        self._seen = 0  # Bit i set: sequence number last_seq - i arrived
+        self._reconnected = False
+
+    def reconnected(self):
+        """The port was reopened: a frame behind the last one starts over"""
+        self._reconnected = True
+
+    def update(self, seq, device_time, rx_time):
+        """Account for one frame; returns "ok", "gap", "duplicate", "reordered" or "reset"."""
+        self.received += 1
+        if seq is None:
+            self.unsequenced += 1
+            return "ok"
+
+        if self.last_seq is not None and device_time is not None and self.last_device_time is not None:
+            if device_time + RESET_THRESHOLD_MS < self.last_device_time and seq < WINDOW:
+                # Device restarted: its counters start over
+                self.resets += 1
+                self._restart(seq, device_time, rx_time)
+                return "reset"
+
+        if self.last_seq is None:
+            self._restart(seq, device_time, rx_time)
+            return "ok"
+
+        reconnected = self._reconnected
+        self._reconnected = False
+        ahead = (seq - self.last_seq) % SEQ_MODULO
+        behind = SEQ_MODULO - ahead
+        old = behind <= SEQ_MODULO // 2  # Not after the newest frame
+        if (reconnected and (old or ahead == 0)) or (old and behind >= WINDOW):
+            # Too far back to be a late frame: the device counts from 0 again
+            self.resets += 1
+            self._restart(seq, device_time, rx_time)
+            return "reset"
+        if ahead == 0:
+            self.duplicates += 1
+            return "duplicate"
+        if ahead < SEQ_MODULO // 2:
+            result = "ok"
+            if ahead > 1:
+                self.lost += ahead - 1
+                result = "gap"
+            self._seen = ((self._seen << ahead) | 1) & _WINDOW_MASK if ahead < WINDOW else 1
+            self._update_jitter(device_time, rx_time)
+            self.last_seq = seq
+            return result
+
+        # Just behind the newest frame: late arrival or a repeat
+        bit = 1 << behind
+        if self._seen & bit:
+            self.duplicates += 1
+            return "duplicate"
+        self._seen |= bit
+        if self.lost > 0:
+            self.lost -= 1
+        self.reordered += 1
+        return "reordered"
+
+    def _restart(self, seq, device_time, rx_time):
+        self.last_seq = seq
+        self.last_device_time = device_time
+        self.last_rx_time = rx_time
+        self._seen = 1
+
+    def _update_jitter(self, device_time, rx_time):
+        if device_time is not None and self.last_device_time is not None and rx_time is not None:
+            sent_delta = ((device_time - self.last_device_time) % TIME_MODULO) / 1000.0
+            transit_delta = (rx_time - self.last_rx_time) - sent_delta
+            self.jitter += (abs(transit_delta) - self.jitter) / 16
+        self.last_device_time = device_time
+        self.last_rx_time = rx_time
+
+    def summary(self):
+        expected = self.received - self.duplicates + self.lost
+        return {
+            "received": self.received,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+            "resets": self.resets,
+            "unsequenced": self.unsequenced,
+            "loss_rate": self.lost / expected if expected > 0 else 0.0,
+            "jitter_ms": round(self.jitter * 1000, 3),
+            "last_seq": self.last_seq,
+            "last_device_time": self.last_device_time
+        }
@@ -0,0 +1,99 @@
+# port_watcher.py
+"""Background serial port discovery.
+
+``serial.tools.list_ports.comports()`` can take hundreds of milliseconds on a
+machine with many USB-serial adapters. PortWatcher runs it on its own thread,
+keeps the latest result as an immutable snapshot and diffs consecutive scans
+to detect plugged and unplugged devices. Request handlers read the snapshot
+without ever touching the OS or waiting for a scan in progress: the lock is
+only held to swap in a finished scan.
+"""
+import threading
+import time
+
+import serial.tools.list_ports
+
+DEFAULT_INTERVAL = 1.0
+
+
+def scan_ports():
+    """List serial ports as plain dicts, sorted by device name"""
+    ports = []
+    try:
+        for port in serial.tools.list_ports.comports():
+            ports.append({
+                "device": port.device,
+                "description": port.description
+            })
+    except Exception as e:
+        print(f"Error listing ports: {e}")
+    ports.sort(key=lambda p: p["device"])
+    return tuple(ports)
+
+
+class PortWatcher:
+    """Keeps a cached port table up to date and reports changes.
+
+    ``on_change(ports, added, removed)`` is called from the watcher thread
+    whenever a scan differs from the previous one.
+    """
+
+    def __init__(self, on_change=None, interval=DEFAULT_INTERVAL, scan=scan_ports):
+        self.on_change = on_change
+        self.interval = interval
+        self.scan = scan
+        self.thread = None
+        self.stopping = False
+        self.last_scan_time = None
+        self._ports = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()  # Guards _ports and last_scan_time
+        self._thread_lock = threading.Lock()
+
+    def start(self):
+        with self._thread_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, daemon=True, name="port-watcher")
+            self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self._wake.set()
+
+    def ports(self):
+        """The cached port table; scans synchronously only before the first scan"""
+        ports = self._ports
+        if ports is None:
+            ports = self.refresh()
+        return ports
+
+    def refresh(self):
+        """Rescan now, update the cache and report any change"""
+        ports = self.scan()
+        with self._lock:
+            previous = self._ports
+            self._ports = ports
+            self.last_scan_time = time.time()
+        if previous is not None and ports != previous:
+            old = {p["device"] for p in previous}
+            new = {p["device"] for p in ports}
+            added = [p for p in ports if p["device"] not in old]
+            removed = [p for p in previous if p["device"] not in new]
+            if added:
+                print(f"Serial ports added: {', '.join(p['device'] for p in added)}")
+            if removed:
+                print(f"Serial ports removed: {', '.join(p['device'] for p in removed)}")
+            if self.on_change:
+                self.on_change(ports, added, removed)
+        return ports
+
+    def _run(self):
+        while not self.stopping:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error in port watcher: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
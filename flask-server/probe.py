@@ -0,0 +1,69 @@
+# probe.py
+"""Parallel auto-discovery of socks on serial ports.
+
+Every candidate port is opened at the same time on its own worker with a
+short read timeout, and listened to until it shows the ``{"status":"ready"}``
+banner or a valid sensor frame (binary or JSON), or the probe window ends.
+Probing a rack of devices therefore takes one window instead of one manual
+connect attempt per port.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from protocol import FrameDecoder
+
+# Opening a port resets most Arduinos; the banner follows about 1.5 s later
+DEFAULT_PROBE_TIMEOUT = 2.5
+# Probe windows accepted from API callers; longer ones tie up the workers
+MIN_PROBE_TIMEOUT = 0.1
+MAX_PROBE_TIMEOUT = 10.0
+MAX_PROBE_WORKERS = 32
+
+
+def classify_message(message):
+    """Return why a decoded message identifies a sock, or None"""
+    kind, _seq, payload, _device_time = message
+    if kind != "json":
+        return f"{kind} frame"
+    if isinstance(payload, dict):
+        if payload.get("status") == "ready":
+            return "ready banner"
+        if any(key.startswith("sensor_") for key in payload):
+            return "json frame"
+    return None
+
+
+def probe_port(port, baud_rate=9600, timeout=DEFAULT_PROBE_TIMEOUT):
+    """Listen on one port and report whether a sock is talking on it"""
+    started = time.time()
+    result = {"port": port, "is_sock": False, "evidence": None, "error": None, "elapsed": None}
+    try:
+        with serial.Serial(port, baud_rate, timeout=0.05) as ser:
+            decoder = FrameDecoder()
+            deadline = started + timeout
+            while time.time() < deadline and not result["is_sock"]:
+                chunk = ser.read(ser.in_waiting or 1)
+                if not chunk:
+                    continue
+                for message in decoder.feed(chunk):
+                    evidence = classify_message(message)
+                    if evidence:
+                        result["is_sock"] = True
+                        result["evidence"] = evidence
+                        break
+    except (serial.SerialException, OSError, ValueError) as e:
+        result["error"] = str(e)
+    result["elapsed"] = round(time.time() - started, 3)
+    return result
+
+
+def probe_ports(ports, baud_rate=9600, timeout=DEFAULT_PROBE_TIMEOUT):
+    """Probe every port concurrently; results are in the order given"""
+    ports = list(ports)
+    if not ports:
+        return []
+    workers = min(len(ports), MAX_PROBE_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe") as pool:
+        return list(pool.map(lambda port: probe_port(port, baud_rate, timeout), ports))
@@ -0,0 +1,223 @@
+# protocol.py
+"""Serial wire formats spoken by the sock firmware.
+
+Two formats can share the same serial line:
+
+- JSON lines: one ``{"sensor_1":v,...,"sensor_30":v}`` object per line, as
+  printed by the original sketches (also used for ``{"status":"ready"}``).
+  Current firmware appends ``"seq":n,"t":ms`` (sequence number and
+  ``millis()``). Lines in exactly that layout, with or without the suffix,
+  take a specialised fast path (``parse_sensor_line``); anything else goes
+  through ``json.loads``.
+- Binary frames: a fixed-size record that carries the same 30 values in a
+  fraction of the bytes, so the sock can stream far faster at the same baud.
+
+Binary frame layout (little-endian, 41 bytes):
+
+    offset  size  field
+    0       2     sync word 0xAA 0x55
+    2       1     version (BINARY_VERSION)
+    3       2     sequence number (uint16, wraps)
+    5       4     device time, ``millis()`` (uint32, wraps)
+    9       30    sensor values, one uint8 each (sensor_1 .. sensor_30)
+    39      2     CRC-16/CCITT-FALSE over bytes 2..38
+
+Version 1 frames (37 bytes, no device time) from older firmware are still
+accepted.
+
+The sync byte 0xAA is never valid inside an ASCII JSON line, so the decoder
+can tell the two formats apart byte by byte and resynchronise after noise.
+"""
+import binascii
+import json
+import re
+import struct
+
+NUM_SENSORS = 30
+
+SYNC = b"\xaa\x55"
+BINARY_VERSION = 2
+# version, seq, device time, 30 values
+_BODY = struct.Struct(f"<BHI{NUM_SENSORS}s")
+# version, seq, 30 values
+_BODY_V1 = struct.Struct(f"<BH{NUM_SENSORS}s")
+_CRC = struct.Struct("<H")
+BINARY_FRAME_SIZE = len(SYNC) + _BODY.size + _CRC.size
+
+# Longest text line we are willing to buffer before assuming garbage
+MAX_LINE_LENGTH = 1024
+
+# The exact line the firmware prints: {"sensor_1":v,...,"sensor_30":v[,"seq":n,"t":ms]}
+_SENSOR_LINE = re.compile(
+    rb'\{"sensor_1":(\d{1,3})'
+    + b"".join(rb',"sensor_%d":(\d{1,3})' % i for i in range(2, NUM_SENSORS + 1))
+    + rb'(?:,"seq":(\d{1,5}),"t":(\d{1,10}))?\}'
+)
+# Digit strings -> int; a dict lookup is several times cheaper than int()
+_DIGITS = {b"%d" % i: i for i in range(256)}
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) - same as the firmware."""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(seq, values, device_time=None):
+    """Build one binary frame from a sequence number and 30 sensor values.
+
+    Values are clamped to 0-255; the sensors report 0-100. ``device_time``
+    is the sender's ``millis()``; without it a version 1 frame is built.
+    """
+    payload = bytes(max(0, min(255, int(v))) for v in values)
+    if len(payload) != NUM_SENSORS:
+        raise ValueError(f"expected {NUM_SENSORS} sensor values, got {len(payload)}")
+    if device_time is None:
+        body = _BODY_V1.pack(1, seq & 0xFFFF, payload)
+    else:
+        body = _BODY.pack(BINARY_VERSION, seq & 0xFFFF, device_time & 0xFFFFFFFF, payload)
+    return SYNC + body + _CRC.pack(crc16(body))
+
+
+def encode_json_frame(values, seq=None, device_time=None):
+    """Build one JSON line in the format printed by the sketches."""
+    fields = ",".join(f'"sensor_{i}":{int(v)}' for i, v in enumerate(values, start=1))
+    if seq is not None:
+        fields += f',"seq":{seq & 0xFFFF},"t":{(device_time or 0) & 0xFFFFFFFF}'
+    return ("{" + fields + "}\n").encode("ascii")
+
+
+def parse_sensor_line(line, out):
+    """Parse a firmware sensor line straight into a preallocated buffer.
+
+    ``out`` is a writable buffer of NUM_SENSORS uint8 slots (a ``bytearray``).
+    Returns the line's ``(seq, device_time)`` (both None when the firmware
+    doesn't send them) on success, or None if the line is not in the exact
+    firmware layout (other keys, whitespace, values above 255...), in which
+    case the caller should fall back to ``json.loads``.
+    """
+    match = _SENSOR_LINE.fullmatch(line)
+    if match is None:
+        return None
+    groups = match.groups()
+    try:
+        out[:NUM_SENSORS] = map(_DIGITS.__getitem__, groups[:NUM_SENSORS])
+    except KeyError:
+        return None
+    seq, device_time = groups[NUM_SENSORS:]
+    if seq is None:
+        return (None, None)
+    return (int(seq), int(device_time))
+
+
+class FrameDecoder:
+    """Incremental decoder for a byte stream mixing binary frames and JSON lines.
+
+    ``feed()`` accepts any chunk of bytes and returns the complete messages it
+    contains; incomplete data is kept until the next call. Each message is a
+    ``(kind, seq, payload, device_time)`` tuple:
+
+    - ``("binary", seq, values, device_time)`` where ``values`` is a 30-byte
+      ``bytes``
+    - ``("sensors", seq, values, device_time)`` for a standard firmware JSON
+      line, decoded by the fast path into the same 30-byte form
+    - ``("json", None, obj, None)`` for any other parseable JSON line
+
+    ``seq`` and ``device_time`` (the sock's ``millis()``) are None when the
+    firmware doesn't send them.
+
+    Readers that manage their own receive buffer call ``scan()`` directly.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.values = bytearray(NUM_SENSORS)  # fast-path scratch
+        self.frames = 0
+        self.crc_errors = 0
+        self.parse_errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        messages, consumed = self.scan(self.buffer, 0, len(self.buffer))
+        del self.buffer[:consumed]
+        return [message[:4] for message in messages]
+
+    def scan(self, buf, pos, end):
+        """Decode every complete message in ``buf[pos:end]``.
+
+        Returns ``(messages, consumed)`` where each message is a
+        ``(kind, seq, payload, device_time, end_offset)`` tuple -
+        ``end_offset`` is the buffer index just past the message - and
+        ``consumed`` is the index up to which the buffer can be discarded.
+        """
+        messages = []
+        # Position of the next 0xAA byte; cached so text lines don't rescan the buffer
+        next_sync = -1
+        while pos < end:
+            if buf[pos] == 0xAA:
+                if end - pos < 2:
+                    break
+                if buf[pos + 1] != 0x55:
+                    pos += 1
+                    continue
+                if end - pos < 3:
+                    break
+                body_struct = _BODY if buf[pos + 2] != 1 else _BODY_V1
+                size = len(SYNC) + body_struct.size + _CRC.size
+                if end - pos < size:
+                    break
+                body = bytes(buf[pos + 2:pos + 2 + body_struct.size])
+                (crc,) = _CRC.unpack_from(buf, pos + 2 + body_struct.size)
+                if body[0] not in (1, BINARY_VERSION) or crc16(body) != crc:
+                    # Not a real frame (or corrupted) - skip the sync byte and rescan
+                    self.crc_errors += 1
+                    pos += 1
+                    continue
+                if body_struct is _BODY:
+                    _version, seq, device_time, values = _BODY.unpack(body)
+                else:
+                    _version, seq, values = _BODY_V1.unpack(body)
+                    device_time = None
+                pos += size
+                messages.append(("binary", seq, values, device_time, pos))
+                self.frames += 1
+                continue
+
+            # Text line: runs until newline, or until a sync byte interrupts it
+            if next_sync < pos:
+                next_sync = buf.find(b"\xaa", pos, end)
+                if next_sync == -1:
+                    next_sync = end
+            newline = buf.find(b"\n", pos, end)
+            if next_sync < end and (newline == -1 or next_sync < newline):
+                # Partial line cut off by a binary frame - drop it. Leftovers
+                # of a corrupted binary frame were already counted as a CRC error.
+                if buf[pos:next_sync].strip().startswith(b"{"):
+                    self.parse_errors += 1
+                pos = next_sync
+                continue
+            if newline == -1:
+                if end - pos > MAX_LINE_LENGTH:
+                    self.parse_errors += 1
+                    pos = end
+                break
+            line = bytes(buf[pos:newline]).strip()
+            pos = newline + 1
+            if not line:
+                continue
+            parsed = parse_sensor_line(line, self.values)
+            if parsed is not None:
+                seq, device_time = parsed
+                messages.append(("sensors", seq, bytes(self.values), device_time, pos))
+                self.frames += 1
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                # Text that isn't JSON is worth reporting; binary noise isn't
+                if line.isascii() and line.decode("ascii").isprintable():
+                    print(f"Could not parse JSON from Arduino: {line!r}")
+                    self.parse_errors += 1
+                continue
+            messages.append(("json", None, obj, None, pos))
+            self.frames += 1
+        return messages, pos
@@ -0,0 +1,819 @@
+# recorder.py
+"""Append-only recording of device frames to memory-mappable segment files.
+
+Each recording is a directory of segments:
+
+    <root>/<device_id>/<recording_id>/segment-000001.ssr, segment-000002.ssr ...
+
+A segment is a small header followed by its records. Raw segments hold
+fixed-width records, so record ``i`` lives at ``header_size + i * record_size``
+and a reader can ``mmap`` the file and jump or scan without parsing
+anything. Delta segments (the default, SMARTSOCK_RECORD_CODEC=delta) hold
+the same frames encoded by codec.py, from 7 bytes for an unchanged frame
+to 43 for a keyframe, with a keyframe at every index entry so a reader decodes at most one block of
+INDEX_INTERVAL records to reach any frame. Segments rotate when they reach
+``max_bytes`` or ``max_seconds``, so no file grows without bound and a crash
+loses at most the unflushed tail of one segment.
+
+Segment layout (little-endian):
+
+    header, HEADER_SIZE bytes
+        0   8   magic b"SSOCKREC"
+        8   2   format version
+        10  2   header size
+        12  2   record size (0 when records vary in size)
+        14  2   number of sensors
+        16  1   value type, struct code ("B" = uint8)
+        17  1   codec (0 = raw fixed-width records, 1 = codec.py delta frames)
+        18  6   reserved
+        24  8   created, Unix time (double)
+        32  32  device id, UTF-8, NUL padded
+    raw records, RECORD_SIZE bytes each
+        0   8   timestamp, Unix time (double)
+        8   4   sequence number (uint32, NO_SEQ when the device sends none)
+        12  30  sensor_1 .. sensor_30 (uint8)
+
+Frames are handed over through a queue and written by the recorder's own
+thread, so the ingestion path never waits on the disk.
+
+Next to each segment, a sparse index (``segment-000001.idx``) holds the
+timestamp, record number and byte offset of every INDEX_INTERVAL-th record,
+so finding a time only has to binary-search one small block of the segment.
+Each recording also keeps ``catalog.json`` with every segment's frame count,
+time bounds and size, so a range read opens only the segments it needs and
+listing recordings opens none. Both are written when a segment is closed;
+a segment found without an up-to-date index or catalog entry (left by a
+crash) is scanned and the file rebuilt. Segments this process is still
+writing are left out of catalogs, listings, exports and replays until they
+are closed, so readers never scan or index a file that is still growing.
+
+Index layout (little-endian):
+
+    header, 24 bytes
+        0   8   magic b"SSOCKIDX"
+        8   2   index version
+        10  2   interval, records between entries
+        12  4   records covered
+        16  8   segment bytes covered
+    entries, 20 bytes each
+        0   8   timestamp of the record (double)
+        8   4   record number
+        12  8   byte offset of the record in the segment
+"""
+import json
+import mmap
+import os
+import queue
+import re
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from codec import DeltaDecoder, DeltaEncoder
+from frame import NUM_SENSORS
+
+MAGIC = b"SSOCKREC"
+FORMAT_VERSION = 1
+CODEC_RAW = 0
+CODEC_DELTA = 1
+CODECS = {"raw": CODEC_RAW, "delta": CODEC_DELTA}
+SEGMENT_SUFFIX = ".ssr"
+NO_SEQ = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<8sHHHHcB6xd32s")
+HEADER_SIZE = 64
+_RECORD = struct.Struct(f"<dI{NUM_SENSORS}s")
+RECORD_SIZE = _RECORD.size
+_TIMESTAMP = struct.Struct("<d")
+
+INDEX_MAGIC = b"SSOCKIDX"
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx"
+INDEX_INTERVAL = 256
+_INDEX_HEADER = struct.Struct("<8sHHIQ")
+_INDEX_ENTRY = struct.Struct("<dIQ")
+CATALOG_NAME = "catalog.json"
+
+RECORD_DIR = os.environ.get("SMARTSOCK_RECORD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings"))
+RECORD_CODEC = os.environ.get("SMARTSOCK_RECORD_CODEC", "delta")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_SECONDS = 3600.0
+FLUSH_INTERVAL = 0.5
+
+# Real paths of the segments open in a SegmentWriter
+_writing = set()
+
+
+def segment_name(index):
+    return f"segment-{index:06d}{SEGMENT_SUFFIX}"
+
+
+def safe_name(name):
+    """Make a device id usable as a directory name"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "-", name).lstrip(".") or "device"
+
+
+def recording_id(timestamp=None):
+    return time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp or time.time()))
+
+
+def index_path(segment_path):
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def write_atomic(path, data):
+    """Replace ``path`` with ``data`` so readers never see a partial file"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SegmentIndex:
+    """Sparse index of one segment: timestamp, record number and byte offset
+    of every ``interval``-th record"""
+
+    def __init__(self, interval=INDEX_INTERVAL):
+        self.interval = interval
+        self.frames = 0  # Records covered
+        self.size = 0  # Segment bytes covered, header included
+        self.times = array("d")
+        self.records = array("I")
+        self.offsets = array("Q")
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, timestamp, record, offset):
+        self.times.append(timestamp)
+        self.records.append(record)
+        self.offsets.append(offset)
+
+    def block(self, timestamp, count, side=bisect_left):
+        """Records ``(lo, hi)`` that a ``side`` bisect for ``timestamp`` must land in"""
+        i = side(self.times, timestamp)
+        lo = self.records[i - 1] if i else 0
+        hi = self.records[i] if i < len(self.records) else count
+        return lo, hi
+
+    def to_bytes(self):
+        parts = [_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.interval, self.frames, self.size)]
+        parts.extend(_INDEX_ENTRY.pack(*entry) for entry in zip(self.times, self.records, self.offsets))
+        return b"".join(parts)
+
+    def save(self, path):
+        write_atomic(path, self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """The index stored at ``path``, or None if missing or unreadable"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _INDEX_HEADER.size:
+            return None
+        magic, version, interval, frames, size = _INDEX_HEADER.unpack_from(data)
+        if (magic != INDEX_MAGIC or version != INDEX_VERSION or not interval
+                or (len(data) - _INDEX_HEADER.size) % _INDEX_ENTRY.size):
+            return None
+        index = cls(interval)
+        index.frames = frames
+        index.size = size
+        for entry in _INDEX_ENTRY.iter_unpack(memoryview(data)[_INDEX_HEADER.size:]):
+            index.add(*entry)
+        return index
+
+    @classmethod
+    def build(cls, reader, interval=INDEX_INTERVAL):
+        """Index a raw segment by reading every ``interval``-th timestamp"""
+        index = cls(interval)
+        for record in range(0, reader.count, interval):
+            index.add(reader.timestamp(record), record, reader.offset(record))
+        index.frames = reader.count
+        index.size = reader.offset(reader.count)
+        return index
+
+
+class SegmentWriter:
+    """Writes one segment file: header, then one record per frame"""
+
+    def __init__(self, path, device_id, created=None, codec=CODEC_RAW):
+        self.path = path
+        self.created = created if created is not None else time.time()
+        self.codec = codec
+        # Every index entry is a keyframe, so the encoder adds no others
+        self.encoder = DeltaEncoder(keyframe_interval=0) if codec == CODEC_DELTA else None
+        self.file = open(path, "xb")
+        _writing.add(os.path.realpath(path))
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, HEADER_SIZE, RECORD_SIZE if codec == CODEC_RAW else 0, NUM_SENSORS, b"B",
+            codec, self.created, device_id.encode("utf-8")[:32]
+        )
+        self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.size = HEADER_SIZE
+        self.frames = 0
+        self.first_time = None
+        self.last_time = None
+        self.index = SegmentIndex()
+
+    def append(self, timestamp, seq, values):
+        indexed = self.frames % self.index.interval == 0
+        if indexed:
+            self.index.add(timestamp, self.frames, self.size)
+        if self.encoder is None:
+            data = _RECORD.pack(timestamp, NO_SEQ if seq is None else seq, values)
+        else:
+            data = self.encoder.encode(timestamp, seq, values, keyframe=indexed)
+        self.file.write(data)
+        self.size += len(data)
+        self.frames += 1
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        """Close the file and write its index; returns its catalog entry"""
+        if not self.file.closed:
+            self.file.close()
+            self.index.frames = self.frames
+            self.index.size = self.size
+            try:
+                self.index.save(index_path(self.path))
+            except OSError as e:
+                print(f"Error writing index of {self.path}: {e}")
+            _writing.discard(os.path.realpath(self.path))
+        return self.catalog_entry()
+
+    def catalog_entry(self):
+        return {
+            "segment": os.path.basename(self.path),
+            "frames": self.frames,
+            "start": self.first_time,
+            "end": self.last_time,
+            "size": self.size
+        }
+
+
+class DeviceRecording:
+    """One recording of one device, split into rotating segments"""
+
+    def __init__(self, root, device_id, max_bytes=DEFAULT_MAX_BYTES, max_seconds=DEFAULT_MAX_SECONDS,
+                 codec=CODEC_RAW):
+        self.device_id = device_id
+        self.codec = codec
+        self.recording_id = recording_id()
+        device_dir = os.path.join(root, safe_name(device_id))
+        self.path = os.path.join(device_dir, self.recording_id)
+        suffix = 2
+        while os.path.exists(self.path):
+            # Two recordings started within the same second
+            self.path = os.path.join(device_dir, f"{self.recording_id}-{suffix}")
+            suffix += 1
+        self.recording_id = os.path.basename(self.path)
+        os.makedirs(self.path)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.segments = 0
+        self.frames = 0
+        self.writer = None
+        self.catalog = {"device_id": device_id, "segments": []}
+
+    def append(self, timestamp, seq, values):
+        writer = self.writer
+        if writer is None or writer.size + RECORD_SIZE > self.max_bytes or (
+                writer.first_time is not None and timestamp - writer.first_time >= self.max_seconds):
+            writer = self._rotate()
+        writer.append(timestamp, seq, values)
+        self.frames += 1
+
+    def _close_writer(self):
+        self.catalog["segments"].append(self.writer.close())
+        try:
+            save_catalog(self.path, self.catalog)
+        except OSError as e:
+            print(f"Error writing catalog of {self.path}: {e}")
+
+    def _rotate(self):
+        if self.writer is not None:
+            self._close_writer()
+        self.segments += 1
+        self.writer = SegmentWriter(
+            os.path.join(self.path, segment_name(self.segments)), self.device_id, codec=self.codec
+        )
+        return self.writer
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer is not None and not self.writer.file.closed:
+            self._close_writer()
+
+
+class Recorder:
+    """Recording sink for the ingestion pipeline.
+
+    ``record(device_id, snapshot)`` is called for every published frame and
+    only enqueues it; recordings are started and stopped per device with
+    ``start()`` and ``stop()``. ``on_change(device_id)`` is called from the
+    recorder thread once a recording has been opened or closed on disk.
+    """
+
+    def __init__(self, root=RECORD_DIR, max_bytes=DEFAULT_MAX_BYTES, max_seconds=DEFAULT_MAX_SECONDS,
+                 flush_interval=FLUSH_INTERVAL, codec=RECORD_CODEC, on_change=None):
+        if codec not in CODECS:
+            raise ValueError(f"unknown recording codec '{codec}', expected one of {', '.join(CODECS)}")
+        self.root = root
+        self.codec = CODECS[codec]
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.flush_interval = flush_interval
+        self.on_change = on_change
+        self.thread = None
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._active = {}  # device_id -> recording path, for callers
+        self._recordings = {}  # device_id -> DeviceRecording, writer thread only
+        self._lock = threading.Lock()
+
+    def start_thread(self):
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True, name="recorder")
+            self.thread.start()
+
+    def start(self, device_id):
+        """Begin a new recording for a device; returns its directory"""
+        self.start_thread()
+        recording = DeviceRecording(self.root, device_id, self.max_bytes, self.max_seconds, self.codec)
+        self._active[device_id] = recording.path
+        self._queue.put(("start", device_id, recording))
+        print(f"Recording {device_id} to {recording.path}")
+        return recording.path
+
+    def stop(self, device_id):
+        """Finish a device's recording; returns its directory or None"""
+        path = self._active.pop(device_id, None)
+        if path is not None:
+            self._queue.put(("stop", device_id, None))
+        return path
+
+    def stop_all(self):
+        for device_id in list(self._active):
+            self.stop(device_id)
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is written to disk"""
+        if not (self.thread and self.thread.is_alive()):
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    def recording_path(self, device_id):
+        return self._active.get(device_id)
+
+    def active(self):
+        return dict(self._active)
+
+    def record(self, device_id, snapshot):
+        if device_id in self._active:
+            self._queue.put(("frame", device_id, snapshot))
+
+    def _run(self):
+        next_flush = time.time() + self.flush_interval
+        while True:
+            try:
+                op, device_id, item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                op = None
+            try:
+                if op == "frame":
+                    recording = self._recordings.get(device_id)
+                    if recording is not None:
+                        recording.append(item.timestamp, item.seq, item.values)
+                elif op == "start":
+                    previous = self._recordings.pop(device_id, None)
+                    if previous is not None:
+                        previous.close()
+                    self._recordings[device_id] = item
+                elif op == "stop":
+                    recording = self._recordings.pop(device_id, None)
+                    if recording is not None:
+                        recording.close()
+                        print(f"Recorded {recording.frames} frames of {device_id} in {recording.segments} segment(s)")
+                elif op == "flush":
+                    try:
+                        for recording in self._recordings.values():
+                            recording.flush()
+                    finally:
+                        item.set()
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                print(f"Error writing recording for {device_id}: {e}")
+            if op in ("start", "stop") and self.on_change:
+                self.on_change(device_id)
+            now = time.time()
+            if now >= next_flush:
+                for recording in self._recordings.values():
+                    try:
+                        recording.flush()
+                    except OSError as e:
+                        print(f"Error flushing recording: {e}")
+                next_flush = now + self.flush_interval
+
+
+class _Timestamps:
+    """Sequence view of a segment's record timestamps, for bisect"""
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def __len__(self):
+        return len(self.segment)
+
+    def __getitem__(self, index):
+        return self.segment.timestamp(index)
+
+
+class SegmentReader:
+    """Read-only, memory-mapped view of one raw segment file.
+
+    Records are read in place from the mapping; a record still being written
+    at the end of the file is ignored. Use ``open_segment()`` to get the
+    right reader for a segment of either codec.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = self.size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise ValueError(f"{path} is too short to be a recording segment")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, header_size, record_size, num_sensors, value_type, codec,
+         created, device_id) = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a recording segment")
+        self.version = version
+        self.header_size = header_size
+        self.record_size = record_size
+        self.num_sensors = num_sensors
+        self.value_type = value_type.decode("ascii")
+        self.codec = codec
+        self.created = created
+        self.device_id = device_id.rstrip(b"\0").decode("utf-8", "replace")
+        self.view = memoryview(self.map)
+        self.index = None
+        try:
+            self._open_records()
+        except BaseException:
+            self.close()
+            raise
+
+    def _open_records(self):
+        if self.codec != CODEC_RAW or not self.record_size:
+            raise ValueError(f"{self.path} uses codec {self.codec}, open it with open_segment()")
+        self.count = (len(self.map) - self.header_size) // self.record_size
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+
+    def offset(self, index):
+        return self.header_size + index * self.record_size
+
+    def timestamp(self, index):
+        return _TIMESTAMP.unpack_from(self.map, self.offset(index))[0]
+
+    def record(self, index):
+        """``(timestamp, seq, values)`` of one record; ``values`` is a memoryview"""
+        offset = self.offset(index)
+        timestamp, seq = struct.unpack_from("<dI", self.map, offset)
+        values = self.view[offset + 12:offset + 12 + self.num_sensors]
+        return timestamp, (None if seq == NO_SEQ else seq), values
+
+    def records(self, start=0, end=None):
+        end = self.count if end is None else min(end, self.count)
+        for index in range(max(0, start), end):
+            yield self.record(index)
+
+    def block(self, start=0, end=None):
+        """Raw bytes of records ``start``..``end`` as a zero-copy memoryview"""
+        end = self.count if end is None else min(end, self.count)
+        return self.view[self.offset(start):self.offset(end)]
+
+    def unpack(self, start=0, end=None):
+        """``(timestamp, seq, values)`` tuples of records ``start``..``end``, unpacked in one pass.
+
+        ``seq`` is NO_SEQ when the device sent none and ``values`` is bytes.
+        """
+        return _RECORD.iter_unpack(self.block(start, end))
+
+    def load_index(self):
+        """The segment's sparse index, from its index file or rebuilt (and
+        saved) if that is missing or does not cover every record"""
+        if self.index is None or self.index.frames != self.count:
+            path = index_path(self.path)
+            index = SegmentIndex.load(path)
+            if index is None or index.frames != self.count:
+                index = SegmentIndex.build(self)
+                try:
+                    index.save(path)
+                except OSError as e:
+                    print(f"Error writing index of {self.path}: {e}")
+            self.index = index
+        return self.index
+
+    def find(self, timestamp):
+        """Index of the first record at or after ``timestamp``.
+
+        The sparse index narrows the search to one block of INDEX_INTERVAL
+        records, which is then binary-searched in the mapping.
+        """
+        lo, hi = self.load_index().block(timestamp, self.count, bisect_left)
+        return bisect_left(_Timestamps(self), timestamp, lo, hi)
+
+    def find_end(self, timestamp):
+        """Index just past the last record at or before ``timestamp``"""
+        lo, hi = self.load_index().block(timestamp, self.count, bisect_right)
+        return bisect_right(_Timestamps(self), timestamp, lo, hi)
+
+    def select(self, start=None, end=None):
+        """Index range ``(lo, hi)`` of the records with ``start <= timestamp <= end``"""
+        lo = 0 if start is None else self.find(start)
+        hi = self.count if end is None else self.find_end(end)
+        return lo, max(lo, hi)
+
+    def time_range(self):
+        if not self.count:
+            return None, None
+        return self.timestamp(0), self.timestamp(self.count - 1)
+
+
+class DeltaSegmentReader(SegmentReader):
+    """Read-only, memory-mapped view of one delta-coded segment file.
+
+    Every sparse index entry is a keyframe, so record ``i`` is found by
+    decoding the block of INDEX_INTERVAL records that starts at entry
+    ``i // INDEX_INTERVAL``; the last few decoded blocks are kept.
+    Everything else behaves as for raw segments.
+    """
+
+    CACHED_BLOCKS = 4
+
+    def _open_records(self):
+        self._blocks = {}
+        self.count = 0
+        self.load_index()
+
+    def load_index(self):
+        """The segment's sparse index, from its index file or rebuilt (and
+        saved) by decoding the part of the segment it does not cover"""
+        if self.index is None or self.index.size != self.size:
+            path = index_path(self.path)
+            index = SegmentIndex.load(path)
+            if index is None or index.size != self.size:
+                index = self._scan(index)
+                try:
+                    index.save(path)
+                except OSError as e:
+                    print(f"Error writing index of {self.path}: {e}")
+            self.index = index
+            self.count = index.frames
+            self._blocks.clear()
+        return self.index
+
+    def _scan(self, index):
+        """Index the segment by decoding it, resuming at the last keyframe
+        of ``index`` if that covers the start of this file"""
+        if index is None or not len(index) or index.size > self.size:
+            index = SegmentIndex()
+            record = 0
+            pos = self.header_size
+        else:
+            record = index.records.pop()
+            pos = index.offsets.pop()
+            index.times.pop()
+        decoder = DeltaDecoder()
+        data = self.map
+        end = len(data)
+        while pos < end:
+            try:
+                timestamp, _, _, next_pos = decoder.decode(data, pos)
+            except (IndexError, ValueError, struct.error):
+                break  # A frame cut short at the end of the file
+            if record % index.interval == 0:
+                index.add(timestamp, record, pos)
+            record += 1
+            pos = next_pos
+        index.frames = record
+        index.size = pos
+        return index
+
+    def _decoded(self, block):
+        """``(timestamps, seqs, values)`` of the records of one index block"""
+        cached = self._blocks.get(block)
+        if cached is None:
+            index = self.index
+            count = min(index.interval, self.count - block * index.interval)
+            timestamps = array("d")
+            seqs = []
+            values = bytearray()
+            decoder = DeltaDecoder()
+            pos = index.offsets[block]
+            for _ in range(count):
+                timestamp, seq, frame, pos = decoder.decode(self.map, pos)
+                timestamps.append(timestamp)
+                seqs.append(seq)
+                values += frame
+            if len(self._blocks) >= self.CACHED_BLOCKS:
+                del self._blocks[next(iter(self._blocks))]
+            cached = self._blocks[block] = (timestamps, seqs, bytes(values))
+        return cached
+
+    def offset(self, index):
+        """Byte offset of the keyframe record ``index`` is decoded from"""
+        return self.index.offsets[index // self.index.interval]
+
+    def timestamp(self, index):
+        interval = self.index.interval
+        return self._decoded(index // interval)[0][index % interval]
+
+    def record(self, index):
+        """``(timestamp, seq, values)`` of one record; ``values`` is a memoryview"""
+        interval = self.index.interval
+        timestamps, seqs, values = self._decoded(index // interval)
+        i = index % interval
+        n = self.num_sensors
+        return timestamps[i], seqs[i], memoryview(values)[i * n:(i + 1) * n]
+
+    def unpack(self, start=0, end=None):
+        """``(timestamp, seq, values)`` tuples of records ``start``..``end``.
+
+        ``seq`` is NO_SEQ when the device sent none and ``values`` is bytes.
+        """
+        end = self.count if end is None else min(end, self.count)
+        interval = self.index.interval
+        n = self.num_sensors
+        index = max(0, start)
+        while index < end:
+            block = index // interval
+            timestamps, seqs, values = self._decoded(block)
+            stop = min(end, (block + 1) * interval)
+            for i in range(index - block * interval, stop - block * interval):
+                seq = seqs[i]
+                yield timestamps[i], NO_SEQ if seq is None else seq, values[i * n:(i + 1) * n]
+            index = stop
+
+    def block(self, start=0, end=None):
+        """Records ``start``..``end`` in the raw record layout (decoded, so a copy)"""
+        return b"".join([_RECORD.pack(*row) for row in self.unpack(start, end)])
+
+
+def open_segment(path):
+    """A reader for the segment at ``path``, whichever codec it was written with"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+    if len(header) == _HEADER.size and header[:len(MAGIC)] == MAGIC and _HEADER.unpack(header)[6] == CODEC_DELTA:
+        return DeltaSegmentReader(path)
+    return SegmentReader(path)
+
+
+def recording_segments(path):
+    """Segment files of a recording directory, in order"""
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def save_catalog(path, catalog):
+    write_atomic(os.path.join(path, CATALOG_NAME), json.dumps(catalog, indent=1).encode("utf-8"))
+
+
+def load_catalog(path):
+    """A recording's saved catalog, or None if missing or unreadable"""
+    try:
+        with open(os.path.join(path, CATALOG_NAME), "rb") as f:
+            catalog = json.loads(f.read())
+        return catalog if isinstance(catalog.get("segments"), list) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def recording_catalog(path):
+    """``{"device_id", "segments"}`` of a recording, one catalog entry per segment.
+
+    Entries come from catalog.json; segments missing from it or whose size
+    changed since are scanned. Segments still open in this process's
+    SegmentWriter are left out and never opened. The catalog is saved again
+    when a segment other than the last one had to be scanned.
+    """
+    catalog = load_catalog(path) or {"device_id": None, "segments": []}
+    known = {entry.get("segment"): entry for entry in catalog["segments"]}
+    device_id = catalog.get("device_id")
+    segment_paths = recording_segments(path)
+    segments = []
+    rebuilt = False
+    writing = False
+    for position, segment_path in enumerate(segment_paths):
+        if _writing and os.path.realpath(segment_path) in _writing:
+            # Still growing; its frames are listed once the writer closes it
+            writing = True
+            continue
+        name = os.path.basename(segment_path)
+        entry = known.get(name)
+        try:
+            size = os.path.getsize(segment_path)
+        except OSError:
+            continue
+        if entry is None or entry.get("size") != size:
+            try:
+                with open_segment(segment_path) as reader:
+                    device_id = device_id or reader.device_id
+                    start, end = reader.time_range()
+                    entry = {"segment": name, "frames": reader.count, "start": start, "end": end, "size": reader.size}
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable segment {segment_path}: {e}")
+                continue
+            rebuilt = rebuilt or position < len(segment_paths) - 1
+        segments.append(entry)
+    catalog = {"device_id": device_id, "segments": segments}
+    # The catalog of a recording in progress belongs to its writer
+    if not writing and (rebuilt or len(known) > len(segments)):
+        try:
+            save_catalog(path, catalog)
+        except OSError as e:
+            print(f"Error writing catalog of {path}: {e}")
+    return catalog
+
+
+def select_segments(path, start=None, end=None):
+    """Paths of the segments of a recording with frames in [start, end], in order"""
+    return [
+        os.path.join(path, entry["segment"])
+        for entry in recording_catalog(path)["segments"]
+        if entry["frames"]
+        and (start is None or entry["end"] >= start)
+        and (end is None or entry["start"] <= end)
+    ]
+
+
+def describe_recording(path):
+    """Device, segments, frame count and time range of a recording directory"""
+    catalog = recording_catalog(path)
+    segments = catalog["segments"]
+    starts = [entry["start"] for entry in segments if entry["frames"]]
+    ends = [entry["end"] for entry in segments if entry["frames"]]
+    return {
+        "recording_id": os.path.basename(path),
+        "device_id": catalog["device_id"] or os.path.basename(os.path.dirname(path)),
+        "path": path,
+        "segments": len(segments),
+        "frames": sum(entry["frames"] for entry in segments),
+        "start": min(starts) if starts else None,
+        "end": max(ends) if ends else None,
+        "size": sum(entry["size"] for entry in segments)
+    }
+
+
+def list_recordings(root=RECORD_DIR):
+    """Every recording under ``root``, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    recordings = []
+    for device_id in sorted(os.listdir(root)):
+        device_dir = os.path.join(root, device_id)
+        if not os.path.isdir(device_dir):
+            continue
+        for name in sorted(os.listdir(device_dir)):
+            path = os.path.join(device_dir, name)
+            if os.path.isdir(path):
+                recordings.append(describe_recording(path))
+    recordings.sort(key=lambda r: r["start"] or 0)
+    return recordings
@@ -0,0 +1,226 @@
+# replay.py
+"""Playback of recorded sessions as if they came from a live device.
+
+A ReplayPlayer walks the segments of one recording (see recorder.py) and
+hands every frame to a ``publish`` callback, which the server points at the
+same pipeline live serial frames go through. Playback runs at the original
+speed, any multiple of it, or as fast as possible ("max"), and can be paused
+and seeked while it runs.
+
+Frames are scheduled against an anchor, ``(wall clock, recording time)``:
+frame ``t`` is due at ``anchor_wall + (t - anchor_time) / speed``. Sleeping
+late for one frame therefore never delays the ones after it, so a long
+replay stays in step with the recording. The anchor is reset whenever the
+speed changes, playback resumes or the position jumps.
+
+Published frames are stamped on a playback timeline that keeps the
+recording's own spacing between frames at any speed, so dwell times,
+heartbeats and gait metrics come out as they were recorded. It starts at
+the wall-clock time of the first frame and never goes back: after a loop or
+seek it carries on one frame after the last, and pauses in the recording
+are shortened to ``max_gap`` as in playback.
+"""
+import threading
+import time
+
+from recorder import open_segment, select_segments
+
+REPLAY_PREFIX = "Replay:"
+# Longer pauses in a recording (e.g. across a reconnect) are shortened to this
+MAX_GAP_SECONDS = 5.0
+# Frame spacing on the playback timeline across a jump, until one is seen
+DEFAULT_FRAME_SPACING = 0.01
+
+
+def parse_speed(value):
+    """A playback speed from an API value: a positive number, or "max" (None)"""
+    if value is None or (isinstance(value, str) and value.lower() == "max"):
+        return None
+    speed = float(value)
+    if not speed > 0:
+        raise ValueError("speed must be a positive number or 'max'")
+    return speed
+
+
+class ReplayPlayer:
+    """Plays one recording directory; control methods may be called from any thread"""
+
+    def __init__(self, path, speed=1.0, loop=False, max_gap=MAX_GAP_SECONDS):
+        self.path = path
+        self.segments = []
+        self.offsets = []  # Index of each segment's first record
+        count = 0
+        for segment_path in select_segments(path):
+            try:
+                segment = open_segment(segment_path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable segment {segment_path}: {e}")
+                continue
+            if not len(segment):
+                segment.close()
+                continue
+            self.segments.append(segment)
+            self.offsets.append(count)
+            count += len(segment)
+        if not count:
+            self.close()
+            raise ValueError(f"{path} has no recorded frames")
+        self.count = count
+        self.start_time = self.segments[0].timestamp(0)
+        last = self.segments[-1]
+        self.end_time = last.timestamp(len(last) - 1)
+        self.speed = speed  # None plays as fast as possible
+        self.loop = loop
+        self.max_gap = max_gap
+        self.paused = False
+        self.finished = False
+        self.position = 0  # Index of the next frame to play
+        self.current_time = None  # Recording time of the last frame played
+        self.frames_played = 0
+        self._seek_time = None  # Recording time to jump to, resolved by run()
+        self._changed = False
+        self._stopping = False
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def _record(self, index):
+        # Segments are few, so a linear scan beats bisect here
+        n = len(self.offsets) - 1
+        while self.offsets[n] > index:
+            n -= 1
+        return self.segments[n].record(index - self.offsets[n])
+
+    def _index_at(self, timestamp):
+        """Index of the first frame at or after recording time ``timestamp``"""
+        for segment, offset in zip(self.segments, self.offsets):
+            if timestamp <= segment.timestamp(len(segment) - 1):
+                return offset + segment.find(timestamp)
+        return self.count
+
+    # Control
+
+    def _notify(self):
+        self._changed = True
+        self._wake.set()
+
+    def set_speed(self, speed):
+        with self._lock:
+            self.speed = speed
+            self._notify()
+
+    def pause(self):
+        with self._lock:
+            self.paused = True
+            self._notify()
+
+    def resume(self):
+        with self._lock:
+            self.paused = False
+            self._notify()
+
+    def seek(self, offset):
+        """Jump to ``offset`` seconds after the start of the recording.
+
+        Only the target time is stored: the segments' block caches are not
+        thread-safe, so the frame index is looked up on the player thread.
+        """
+        with self._lock:
+            self._seek_time = self.start_time + max(0.0, offset)
+            self.finished = False
+            self._notify()
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            self._notify()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def state(self):
+        with self._lock:
+            current = self.current_time
+            return {
+                "path": self.path,
+                "speed": "max" if self.speed is None else self.speed,
+                "paused": self.paused,
+                "finished": self.finished,
+                "loop": self.loop,
+                "position": self.position,
+                "frames": self.count,
+                "frames_played": self.frames_played,
+                "offset": None if current is None else round(current - self.start_time, 3),
+                "duration": round(self.end_time - self.start_time, 3)
+            }
+
+    # Playback
+
+    def run(self, publish, should_stop=lambda: False):
+        """Play until the end (or forever with ``loop``), a stop or ``should_stop()``.
+
+        ``publish(values, seq, timestamp)`` gets each frame's values as a
+        memoryview, its sequence number and its time on the playback
+        timeline (the original timestamp is ``current_time`` afterwards).
+        """
+        anchor = None  # (monotonic time, recording time) the schedule is based on
+        timeline = None  # Playback time of the last frame published
+        spacing = DEFAULT_FRAME_SPACING
+        while not should_stop():
+            with self._lock:
+                if self._stopping:
+                    break
+                if self._changed:
+                    self._changed = False
+                    self._wake.clear()
+                    anchor = None
+                if self._seek_time is not None:
+                    self.position = self._index_at(self._seek_time)
+                    self._seek_time = None
+                    self.current_time = None
+                if self.position >= self.count:
+                    if not self.loop:
+                        self.finished = True
+                        break
+                    self.position = 0
+                    self.current_time = None
+                    anchor = None
+                paused = self.paused
+                speed = self.speed
+                index = self.position
+            if paused:
+                self._wake.wait()
+                continue
+
+            timestamp, seq, values = self._record(index)
+            previous = self.current_time  # None after a seek or loop
+            if speed is not None:
+                if anchor is None:
+                    # Restart the schedule from the last frame played, so the
+                    # next one keeps its spacing after a resume or speed change
+                    anchor = (time.monotonic(), timestamp if previous is None else previous)
+                if previous is not None and timestamp - previous > self.max_gap:
+                    anchor = (anchor[0], anchor[1] + (timestamp - previous - self.max_gap))
+                delay = anchor[0] + (timestamp - anchor[1]) / speed - time.monotonic()
+                if delay > 0 and self._wake.wait(delay):
+                    continue  # Paused, seeked or re-timed while waiting
+
+            if timeline is None:
+                timeline = time.time()
+            elif previous is None:
+                timeline += spacing
+            else:
+                step = timestamp - previous
+                if step > self.max_gap:
+                    step = self.max_gap
+                elif step > 0:
+                    spacing = step
+                timeline += max(step, 0.0)
+
+            publish(values, seq, timeline)
+            with self._lock:
+                if self._seek_time is None and self.position == index:
+                    self.position = index + 1
+                self.current_time = timestamp
+                self.frames_played += 1
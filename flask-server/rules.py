@@ -0,0 +1,113 @@
+# rules.py
+"""Loading and hot reloading of the classification rules file.
+
+The rules live in classification_rules.json next to this file (or
+SMARTSOCK_RULES); its format is described in classify.py. RuleWatcher
+compiles the file once per change, on its own thread, and hands the new
+RuleSet to ``on_change`` (normally ``classify.set_rules``). Every device
+picks it up on its next frame without a restart. A file that does not
+parse or compile is reported and the rules in use stay in place; without
+a file the built-in rules apply.
+"""
+import json
+import os
+import threading
+import time
+
+from classify import RULES, compile_rules
+
+RULES_PATH = os.environ.get(
+    "SMARTSOCK_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_rules.json")
+)
+DEFAULT_INTERVAL = 1.0
+
+
+def load_rules(path):
+    """The compiled RuleSet of a rules file; raises OSError or ValueError"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}") from None
+    return compile_rules(config, source=path)
+
+
+class RuleWatcher:
+    """Keeps the classification rules in step with the rules file.
+
+    ``on_change(rules)`` is called with every RuleSet that loads, from the
+    thread that noticed the change.
+    """
+
+    def __init__(self, path=RULES_PATH, on_change=None, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.rules = RULES
+        self.error = None  # Why the file last failed to load
+        self.loaded_at = None
+        self.thread = None
+        self.stopping = False
+        self._stamp = None  # (mtime, size) of the file last looked at
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Load the rules now, then watch the file for changes"""
+        self.check()
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, daemon=True, name="rule-watcher")
+            self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self._wake.set()
+
+    def check(self):
+        """Reload the rules if the file changed since the last check"""
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+        return self.reload(stamp is not None)
+
+    def reload(self, exists=True):
+        """Load the file (or the built-in rules without one) and apply it"""
+        if not exists:
+            if self.rules is not RULES:
+                print(f"Classification rules file {self.path} is gone, using the built-in rules")
+            rules = RULES
+        else:
+            try:
+                rules = load_rules(self.path)
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+                print(f"Error loading classification rules from {self.path}: {e}; keeping the current rules")
+                return False
+            print(f"Loaded classification rules from {self.path}: {', '.join(rules.labels())}")
+        self.error = None
+        self.rules = rules
+        self.loaded_at = time.time()
+        if self.on_change:
+            self.on_change(rules)
+        return True
+
+    def summary(self):
+        return dict(self.rules.describe(), path=self.path, loaded_at=self.loaded_at, error=self.error)
+
+    def _run(self):
+        while not self.stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error in rule watcher: {e}")
@@ -0,0 +1,93 @@
+# serial_reader.py
+"""Event-driven bulk reader for a sock's serial port.
+
+Instead of polling ``in_waiting`` and sleeping, ``SerialReader.read()`` blocks
+in the driver until at least one byte arrives, then pulls everything already
+queued in the OS buffer in the same wakeup. Bytes land in a preallocated
+receive buffer and every complete frame is split out of it at once, so a
+backlog is drained in one pass and the reader only ever waits when the line
+is idle.
+"""
+import time
+
+from protocol import FrameDecoder
+
+# Receive buffer size; comfortably larger than any single frame or line
+DEFAULT_CAPACITY = 64 * 1024
+# Bits per byte on the wire (start + 8 data + stop)
+BITS_PER_BYTE = 10
+
+
+class SerialReader:
+    """Reads decoded frames from an open ``serial.Serial`` port.
+
+    ``read()`` returns a list of ``(kind, seq, payload, device_time, rx_time)``
+    tuples.
+    ``rx_time`` is the wall-clock time the last byte of that frame arrived,
+    estimated from the wakeup time and the bytes that followed it at the
+    port's baud rate, so frames delivered in one bulk read still get distinct
+    and accurate timestamps. The estimate never goes back past the previous
+    frame or the previous wakeup: a backlog that queued up while nobody was
+    reading (right after the port opens, say) would otherwise be dated
+    before frames that were already delivered.
+    """
+
+    def __init__(self, ser, decoder=None, capacity=DEFAULT_CAPACITY):
+        self.ser = ser
+        self.decoder = decoder or FrameDecoder()
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.capacity = capacity
+        self.fill = 0
+        self.bytes_read = 0
+        self.wakeups = 0
+        self.last_rx_time = 0.0  # rx_time of the latest frame, or the latest wakeup
+
+    def byte_time(self):
+        """Seconds one byte occupies on the wire at the current baud rate"""
+        return BITS_PER_BYTE / (self.ser.baudrate or 9600)
+
+    def read(self):
+        """Block until data arrives (or the port timeout expires) and decode it."""
+        ser = self.ser
+        fill = self.fill
+        free = self.capacity - fill
+
+        waiting = ser.in_waiting
+        if waiting == 0:
+            # Nothing queued: block in the driver for the first byte
+            n = ser.readinto(self.view[fill:fill + 1])
+            if not n:
+                return []
+            fill += n
+            free -= n
+            waiting = ser.in_waiting
+        if waiting:
+            fill += ser.readinto(self.view[fill:fill + min(waiting, free)])
+        rx_end = time.time()
+
+        self.bytes_read += fill - self.fill
+        self.wakeups += 1
+
+        messages, consumed = self.decoder.scan(self.buffer, 0, fill)
+        byte_time = self.byte_time()
+        floor = self.last_rx_time
+        frames = []
+        for kind, seq, payload, device_time, end_offset in messages:
+            rx_time = rx_end - (fill - end_offset) * byte_time
+            if rx_time < floor:
+                rx_time = floor
+            floor = rx_time
+            frames.append((kind, seq, payload, device_time, rx_time))
+        # Bytes of the next wakeup arrive after this one returned
+        self.last_rx_time = max(floor, rx_end)
+
+        # Keep the partial tail for the next wakeup
+        remaining = fill - consumed
+        if remaining >= self.capacity:
+            # Buffer full of undecodable data; drop it rather than stall
+            remaining = 0
+        elif remaining and consumed:
+            self.buffer[:remaining] = self.buffer[consumed:fill]
+        self.fill = remaining
+        return frames
@@ -1,40 +1,87 @@
 # server.py
-from flask import Flask, jsonify, request, send_from_directory
-from flask_socketio import SocketIO
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
+from flask_socketio import SocketIO, join_room, leave_room
 from flask_cors import CORS
-import threading
+import atexit
+import os
 import time
 import random
-import json
 import serial
-import serial.tools.list_ports
+import async_ingest
+from async_ingest import AsyncIngestEngine
+from handshake import negotiate_baud
+from port_watcher import PortWatcher
+from probe import DEFAULT_PROBE_TIMEOUT, MAX_PROBE_TIMEOUT, MIN_PROBE_TIMEOUT, probe_ports
+from supervisor import IngestSupervisor
+from classify import classify, set_rules
+from devices import DeviceRegistry, DeviceSession, default_device_id
+from frame import EMPTY_SNAPSHOT, NUM_SENSORS, Frame
+from gait import GaitGroup
+from history import DEFAULT_MAX_POINTS
+from recorder import Recorder, list_recordings
+from downsample import MODES as DOWNSAMPLE_MODES
+from export import EXPORT_FORMATS, export_recording
+from replay import REPLAY_PREFIX, ReplayPlayer, parse_speed
+from rules import RuleWatcher
+from store import EVENT_TABLES, SessionStore
+from serial_reader import SerialReader
 
 app = Flask(__name__, static_folder='../client/build', static_url_path='')
 CORS(app) 
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', ping_timeout=10, ping_interval=5)
 
-# Initialize sensor data
-sensor_data = {
-    f"sensor_{i}": 0 for i in range(1, 31)  # 30 sensors total (15 per foot)
-}
+# Every connected sock (serial port or simulated source) has its own session
+# with its own sensor data, classification, status and reader thread
+devices = DeviceRegistry()
+
+simulation_mode = "sequence"  # Default simulation profile
+
+# Serial ingestion mode: "async" multiplexes every port on one asyncio loop,
+# "thread" runs one blocking reader thread per device (the fallback, and the
+# only option on Windows)
+INGEST_MODE = os.environ.get("SMARTSOCK_INGEST", "async" if async_ingest.SUPPORTED else "thread")
+
+# Negotiate a faster baud rate with firmware that supports it (see handshake.py)
+NEGOTIATE_BAUD = os.environ.get("SMARTSOCK_NEGOTIATE_BAUD", "1") != "0"
+
+# Record every device from the moment it connects (see recorder.py); otherwise
+# recordings are started per device through /api/record
+RECORD_ALL = os.environ.get("SMARTSOCK_RECORD", "0") == "1"
+recorder = Recorder(on_change=lambda device_id: recordings_changed())
+
+# Sessions, classification changes and alerts, written in batches (see store.py)
+store = SessionStore()
+
+# Classification rules from classification_rules.json (or SMARTSOCK_RULES),
+# applied again whenever the file changes (see rules.py)
+rule_watcher = RuleWatcher(on_change=set_rules)
+rule_watcher.start()
+
+# Frame formats a client can pick with 'subscribe_frames': "json" sensor_update
+# messages or compact "delta" sensor_frame messages (see codec.py). Each is a
+# Socket.IO room; frame_subscribers holds the sids in the "delta" room so
+# frames are only encoded while someone wants them
+FRAME_CODECS = ("json", "delta")
+frame_subscribers = set()
+
+# Feet walking together, by subject, so double support can be measured
+# across devices (see gait.py). Only devices connected with a "subject"
+# belong to one; any other device is a foot on its own
+gait_groups = {}
 
-# Track connection status (supports both Arduino and Simulation)
-connection_status = {
+# Status reported by the legacy single-device endpoints when nothing is connected
+DISCONNECTED_STATUS = {
     "connected": False,
     "message": "Not connected",
     "port": "",
-    "mode": "none"  # "arduino", "simulation", or "none"
+    "mode": "none",  # "arduino", "simulation", or "none"
+    "device_id": None,
+    "baud_rate": None,
+    "negotiation": None,
+    "line_error_rate": None,
+    "history_bytes": None
 }
 
-# Global variables for threads and connections
-arduino_thread = None
-simulation_thread = None
-ser = None
-stop_arduino = False
-stop_simulation = False
-simulation_mode = "sequence"  # Default simulation profile
-current_classification = "Normal"
-
 # Predefined simulation profiles exposed to the UI
 SIMULATION_PROFILES = {
     "sequence": {
@@ -43,146 +90,240 @@ SIMULATION_PROFILES = {
     }
 }
 
+# Fixed postures of the simulation, as Frame values (index 0 = sensor_1)
+SIMULATION_PATTERNS = {
+    # All sensors at maximum (foot planted)
+    "ground": bytes([100] * NUM_SENSORS),
+    # All sensors off (foot lifted)
+    "air": bytes(NUM_SENSORS),
+    # Heel contact: sensors 16-18 only
+    "heel": bytes(100 if 16 <= i <= 18 else 0 for i in range(1, NUM_SENSORS + 1)),
+    # Toe contact: sensors 21-30 only
+    "toe": bytes(100 if 21 <= i <= 30 else 0 for i in range(1, NUM_SENSORS + 1)),
+}
+
 def classify_sensor_state(values):
     """Classify foot contact state based on sensor values with thresholds.
     
-    Thresholds:
+    ``values`` holds sensor_1..sensor_30 at index 0..29 (a Frame's buffer);
+    a legacy ``{"sensor_N": v}`` dict is accepted too.
+
+    Thresholds (the defaults of classification_rules.json):
     - Values >= 90 are treated as "maximum pressure" (sensor active)
     - Values <= 5 are treated as "zero pressure" (sensor inactive)
     - This handles realistic noisy sensor data from hardware
+
+    The rules in use are compiled to masks over the active/inactive sensor
+    bitsets of the frame (see classify.py).
     """
-    MAX_THRESHOLD = 90
-    MIN_THRESHOLD = 5
-    
-    all_values = [values.get(f"sensor_{i}", 0) for i in range(1, 31)]
+    if isinstance(values, dict):
+        values = Frame.from_dict(values).values
+    return classify(values)
 
-    # Check if all sensors show maximum pressure (foot planted)
-    if all(v >= MAX_THRESHOLD for v in all_values):
-        return "Foot On Ground"
-    
-    # Check if all sensors show zero pressure (foot lifted)
-    if all(v <= MIN_THRESHOLD for v in all_values):
-        return "Foot In Air"
+def get_available_ports():
+    """Get list of available serial ports (from the watcher's cache)"""
+    return list(port_watcher.ports())
 
-    # Check for heel touch: sensors 16-18 active, rest inactive
-    heel_max = all(values.get(f"sensor_{i}", 0) >= MAX_THRESHOLD for i in range(16, 19))
-    heel_rest_zero = all(values.get(f"sensor_{i}", 0) <= MIN_THRESHOLD for i in list(range(1, 16)) + list(range(19, 31)))
-    if heel_max and heel_rest_zero:
-        return "Heel Touch"
+def port_entries(ports):
+    """Serial ports plus the simulation and replay options, as shown in the port dropdown"""
+    entries = list(ports)
+    # Add simulation options (multiple profiles)
+    for key, profile in SIMULATION_PROFILES.items():
+        entries.append({
+            "device": f"Simulated:{key}",
+            "description": profile["description"],
+            "label": profile["label"]
+        })
+    # Every recording on disk can be played back as a device
+    entries.extend(replay_entries())
+    return entries
 
-    # Check for toe touch: sensors 21-30 active, rest inactive
-    toe_max = all(values.get(f"sensor_{i}", 0) >= MAX_THRESHOLD for i in range(21, 31))
-    toe_rest_zero = all(values.get(f"sensor_{i}", 0) <= MIN_THRESHOLD for i in range(1, 21))
-    if toe_max and toe_rest_zero:
-        return "Toe Touch"
+# Replay options, listed from disk when first asked for and again after a
+# recording was opened or closed; "version" counts those changes
+replay_cache = {"entries": None, "version": 0}
 
-    return "Unclassified"
+def recordings_changed():
+    replay_cache["version"] += 1
+    replay_cache["entries"] = None
 
-def get_available_ports():
-    """Get list of available serial ports"""
-    ports = []
-    try:
-        for port in serial.tools.list_ports.comports():
-            ports.append({
-                "device": port.device,
-                "description": port.description
+def replay_entries():
+    """Port list entries of the recordings that can be replayed"""
+    entries = replay_cache["entries"]
+    if entries is None:
+        version = replay_cache["version"]
+        entries = []
+        for recording in list_recordings(recorder.root):
+            if not recording["frames"]:
+                continue
+            name = os.path.relpath(recording["path"], recorder.root).replace(os.sep, "/")
+            entries.append({
+                "device": REPLAY_PREFIX + name,
+                "description": f"{recording['frames']} frames, {recording['end'] - recording['start']:.0f} s",
+                "label": f"Replay - {name}"
             })
-    except Exception as e:
-        print(f"Error listing ports: {e}")
-    return ports
+        if replay_cache["version"] == version:
+            replay_cache["entries"] = entries
+    return entries
+
+def on_ports_changed(ports, added, removed):
+    """Push hotplug changes so the UI never has to poll"""
+    socketio.emit('ports_changed', {
+        "ports": port_entries(ports),
+        "added": added,
+        "removed": removed
+    })
+
+# Scans serial ports in the background and keeps a cached table
+port_watcher = PortWatcher(on_ports_changed)
+
+def emit_status(session):
+    """Broadcast a device's connection status and the device list"""
+    socketio.emit('arduino_status', session.status)
+    socketio.emit('devices_update', [s.summary() for s in devices.sessions()])
+
+def publish_frame(session, timestamp=None):
+    """Classify a device's latest frame, publish it and push it to all clients"""
+    frames = session.frames
+    if timestamp is None:
+        timestamp = time.time()
+    # Stable label: hysteresis and a minimum dwell keep noise from flipping it
+    classification, event = session.classifier.update(frames.back.values, timestamp)
+    previous = frames.latest
+    snapshot = frames.publish(classification, timestamp)
+    if classification != previous.classification or previous.timestamp is None:
+        # Only changes are stored; the first frame records the starting label
+        store.add_classification(session.session_id, session.device_id, snapshot.timestamp, classification)
+    session.history.append(snapshot.values, snapshot.timestamp)
+    gait_event = session.gait.update(snapshot.values, snapshot.timestamp)
+    recorder.record(session.device_id, snapshot)
+    session.stats["frames"] += 1
+
+    # Emit the updated data to all connected clients, in the format each asked for
+    socketio.emit('sensor_update', {
+        "device_id": session.device_id,
+        "sensor_data": snapshot.to_dict(),
+        "timestamp": snapshot.timestamp
+    }, to='json')
+    if frame_subscribers:
+        socketio.emit('sensor_frame', {
+            "device_id": session.device_id,
+            "frame": session.encoder.encode(snapshot.timestamp, snapshot.seq, snapshot.values)
+        }, to='delta')
+
+    # Emit classification for this device on transitions, plus a heartbeat
+    if event is not None:
+        socketio.emit('classification_update', {
+            "device_id": session.device_id,
+            "classification": snapshot.classification
+        })
+
+    # Gait events with the foot's updated rolling metrics
+    if gait_event is not None:
+        socketio.emit('gait_update', dict(
+            session.gait.summary(),
+            device_id=session.device_id,
+            event=gait_event,
+            timestamp=snapshot.timestamp
+        ))
 
-# Function to read serial data from Arduino
-def read_arduino_data(port, baud_rate=9600):
-    global sensor_data, connection_status, ser, stop_arduino, current_classification
+def apply_arduino_message(frame, kind, payload):
+    """Copy one decoded serial message into a device's Frame.
+
+    Returns True if the message carried sensor values.
+    """
+    if kind != "json":
+        # Binary and fast-path JSON frames carry all 30 values in sensor order
+        frame.fill(payload)
+        return True
+    if isinstance(payload, dict):
+        return frame.update(payload)
+    return False
+
+def handle_serial_frame(session, kind, seq, payload, device_time, rx_time):
+    """Shared pipeline for decoded serial frames from either ingestion mode"""
+    result = session.link.update(seq, device_time, rx_time) if kind != "json" else "ok"
+    if session.first_frame is None:
+        # Set after the link update, so the supervisor sees a reset it caused
+        session.first_frame = (rx_time, seq, device_time)
+    if kind != "json":
+        if result in ("duplicate", "reordered"):
+            # Never let an old frame overwrite newer values
+            return
+        if seq is not None:
+            session.last_seq = session.frame.seq = seq
+    if apply_arduino_message(session.frame, kind, payload):
+        publish_frame(session, rx_time)
+
+def set_device_status(session, connected, message):
+    if connected != session.status.get("connected"):
+        store.add_alert(session.session_id, session.device_id, "connected" if connected else "disconnected", message)
+    session.set_status(connected, message)
+    emit_status(session)
+
+ingest_engine = AsyncIngestEngine(handle_serial_frame, set_device_status)
+
+# Function to read serial data from Arduino (thread-per-device mode)
+def read_arduino_data(session, baud_rate=9600, negotiate=False):
+    port = session.port
     
     try:
         # Try to connect to Arduino
-        ser = serial.Serial(port, baud_rate, timeout=1)
-        print(f"Connected to Arduino on {port}")
+        session.ser = serial.Serial(port, baud_rate, timeout=1)
         
-        # Update connection status
-        connection_status = {
-            "connected": True,
-            "message": f"Connected to Arduino on {port}",
-            "port": port,
-            "mode": "arduino"
-        }
-        socketio.emit('arduino_status', connection_status)
+        if negotiate:
+            # Waits for the ready banner, then tries faster rates
+            session.negotiation = negotiate_baud(session.ser)
+        else:
+            time.sleep(2)  # Wait for Arduino to initialize
+        session.baud_rate = session.ser.baudrate
+        print(f"Connected to Arduino on {port} at {session.baud_rate} baud (device {session.device_id})")
         
-        time.sleep(2)  # Wait for Arduino to initialize
+        # Main reading loop when connected. read() blocks in the driver
+        # until bytes arrive and returns every complete frame at once, so
+        # there is no polling delay and a backlog is drained in one pass.
+        reader = SerialReader(session.ser)
+        session.decoder = reader.decoder
         
-        # Main reading loop when connected
-        while not stop_arduino:
+        # Update connection status
+        set_device_status(session, True, f"Connected to Arduino on {port} at {session.baud_rate} baud")
+        
+        while not session.stopping:
             try:
-                if ser.in_waiting > 0:
-                    # Read line from serial port
-                    line = ser.readline().decode('utf-8').strip()
-                    
-                    # Try to parse as JSON
-                    try:
-                        arduino_data = json.loads(line)
-                        
-                        # Update sensor data
-                        for key, value in arduino_data.items():
-                            if key in sensor_data:
-                                sensor_data[key] = value
-                        
-                        # Emit the updated data to all connected clients
-                        socketio.emit('sensor_update', sensor_data)
-
-                        # Update and emit classification from live sensor data
-                        current_classification = classify_sensor_state(sensor_data)
-                        socketio.emit('classification_update', current_classification)
-                    except json.JSONDecodeError:
-                        print(f"Could not parse JSON from Arduino: {line}")
-                
-                time.sleep(0.1)
+                for kind, seq, payload, device_time, rx_time in reader.read():
+                    handle_serial_frame(session, kind, seq, payload, device_time, rx_time)
                 
             except Exception as e:
-                print(f"Error reading from serial port: {e}")
+                if not session.stopping:
+                    print(f"Error reading from serial port {port}: {e}")
                 break
                 
     except serial.SerialException as e:
         # Update connection status to indicate Arduino is not connected
-        connection_status = {
-            "connected": False,
-            "message": f"Arduino connection failed: {str(e)}",
-            "port": port,
-            "mode": "none"
-        }
-        socketio.emit('arduino_status', connection_status)
-        print(f"Failed to connect to Arduino: {e}")
+        set_device_status(session, False, f"Arduino connection failed: {str(e)}")
+        print(f"Failed to connect to Arduino on {port}: {e}")
     
     finally:
         # Clean up
-        if ser and ser.is_open:
-            ser.close()
+        if session.ser and session.ser.is_open:
+            session.ser.close()
         
         # Update status
-        connection_status = {
-            "connected": False,
-            "message": "Arduino disconnected",
-            "port": "",
-            "mode": "none"
-        }
-        socketio.emit('arduino_status', connection_status)
+        set_device_status(session, False, "Arduino disconnected")
 
 # Function to simulate sensor data (mimics Arduino behavior)
-def simulate_sensor_data(mode="sequence"):
+def simulate_sensor_data(session, mode="sequence"):
     """
     Simulates Arduino sensor readings:
     - Reads analog values (0-1023) and maps them to 0-100 pressure scale
     - Uses smoothing similar to Arduino code
     - Supports fixed profiles for quick posture classification
     """
-    global sensor_data, connection_status, stop_simulation, simulation_mode, current_classification
-
-    simulation_mode = mode
+    values = session.frame.values
     
     # Smoothing arrays for each sensor (similar to Arduino code)
-    smoothing_arrays = {f"sensor_{i}": [0] * 5 for i in range(1, 31)}
+    smoothing_arrays = [[0] * 5 for _ in range(NUM_SENSORS)]
     
-    print("Starting sensor data simulation...")
+    print(f"Starting sensor data simulation (device {session.device_id})...")
     update_count = 0
     last_log_time = time.time()
     
@@ -200,7 +341,7 @@ def simulate_sensor_data(mode="sequence"):
     last_switch_time = time.time()
     last_profile = None
 
-    while not stop_simulation:
+    while not session.stopping:
         try:
             active_profile = mode
             if mode == "sequence":
@@ -212,56 +353,28 @@ def simulate_sensor_data(mode="sequence"):
 
             if mode == "sequence" and active_profile != last_profile:
                 # Update status with the currently active sub-profile
-                connection_status = {
-                    "connected": True,
-                    "message": f"{SIMULATION_PROFILES['sequence']['label']} (active: {sequence_labels.get(active_profile, active_profile)})",
-                    "port": "Simulated:sequence",
-                    "mode": "simulation"
-                }
-                socketio.emit('arduino_status', connection_status)
+                set_device_status(session, True, f"{SIMULATION_PROFILES['sequence']['label']} (active: {sequence_labels.get(active_profile, active_profile)})")
                 last_profile = active_profile
 
             if active_profile == "random":
                 # Simulate reading for each sensor with smoothing
-                for i in range(1, 31):
-                    sensor_key = f"sensor_{i}"
+                for i in range(NUM_SENSORS):
                     base_value = random.randint(0, 1023)
-                    smoothing_arr = smoothing_arrays[sensor_key]
+                    smoothing_arr = smoothing_arrays[i]
                     for j in range(4):
                         smoothing_arr[j] = smoothing_arr[j + 1]
                     smoothing_arr[4] = base_value
                     smoothed_value = sum(smoothing_arr) // 5
-                    mapped_value = int((smoothed_value / 1023) * 100)
-                    sensor_data[sensor_key] = mapped_value
-            elif active_profile == "ground":
-                # All sensors at maximum (foot planted)
-                for i in range(1, 31):
-                    sensor_data[f"sensor_{i}"] = 100
-            elif active_profile == "air":
-                # All sensors off (foot lifted)
-                for i in range(1, 31):
-                    sensor_data[f"sensor_{i}"] = 0
-            elif active_profile == "heel":
-                # Heel contact: sensors 1-3 only
-                for i in range(1, 31):
-                    sensor_key = f"sensor_{i}"
-                    sensor_data[sensor_key] = 100 if 16 <= i <= 18 else 0
-            elif active_profile == "toe":
-                # Toe contact: sensors 21-30 only
-                for i in range(1, 31):
-                    sensor_key = f"sensor_{i}"
-                    sensor_data[sensor_key] = 100 if 21 <= i <= 30 else 0
+                    values[i] = int((smoothed_value / 1023) * 100)
+            elif active_profile in SIMULATION_PATTERNS:
+                # Fixed posture: copy the precomputed frame
+                values[:] = SIMULATION_PATTERNS[active_profile]
             else:
                 # Fallback to random to stay resilient
-                for i in range(1, 31):
-                    sensor_data[f"sensor_{i}"] = random.randint(0, 100)
+                for i in range(NUM_SENSORS):
+                    values[i] = random.randint(0, 100)
             
-            # Emit the updated data to all connected clients
-            socketio.emit('sensor_update', sensor_data)
-
-            # Update and emit classification for the current simulated state
-            current_classification = classify_sensor_state(sensor_data)
-            socketio.emit('classification_update', current_classification)
+            publish_frame(session)
             
             # Log update rate every 50 updates (every 5 seconds at 10 Hz)
             update_count += 1
@@ -269,7 +382,7 @@ def simulate_sensor_data(mode="sequence"):
                 current_time = time.time()
                 elapsed = current_time - last_log_time
                 actual_rate = 50 / elapsed
-                print(f"Sensor updates: {update_count} | Rate: {actual_rate:.2f} Hz (target: 10 Hz)")
+                print(f"Sensor updates ({session.device_id}): {update_count} | Rate: {actual_rate:.2f} Hz (target: 10 Hz)")
                 last_log_time = current_time
             
             # Small delay to simulate reading time
@@ -287,31 +400,209 @@ def simulate_sensor_data(mode="sequence"):
             print(f"Error in simulation: {e}")
             break
 
+    set_device_status(session, False, "Simulation stopped")
+
+def register_device(session):
+    """Add a session to the registry, replacing any device with the same id,
+    and open its row in the session store"""
+    replaced = devices.add(session)
+    if replaced:
+        replaced.stop()
+        replaced.gait.leave()
+        replaced.history.clear()
+        store.end_session(replaced.session_id, replaced.stats["frames"])
+    session.session_id = store.open_session(session.device_id, session.port, session.mode)
+    if RECORD_ALL and session.mode != "replay":
+        start_recording(session)
+
+def join_gait_group(session, subject):
+    """Count a device as one of ``subject``'s feet for double support"""
+    group = gait_groups.get(subject)
+    if group is None:
+        group = gait_groups.setdefault(subject, GaitGroup(subject))
+    session.gait.join(group)
+
+def set_gait_subject(device_id, subject):
+    session = devices.get(device_id)
+    if session is not None and subject:
+        join_gait_group(session, str(subject))
+
+def start_recording(session):
+    """Record a device to disk, or keep its running recording; returns the directory"""
+    path = recorder.recording_path(session.device_id) or recorder.start(session.device_id)
+    store.set_recording(session.session_id, path)
+    return path
+
+def start_simulation(device_id, mode_key, message=None):
+    """Register a simulated device and start its simulation thread"""
+    global simulation_mode
+    port = f"Simulated:{mode_key}"
+    session = DeviceSession(device_id, port, "simulation")
+    register_device(session)
+    simulation_mode = mode_key
+    profile_label = SIMULATION_PROFILES.get(mode_key, {}).get("label", "Simulation - Timed Sequence")
+    session.ingest = "thread"
+    set_device_status(session, True, message or f"{profile_label} active")
+    session.start(simulate_sensor_data, mode_key)
+    return session
+
+def recording_dir(name):
+    """Directory of the recording ``<device>/<recording>`` under the recorder's root, or None"""
+    root = os.path.realpath(recorder.root)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep) or not os.path.isdir(path):
+        return None
+    return path
+
+def replay_recording(session):
+    """Thread target: play a recording through the live publish pipeline"""
+    player = session.replay
+
+    def publish(values, seq, timestamp):
+        frame = session.frame
+        frame.fill(values)
+        if seq is not None:
+            session.last_seq = frame.seq = seq
+        publish_frame(session, timestamp)
+
+    try:
+        player.run(publish, lambda: session.stopping)
+    except Exception as e:
+        print(f"Error in replay of {player.path}: {e}")
+    set_device_status(session, False, "Replay finished" if player.finished else "Replay stopped")
+
+def start_replay(device_id, port, path, speed=1.0, loop=False, seek=None):
+    """Register a device that plays back a recording; raises ValueError if it has no frames"""
+    session = DeviceSession(device_id, port, "replay")
+    session.replay = ReplayPlayer(path, speed, loop)
+    if seek:
+        session.replay.seek(seek)
+    register_device(session)
+    session.ingest = "thread"
+    set_device_status(session, True, f"Replaying {port[len(REPLAY_PREFIX):]}")
+    session.start(replay_recording)
+    return session
+
+def connect_serial_device(port, device_id=None, ingest=INGEST_MODE, negotiate=NEGOTIATE_BAUD, wait=True):
+    """Register an Arduino device on ``port`` and start ingesting from it.
+
+    Reconnecting the same device id replaces its previous session. With
+    ``wait`` the call gives the connection a moment to come up.
+    """
+    device_id = device_id or default_device_id(port)
+    session = DeviceSession(device_id, port, "arduino")
+    session.ingest = "async" if ingest == "async" and async_ingest.SUPPORTED else "thread"
+    session.negotiate = negotiate
+    register_device(session)
+
+    started = start_serial_reader(session)
+    if wait:
+        if session.ingest == "async" and not negotiate:
+            try:
+                started.result(timeout=2.0)
+            except Exception as e:
+                print(f"Async connect to {port} did not finish: {e}")
+        elif session.ingest == "thread":
+            # Give it a moment to try connecting
+            time.sleep(0.5)
+    supervisor.start()
+    return device_id
+
+def start_serial_reader(session):
+    """Attach a reader to an Arduino session; also used to reconnect it"""
+    if session.stopping:
+        return None
+    if session.ingest == "async":
+        # Register the port with the shared event loop; negotiation
+        # runs in the background and reports through arduino_status
+        return ingest_engine.add_port(session, negotiate=session.negotiate)
+    # Try to connect to Arduino on a dedicated thread
+    session.start(read_arduino_data, 9600, session.negotiate)
+    return None
+
+def serial_reader_running(session):
+    if session.ingest == "async":
+        return ingest_engine.is_attached(session)
+    return session.is_alive()
+
+def close_serial_reader(session, message):
+    """Drop a stalled connection without stopping the session"""
+    if session.ingest == "async":
+        ingest_engine.remove_port(session, message)
+    elif session.ser and session.ser.is_open:
+        # The blocked read fails and the reader thread exits
+        session.ser.close()
+
+# Restarts serial readers that fail or stall, keeping their sessions
+supervisor = IngestSupervisor(devices, serial_reader_running, start_serial_reader, close_serial_reader, set_device_status)
+
+def stop_device(device_id):
+    """Stop a device's reader and remove it from the registry"""
+    session = devices.remove(device_id)
+    if session is None:
+        return None
+    session.stop()
+    session.gait.leave()
+    recorder.stop(device_id)
+    store.end_session(session.session_id, session.stats["frames"])
+    set_device_status(session, False, "Disconnected")
+    return session
+
+def shutdown():
+    """Close every device's session row and recording, then wait for both
+    writers, so nothing queued is lost when the server exits"""
+    for session in devices.sessions():
+        store.end_session(session.session_id, session.stats["frames"])
+    recorder.stop_all()
+    recorder.flush()
+    if store.thread is not None:
+        store.flush()
+
+def resolve_session(device_id=None):
+    """Look up a device by id, or fall back to the most recent one"""
+    if device_id:
+        return devices.get(device_id)
+    return devices.primary()
+
 @app.route('/api/ports', methods=['GET'])
 def list_ports():
-    """API endpoint to list available serial ports"""
-    ports = get_available_ports()
-    # Add simulation options (multiple profiles)
-    for key, profile in SIMULATION_PROFILES.items():
-        ports.append({
-            "device": f"Simulated:{key}",
-            "description": profile["description"],
-            "label": profile["label"]
-        })
-    return jsonify(ports)
+    """API endpoint to list available serial ports.
+
+    Answers from the port watcher's cache; ?refresh=1 forces a rescan.
+    """
+    if request.args.get('refresh'):
+        port_watcher.refresh()
+    return jsonify(port_entries(get_available_ports()))
 
 @app.route('/api/connect', methods=['POST'])
 def connect_to_port():
-    """API endpoint to connect to Arduino or start simulation"""
-    global arduino_thread, simulation_thread, stop_arduino, stop_simulation, connection_status, simulation_mode
-    
-    data = request.json
+    """API endpoint to connect a device (Arduino port or simulation).
+
+    Body: {"port": "...", "device_id": "...", "subject": "..."}. device_id
+    defaults to a name derived from the port; connecting an id that is
+    already in use replaces that device, other devices keep running. Socks
+    connected with the same subject are the feet of one wearer, whose double
+    support time is measured; without a subject a sock is on its own.
+    """
+    data = request.json or {}
     port = data.get('port', '')
+    requested_id = data.get('device_id')
+    subject = data.get('subject')
     
-    # Disconnect any existing connection first
-    disconnect_from_port()
-    
-    if port.startswith("Simulated") or not port:
+    if port.startswith(REPLAY_PREFIX):
+        path = recording_dir(port[len(REPLAY_PREFIX):])
+        if path is None:
+            return jsonify({"success": False, "message": f"Unknown recording '{port}'"}), 404
+        try:
+            speed = parse_speed(data.get('speed', 1.0))
+            seek = float(data.get('seek') or 0)
+            device_id = requested_id or devices.unique_id(default_device_id(port))
+            start_replay(device_id, port, path, speed, bool(data.get('loop')), seek)
+        except (TypeError, ValueError) as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        set_gait_subject(device_id, subject)
+        return jsonify({"success": True, "message": f"Replay of {port} started", "device_id": device_id})
+    elif port.startswith("Simulated") or not port:
         # Choose simulation profile from port string
         mode_key = "sequence"
         if ":" in port:
@@ -319,81 +610,296 @@ def connect_to_port():
         if mode_key not in SIMULATION_PROFILES:
             mode_key = "sequence"
 
-        stop_simulation = False
-        simulation_thread = threading.Thread(target=simulate_sensor_data, args=(mode_key,), daemon=True)
-        simulation_thread.start()
-        simulation_mode = mode_key
-        profile_label = SIMULATION_PROFILES.get(mode_key, {}).get("label", "Simulation - Timed Sequence")
-        
-        connection_status = {
-            "connected": True,
-            "message": f"{profile_label} active",
-            "port": f"Simulated:{mode_key}",
-            "mode": "simulation"
-        }
-        socketio.emit('arduino_status', connection_status)
+        device_id = requested_id or devices.unique_id(default_device_id(f"Simulated:{mode_key}"))
+        start_simulation(device_id, mode_key)
+        set_gait_subject(device_id, subject)
         
-        return jsonify({"success": True, "message": f"Simulation '{mode_key}' started"})
+        return jsonify({"success": True, "message": f"Simulation '{mode_key}' started", "device_id": device_id})
     else:
-        # Try to connect to Arduino
-        stop_arduino = False
-        arduino_thread = threading.Thread(target=read_arduino_data, args=(port,), daemon=True)
-        arduino_thread.start()
-        
-        # Give it a moment to try connecting
-        time.sleep(0.5)
+        device_id = connect_serial_device(
+            port,
+            requested_id,
+            ingest=data.get('ingest', INGEST_MODE),
+            negotiate=bool(data.get('negotiate', NEGOTIATE_BAUD))
+        )
+        set_gait_subject(device_id, subject)
         
         return jsonify({
             "success": True, 
-            "message": f"Attempting to connect to {port}..."
+            "message": f"Attempting to connect to {port}...",
+            "device_id": device_id
         })
 
+@app.route('/api/probe', methods=['POST'])
+def probe_for_socks():
+    """API endpoint to find socks by probing serial ports in parallel.
+
+    Body (all optional): {"ports": [...], "timeout": 2.5, "connect": false}.
+    The timeout is clamped to MIN_PROBE_TIMEOUT..MAX_PROBE_TIMEOUT seconds.
+    Without "ports", every known port is probed. Ports of registered devices
+    are always skipped, connected or not: one that is negotiating or being
+    reconnected would lose bytes to the probe and be reset by it. With
+    "connect", every port that answered is connected as a new device.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        timeout = float(data.get('timeout', DEFAULT_PROBE_TIMEOUT))
+        if timeout != timeout:  # NaN would pass through the clamp
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "timeout must be a number of seconds"}), 400
+    timeout = min(max(timeout, MIN_PROBE_TIMEOUT), MAX_PROBE_TIMEOUT)
+    in_use = {s.port for s in devices.sessions()}
+    ports = data.get('ports') or [p["device"] for p in get_available_ports()]
+    ports = [port for port in ports if port not in in_use]
+
+    results = probe_ports(ports, timeout=timeout)
+    found = [r for r in results if r["is_sock"]]
+    print(f"Probed {len(results)} ports, found {len(found)} socks")
+
+    if data.get('connect'):
+        for result in found:
+            result["device_id"] = connect_serial_device(result["port"], wait=False)
+
+    socketio.emit('probe_result', results)
+    return jsonify({"success": True, "results": results, "found": [r["port"] for r in found]})
+
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect_from_port():
-    """API endpoint to disconnect from Arduino or stop simulation"""
-    global ser, arduino_thread, simulation_thread, stop_arduino, stop_simulation, connection_status
-    
-    # Stop Arduino connection
-    stop_arduino = True
-    
-    # Close serial connection
-    if ser and ser.is_open:
-        ser.close()
-        ser = None
-    
-    # Wait for Arduino thread to end
-    if arduino_thread and arduino_thread.is_alive():
-        arduino_thread.join(timeout=1.0)
-    
-    # Stop simulation
-    stop_simulation = True
+    """API endpoint to disconnect a device, or every device if no id is given"""
+    data = request.get_json(silent=True) or {}
+    device_id = data.get('device_id')
     
-    # Wait for simulation thread to end
-    if simulation_thread and simulation_thread.is_alive():
-        simulation_thread.join(timeout=1.0)
-    
-    # Update status
-    connection_status = {
-        "connected": False,
-        "message": "Disconnected",
-        "port": "",
-        "mode": "none"
-    }
-    socketio.emit('arduino_status', connection_status)
+    if device_id:
+        if stop_device(device_id) is None:
+            return jsonify({"success": False, "message": f"Unknown device '{device_id}'"}), 404
+        return jsonify({"success": True, "message": f"Disconnected {device_id}", "device_id": device_id})
+
+    for session in devices.sessions():
+        stop_device(session.device_id)
     
     return jsonify({"success": True, "message": "Disconnected"})
 
+@app.route('/api/devices', methods=['GET'])
+def list_devices():
+    """API endpoint to list every registered device"""
+    return jsonify([s.summary() for s in devices.sessions()])
+
+@app.route('/api/devices/<device_id>', methods=['GET'])
+def get_device(device_id):
+    session = devices.get(device_id)
+    if session is None:
+        return jsonify({"error": f"Unknown device '{device_id}'"}), 404
+    return jsonify(session.summary(sensor_data=True))
+
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
+    session = resolve_session(request.args.get('device'))
+    if session is None:
+        return jsonify({
+            "sensor_data": EMPTY_SNAPSHOT.to_dict(),
+            "arduino_status": DISCONNECTED_STATUS,
+            "classification": "Normal",
+            "timestamp": None,
+            "device_id": None
+        })
+    # One snapshot, so values, classification and timestamp always match
+    latest = session.latest
     return jsonify({
-        "sensor_data": sensor_data,
-        "arduino_status": connection_status,
-        "classification": current_classification
+        "sensor_data": latest.to_dict(),
+        "arduino_status": session.refresh_status(),
+        "classification": latest.classification,
+        "timestamp": latest.timestamp,
+        "device_id": session.device_id
     })
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    return jsonify(connection_status)
+    session = resolve_session(request.args.get('device'))
+    return jsonify(session.refresh_status() if session else DISCONNECTED_STATUS)
+
+def optional_float_arg(name):
+    """A numeric query parameter, or None when absent; raises ValueError if malformed"""
+    value = request.args.get(name, '')
+    return float(value) if value else None
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """API endpoint for a device's recent frames, for charts.
+
+    ``?device=&from=&to=&max_points=&mode=``: ``from``/``to`` are Unix
+    timestamps (both optional) and at most ``max_points`` points (default
+    1000) are returned. ``mode`` picks how frames are reduced: "stride"
+    (default, evenly spaced frames), "mean", "minmax" or "lttb".
+    """
+    session = resolve_session(request.args.get('device'))
+    if session is None:
+        return jsonify({"error": "No device connected"}), 404
+    mode = request.args.get('mode', 'stride')
+    if mode not in DOWNSAMPLE_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(DOWNSAMPLE_MODES)}"}), 400
+    try:
+        start = optional_float_arg('from')
+        end = optional_float_arg('to')
+        max_points = int(request.args.get('max_points', DEFAULT_MAX_POINTS))
+    except ValueError:
+        return jsonify({"error": "from, to and max_points must be numbers"}), 400
+    history = session.history
+    result = history.query(start, end, max_points, mode)
+    result.update(device_id=session.device_id, capacity=history.capacity)
+    return jsonify(result)
+
+@app.route('/api/record', methods=['POST'])
+def set_recording():
+    """API endpoint to start or stop recording a device to disk.
+
+    Body: {"device_id": "...", "record": true}. device_id defaults to the
+    most recent device; "record": false stops the recording.
+    """
+    data = request.get_json(silent=True) or {}
+    session = resolve_session(data.get('device_id'))
+    if session is None:
+        return jsonify({"success": False, "message": "No device connected"}), 404
+    if data.get('record', True):
+        path = start_recording(session)
+        return jsonify({"success": True, "recording": True, "device_id": session.device_id, "path": path})
+    path = recorder.stop(session.device_id)
+    return jsonify({"success": True, "recording": False, "device_id": session.device_id, "path": path})
+
+@app.route('/api/recordings', methods=['GET'])
+def get_recordings():
+    """API endpoint to list recordings on disk, and which devices are recording"""
+    return jsonify({"recordings": list_recordings(recorder.root), "active": recorder.active()})
+
+@app.route('/api/export', methods=['GET'])
+def export_data():
+    """API endpoint to download a recording, streamed as it is read.
+
+    ``?recording=<device>/<recording>&format=csv|ndjson|npy&from=&to=``:
+    ``recording`` is the name shown after "Replay:" in /api/ports,
+    ``from``/``to`` are optional Unix timestamps. ``&max_points=&mode=``
+    reduces the frames to about ``max_points`` rows (``mode`` as for
+    /api/history, default "lttb").
+    """
+    name = request.args.get('recording', '')
+    path = recording_dir(name) if name else None
+    if path is None:
+        return jsonify({"error": f"Unknown recording '{name}'"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    mode = request.args.get('mode', 'lttb')
+    if mode not in DOWNSAMPLE_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(DOWNSAMPLE_MODES)}"}), 400
+    try:
+        start = optional_float_arg('from')
+        end = optional_float_arg('to')
+        max_points = int(request.args.get('max_points') or 0)
+    except ValueError:
+        return jsonify({"error": "from, to and max_points must be numbers"}), 400
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = os.path.relpath(path, os.path.realpath(recorder.root)).replace(os.sep, "-") + "." + extension
+    return Response(
+        stream_with_context(export_recording(path, fmt, start, end, max_points, mode)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    """API endpoint to list device sessions, newest first (``?device=&limit=``)"""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    return jsonify(store.list_sessions(request.args.get('device'), limit))
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """API endpoint for one session, with time spent per classification"""
+    session = store.get_session(session_id)
+    if session is None:
+        return jsonify({"error": f"Unknown session '{session_id}'"}), 404
+    return jsonify(session)
+
+@app.route('/api/sessions/<session_id>/events', methods=['GET'])
+def get_session_events(session_id):
+    """API endpoint for a session's classification changes or alerts.
+
+    ``?kind=classification|alert&from=&to=&limit=``
+    """
+    kind = request.args.get('kind', 'classification')
+    if kind not in EVENT_TABLES:
+        return jsonify({"error": f"kind must be one of {', '.join(EVENT_TABLES)}"}), 400
+    try:
+        start = optional_float_arg('from')
+        end = optional_float_arg('to')
+        limit = int(request.args.get('limit', 1000))
+    except ValueError:
+        return jsonify({"error": "from, to and limit must be numbers"}), 400
+    return jsonify(store.events(session_id, kind, start, end, limit))
+
+@app.route('/api/replay', methods=['POST'])
+def control_replay():
+    """API endpoint to control a replay device.
+
+    Body: {"device_id": "...", "speed": 2 | "max", "paused": true, "seek": 30}
+    (all optional). ``seek`` is in seconds from the start of the recording;
+    seeking a finished replay plays it again from there.
+    """
+    data = request.get_json(silent=True) or {}
+    session = resolve_session(data.get('device_id'))
+    if session is None or session.replay is None:
+        return jsonify({"success": False, "message": "No replay device"}), 404
+    player = session.replay
+    try:
+        speed = parse_speed(data['speed']) if 'speed' in data else None
+        seek = float(data['seek']) if data.get('seek') is not None else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    if 'speed' in data:
+        player.set_speed(speed)
+    if 'paused' in data:
+        if data['paused']:
+            player.pause()
+        else:
+            player.resume()
+    if seek is not None:
+        player.seek(seek)
+        if not session.is_alive() and not session.stopping:
+            set_device_status(session, True, f"Replaying {session.port[len(REPLAY_PREFIX):]}")
+            session.start(replay_recording)
+    emit_status(session)
+    return jsonify({"success": True, "device_id": session.device_id, "replay": player.state()})
+
+@app.route('/api/link', methods=['GET'])
+def get_link_stats():
+    """API endpoint for frame loss, duplicates, reordering and jitter per device.
+
+    ``?device=`` limits the result to one device.
+    """
+    device_id = request.args.get('device')
+    if device_id:
+        session = devices.get(device_id)
+        if session is None:
+            return jsonify({"error": f"Unknown device '{device_id}'"}), 404
+        sessions = [session]
+    else:
+        sessions = devices.sessions()
+    return jsonify({
+        s.device_id: dict(s.link.summary(), line_error_rate=s.line_error_rate())
+        for s in sessions
+    })
+
+@app.route('/api/rules', methods=['GET'])
+def get_rules():
+    """API endpoint for the classification rules in use and the rules file's load status"""
+    return jsonify(rule_watcher.summary())
+
+@app.route('/api/gait', methods=['GET'])
+def get_gait():
+    """API endpoint for every device's gait metrics and subject"""
+    return jsonify({s.device_id: s.gait.summary() for s in devices.sessions()})
 
 @app.route('/', methods=['GET'])
 def serve():
@@ -401,40 +907,60 @@ def serve():
 
 @socketio.on('connect')
 def handle_connect():
-    global simulation_thread, stop_simulation, connection_status, simulation_mode, current_classification
     print('Client connected')
-    # Send current sensor data and status to newly connected client
-    socketio.emit('sensor_update', sensor_data, to=request.sid)
-    socketio.emit('arduino_status', connection_status, to=request.sid)
-    socketio.emit('classification_update', current_classification, to=request.sid)
+    join_room('json')
+    # Send current sensor data and status of every device to the new client
+    for session in devices.sessions():
+        latest = session.latest
+        socketio.emit('sensor_update', {
+            "device_id": session.device_id,
+            "sensor_data": latest.to_dict(),
+            "timestamp": latest.timestamp
+        }, to=request.sid)
+        socketio.emit('arduino_status', session.status, to=request.sid)
+        socketio.emit('classification_update', {
+            "device_id": session.device_id,
+            "classification": latest.classification
+        }, to=request.sid)
+    socketio.emit('devices_update', [s.summary() for s in devices.sessions()], to=request.sid)
     
     # Start simulation if nothing is connected
-    if connection_status["mode"] == "none":
-        if not simulation_thread or not simulation_thread.is_alive():
-            stop_simulation = False
-            simulation_thread = threading.Thread(target=simulate_sensor_data, args=(simulation_mode,), daemon=True)
-            simulation_thread.start()
-            
-            connection_status = {
-                "connected": True,
-                "message": f"{SIMULATION_PROFILES.get(simulation_mode, {}).get('label', 'Simulation - Timed Sequence')} (auto-started)",
-                "port": f"Simulated:{simulation_mode}",
-                "mode": "simulation"
-            }
-            socketio.emit('arduino_status', connection_status)
+    if len(devices) == 0:
+        label = SIMULATION_PROFILES.get(simulation_mode, {}).get('label', 'Simulation - Timed Sequence')
+        start_simulation(default_device_id(f"Simulated:{simulation_mode}"), simulation_mode, f"{label} (auto-started)")
+
+@socketio.on('subscribe_frames')
+def handle_subscribe_frames(data):
+    """Choose how this client gets frames: "json" sensor_update messages (the
+    default) or "delta" sensor_frame messages encoded with codec.py"""
+    codec = (data or {}).get('codec', 'json')
+    if codec not in FRAME_CODECS:
+        return {"error": f"Unknown codec '{codec}', expected one of {', '.join(FRAME_CODECS)}"}
+    for room in FRAME_CODECS:
+        leave_room(room)
+    join_room(codec)
+    if codec == 'delta':
+        frame_subscribers.add(request.sid)
+        # The new subscriber can only decode from a keyframe
+        for session in devices.sessions():
+            session.encoder.force_keyframe()
+    else:
+        frame_subscribers.discard(request.sid)
+    return {"codec": codec}
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    frame_subscribers.discard(request.sid)
 
 if __name__ == '__main__':
+    # Watch for serial ports being plugged in or removed; request handlers
+    # only read its cached table
+    port_watcher.start()
+    atexit.register(shutdown)
+
     # Start simulation automatically if no Arduino is connected
-    stop_simulation = False
-    simulation_thread = threading.Thread(target=simulate_sensor_data, args=(simulation_mode,), daemon=True)
-    simulation_thread.start()
-    
-    connection_status = {
-        "connected": True,
-        "message": f"{SIMULATION_PROFILES.get(simulation_mode, {}).get('label', 'Simulation - Timed Sequence')} (auto-started)",
-        "port": f"Simulated:{simulation_mode}",
-        "mode": "simulation"
-    }
+    label = SIMULATION_PROFILES.get(simulation_mode, {}).get('label', 'Simulation - Timed Sequence')
+    start_simulation(default_device_id(f"Simulated:{simulation_mode}"), simulation_mode, f"{label} (auto-started)")
     
     # Use socketio.run instead of app.run
-    socketio.run(app, debug=True, port=5000)
\ No newline at end of file
+    socketio.run(app, debug=True, port=5000)
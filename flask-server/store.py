@@ -0,0 +1,233 @@
+# store.py
+"""SQLite store for sessions and the events derived from them.
+
+Raw frames go to the recorder's segment files; this database holds what is
+worth querying: one row per device session (connect to disconnect), every
+classification change and alerts such as disconnects and stalls.
+
+All writes are queued and applied by one writer thread, which wakes every
+``batch_interval`` seconds and commits everything queued since in a single
+transaction, with one ``executemany`` per run of identical statements. The
+database is in WAL mode, so API requests read from their own connections
+while the writer commits.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+DB_PATH = os.environ.get("SMARTSOCK_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "smartsock.db"))
+BATCH_INTERVAL = 0.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    port TEXT,
+    mode TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    frames INTEGER,
+    recording_path TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_device_time ON sessions (device_id, started_at);
+
+CREATE TABLE IF NOT EXISTS classifications (
+    session_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    time REAL NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS classifications_device_time ON classifications (device_id, time);
+CREATE INDEX IF NOT EXISTS classifications_session_time ON classifications (session_id, time);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    session_id TEXT,
+    device_id TEXT NOT NULL,
+    time REAL NOT NULL,
+    kind TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_device_time ON alerts (device_id, time);
+CREATE INDEX IF NOT EXISTS alerts_session_time ON alerts (session_id, time);
+"""
+
+_INSERT_SESSION = "INSERT INTO sessions (id, device_id, port, mode, started_at) VALUES (?, ?, ?, ?, ?)"
+_END_SESSION = "UPDATE sessions SET ended_at = ?, frames = ? WHERE id = ?"
+_SET_RECORDING = "UPDATE sessions SET recording_path = ? WHERE id = ?"
+_INSERT_CLASSIFICATION = "INSERT INTO classifications (session_id, device_id, time, label) VALUES (?, ?, ?, ?)"
+_INSERT_ALERT = "INSERT INTO alerts (session_id, device_id, time, kind, message) VALUES (?, ?, ?, ?, ?)"
+
+EVENT_TABLES = {"classification": "classifications", "alert": "alerts"}
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL keeps the database consistent across crashes without a sync per commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SessionStore:
+    """Batched writer and query helpers for the session database"""
+
+    def __init__(self, path=DB_PATH, batch_interval=BATCH_INTERVAL):
+        self.path = path
+        self.batch_interval = batch_interval
+        self.thread = None
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _ensure_schema(self):
+        with self._lock:
+            if self._ready:
+                return
+            conn = connect(self.path)
+            try:
+                conn.executescript(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._ready = True
+
+    def start(self):
+        self._ensure_schema()
+        with self._lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True, name="session-store")
+            self.thread.start()
+
+    # Writes: queued, applied by the writer thread
+
+    def _put(self, statement, params):
+        self._queue.put((statement, params))
+
+    def open_session(self, device_id, port, mode, started_at=None):
+        """Register a new device session; returns its id"""
+        self.start()
+        session_id = uuid.uuid4().hex
+        self._put(_INSERT_SESSION, (session_id, device_id, port, mode, started_at or time.time()))
+        return session_id
+
+    def end_session(self, session_id, frames, ended_at=None):
+        self._put(_END_SESSION, (ended_at or time.time(), frames, session_id))
+
+    def set_recording(self, session_id, path):
+        self._put(_SET_RECORDING, (path, session_id))
+
+    def add_classification(self, session_id, device_id, timestamp, label):
+        self._put(_INSERT_CLASSIFICATION, (session_id, device_id, timestamp, label))
+
+    def add_alert(self, session_id, device_id, kind, message, timestamp=None):
+        self._put(_INSERT_ALERT, (session_id, device_id, timestamp or time.time(), kind, message))
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            time.sleep(self.batch_interval)
+            batch = []
+            waiters = []
+            while True:
+                try:
+                    statement, params = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if statement is None:
+                    waiters.append(params)
+                else:
+                    batch.append((statement, params))
+            if batch:
+                self._commit(conn, batch)
+            for done in waiters:
+                done.set()
+
+    def _commit(self, conn, batch):
+        try:
+            with conn:
+                # Consecutive identical statements go out in one executemany
+                start = 0
+                while start < len(batch):
+                    statement = batch[start][0]
+                    end = start + 1
+                    while end < len(batch) and batch[end][0] == statement:
+                        end += 1
+                    conn.executemany(statement, [params for _, params in batch[start:end]])
+                    start = end
+            self.batches += 1
+            self.rows += len(batch)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"Error writing {len(batch)} rows to session store: {e}")
+
+    # Reads: one connection per calling thread
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_schema()
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def list_sessions(self, device_id=None, limit=100):
+        sql = "SELECT * FROM sessions"
+        params = []
+        if device_id:
+            sql += " WHERE device_id = ?"
+            params.append(device_id)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def get_session(self, session_id):
+        """A session with its time spent per classification and alert counts"""
+        conn = self._reader()
+        row = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = dict(row)
+        end = session["ended_at"] or time.time()
+        durations = {}
+        changes = conn.execute(
+            "SELECT time, label FROM classifications WHERE session_id = ? ORDER BY time", (session_id,)
+        ).fetchall()
+        for (start_time, label), following in zip(changes, changes[1:] + [(end, None)]):
+            durations[label] = durations.get(label, 0.0) + max(0.0, following[0] - start_time)
+        session["classification_changes"] = len(changes)
+        session["classification_seconds"] = {label: round(seconds, 3) for label, seconds in durations.items()}
+        session["alerts"] = {
+            kind: count for kind, count in conn.execute(
+                "SELECT kind, COUNT(*) FROM alerts WHERE session_id = ? GROUP BY kind", (session_id,)
+            )
+        }
+        return session
+
+    def events(self, session_id, kind="classification", start=None, end=None, limit=1000):
+        """Classification changes or alerts of a session, oldest first"""
+        table = EVENT_TABLES[kind]
+        sql = f"SELECT * FROM {table} WHERE session_id = ?"
+        params = [session_id]
+        if start is not None:
+            sql += " AND time >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND time <= ?"
+            params.append(end)
+        sql += " ORDER BY time LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._reader().execute(sql, params)]
@@ -0,0 +1,187 @@
+# supervisor.py
+"""Self-healing supervision of serial device readers.
+
+A loose USB cable used to end a recording: the reader hit an exception,
+broke out of its loop and the device stayed down until someone clicked
+Connect again. The supervisor checks every Arduino session a few times per
+second and:
+
+- restarts readers that died (port error, unplug) with exponential backoff
+- treats a connected device that has sent nothing for ``stall_timeout`` as
+  stalled, closes it and reconnects it the same way
+- reuses the same DeviceSession, so sensor data, classification, sequence
+  state and counters carry over the outage
+- counts reconnects, stalls and data gaps (and frames lost across a gap when
+  the device sends sequence numbers and did not reboot meanwhile) in
+  ``session.stats``
+"""
+import random
+import threading
+import time
+
+CHECK_INTERVAL = 0.5
+STALL_TIMEOUT = 5.0
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+BACKOFF_FACTOR = 2.0
+
+
+class Backoff:
+    """Exponential backoff with jitter: 0.5 s, 1 s, 2 s ... capped at ``maximum``"""
+
+    def __init__(self, initial=BACKOFF_INITIAL, maximum=BACKOFF_MAX, factor=BACKOFF_FACTOR):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self):
+        delay = min(self.maximum, self.initial * self.factor ** self.attempts)
+        self.attempts += 1
+        # +/-20% so a rack of devices doesn't retry in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+
+class _Outage:
+    """Bookkeeping for one device while it is down"""
+
+    def __init__(self, session, now):
+        self.backoff = Backoff()
+        self.started = now
+        self.retry_at = now
+        self.last_frame_time = session.last_frame_time
+        self.last_seq = session.last_seq
+        self.last_device_time = session.link.last_device_time
+        self.resets = session.link.resets
+        self.reconnecting = False
+
+
+class IngestSupervisor:
+    """Watches Arduino sessions in a registry and brings failed ones back.
+
+    ``is_running(session)`` tells whether a reader is attached to the
+    session, ``restart(session)`` starts a new reader on it and
+    ``close(session, message)`` tears a stalled reader down. ``on_status``
+    reports progress to clients.
+    """
+
+    def __init__(self, registry, is_running, restart, close, on_status,
+                 stall_timeout=STALL_TIMEOUT, interval=CHECK_INTERVAL):
+        self.registry = registry
+        self.is_running = is_running
+        self.restart = restart
+        self.close = close
+        self.on_status = on_status
+        self.stall_timeout = stall_timeout
+        self.interval = interval
+        self.thread = None
+        self.stopping = False
+        self._outages = {}
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True, name="ingest-supervisor")
+        self.thread.start()
+
+    def stop(self):
+        self.stopping = True
+
+    def _run(self):
+        while not self.stopping:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error in ingest supervisor: {e}")
+            time.sleep(self.interval)
+
+    def check(self, now=None):
+        now = now if now is not None else time.time()
+        sessions = [s for s in self.registry.sessions() if s.mode == "arduino"]
+        live = set()
+        for session in sessions:
+            live.add(id(session))
+            if session.stopping:
+                self._outages.pop(id(session), None)
+                continue
+            outage = self._outages.get(id(session))
+            if outage is None:
+                self._check_healthy(session, now)
+            else:
+                self._check_outage(session, outage, now)
+        # Forget sessions that were disconnected or replaced
+        for key in list(self._outages):
+            if key not in live:
+                del self._outages[key]
+
+    def _check_healthy(self, session, now):
+        if not self.is_running(session):
+            print(f"Device {session.device_id} on {session.port} went down; reconnecting")
+            self._begin_outage(session, now)
+            return
+        if not session.status.get("connected"):
+            # Still opening the port or negotiating
+            return
+        last = max(session.last_frame_time or 0, session.connected_at or 0)
+        if last and now - last > self.stall_timeout:
+            print(f"Device {session.device_id} stalled for {now - last:.1f}s; reconnecting")
+            session.stats["stalls"] += 1
+            self._begin_outage(session, now)
+            self.close(session, "Stalled, reconnecting")
+
+    def _begin_outage(self, session, now):
+        outage = _Outage(session, now)
+        outage.retry_at = now + outage.backoff.next_delay()
+        self._outages[id(session)] = outage
+        self.on_status(session, False, "Connection lost, reconnecting...")
+
+    def _check_outage(self, session, outage, now):
+        if outage.reconnecting and self.is_running(session):
+            if session.first_frame is not None and (session.connected_at or 0) >= outage.started:
+                self._recovered(session, outage)
+                return
+            if not session.status.get("connected"):
+                return
+            if now - (session.connected_at or outage.started) <= self.stall_timeout:
+                return
+            # Reopened but still silent: give up on this attempt
+            self.close(session, "No data after reconnect")
+        if self.is_running(session):
+            return
+        if now < outage.retry_at:
+            return
+        attempt = outage.backoff.attempts
+        delay = outage.backoff.next_delay()
+        outage.retry_at = now + delay
+        outage.reconnecting = True
+        session.stats["reconnect_attempts"] += 1
+        self.on_status(session, False, f"Reconnecting to {session.port} (attempt {attempt + 1})...")
+        try:
+            self.restart(session)
+        except Exception as e:
+            print(f"Reconnect to {session.port} failed: {e}")
+
+    def _recovered(self, session, outage):
+        """Account for the gap between the last frame before and the first after"""
+        stats = session.stats
+        stats["reconnects"] += 1
+        stats["gaps"] += 1
+        first_time, first_seq, first_device_time = session.first_frame
+        if outage.last_frame_time is not None:
+            # Receive times are estimates; the first frame after can be dated
+            # a little before the last one before
+            gap = max(0.0, first_time - outage.last_frame_time)
+            stats["gap_seconds"] = round(stats["gap_seconds"] + gap, 3)
+        # A device that rebooted (as Arduinos do when the port opens) starts
+        # counting again, so sequence numbers say nothing about the gap
+        rebooted = session.link.resets != outage.resets or (
+            first_device_time is not None and outage.last_device_time is not None
+            and first_device_time < outage.last_device_time
+        )
+        if outage.last_seq is not None and first_seq is not None and not rebooted:
+            # Frames the device sent while we weren't listening
+            lost = (first_seq - outage.last_seq - 1) % 65536
+            stats["frames_lost_in_gaps"] += lost
+        del self._outages[id(session)]
+        print(f"Device {session.device_id} recovered after {outage.backoff.attempts} attempt(s)")
@@ -0,0 +1,6 @@
+# conftest.py
+"""Run the tests from anywhere: the server modules import each other as siblings"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,120 @@
+# test_classify.py
+import json
+import random
+
+from classify import (DEFAULT_CONFIG, MAX_THRESHOLD, MIN_THRESHOLD, StableClassifier, classify, classify_batch,
+                      compile_rules)
+from frame import NUM_SENSORS
+
+
+def rules_with(hysteresis):
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    config["thresholds"]["hysteresis"] = hysteresis
+    return compile_rules(config)
+
+
+RULES = rules_with(5)
+NO_HYSTERESIS = rules_with(0)
+
+GROUND = [100] * NUM_SENSORS
+AIR = [0] * NUM_SENSORS
+HEEL = [100 if 16 <= sensor <= 18 else 0 for sensor in range(1, NUM_SENSORS + 1)]
+TOE = [100 if sensor >= 21 else 0 for sensor in range(1, NUM_SENSORS + 1)]
+
+
+def minmax_classify(values):
+    """The min()/max() rules that the region masks replaced"""
+    if min(values) >= MAX_THRESHOLD:
+        return "Foot On Ground"
+    if max(values) <= MIN_THRESHOLD:
+        return "Foot In Air"
+    heel_max = min(values[15:18]) >= MAX_THRESHOLD
+    heel_rest_zero = max(values[:15]) <= MIN_THRESHOLD and max(values[18:]) <= MIN_THRESHOLD
+    if heel_max and heel_rest_zero:
+        return "Heel Touch"
+    toe_max = min(values[20:30]) >= MAX_THRESHOLD
+    toe_rest_zero = max(values[:20]) <= MIN_THRESHOLD
+    if toe_max and toe_rest_zero:
+        return "Toe Touch"
+    return "Unclassified"
+
+
+def make_frames(count, seed=1):
+    """Postures, postures with values right at the thresholds, and noise"""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            # A sensor now and then sits just either side of its threshold
+            values = [(rng.choice((89, 90, 91)) if v else rng.choice((4, 5, 6))) if rng.random() < 0.05 else v
+                      for v in rng.choice((GROUND, AIR, HEEL, TOE))]
+        else:
+            values = [rng.randint(0, 100) for _ in range(NUM_SENSORS)]
+        frames.append(bytes(values))
+    return frames
+
+
+def test_masks_agree_with_minmax_rules():
+    frames = make_frames(5000)
+    expected = [minmax_classify(values) for values in frames]
+    assert len(set(expected)) == 5
+    assert [classify(values, RULES) for values in frames] == expected
+    assert [classify(list(values), RULES) for values in frames] == expected
+    assert classify_batch(b"".join(frames), RULES) == expected
+    assert classify_batch(frames, RULES) == expected
+
+
+def test_batch_of_held_postures():
+    frames = [bytes(values) for values in (GROUND, AIR, HEEL, TOE) for _ in range(50)]
+    labels = classify_batch(b"".join(frames), RULES)
+    assert labels == [label for label in ("Foot On Ground", "Foot In Air", "Heel Touch", "Toe Touch")
+                      for _ in range(50)]
+
+
+def feed(classifier, frames, rate=100.0):
+    return [classifier.update(values, n / rate) for n, values in enumerate(frames)]
+
+
+def test_hysteresis_holds_a_sensor_inside_the_band():
+    standing = bytes([94] * NUM_SENSORS)
+    dipped = bytes([86] + [94] * (NUM_SENSORS - 1))  # Below 90, above 90 - 5
+    frames = [standing] * 10 + [dipped, standing] * 20
+
+    results = feed(StableClassifier(RULES, min_dwell=0), frames)
+    assert {label for label, _ in results} == {"Foot On Ground"}
+
+    results = feed(StableClassifier(NO_HYSTERESIS, min_dwell=0), frames)
+    assert [event for _, event in results].count("transition") == 41
+
+    # Leaving the band does change the label
+    classifier = StableClassifier(RULES, min_dwell=0)
+    feed(classifier, [standing] * 10 + [bytes([84] + [94] * (NUM_SENSORS - 1))])
+    assert classifier.label == "Unclassified"
+
+
+def test_dwell_ignores_short_changes():
+    classifier = StableClassifier(RULES, min_dwell=0.1, heartbeat=60)
+    ground, heel = bytes(GROUND), bytes(HEEL)
+    # 5 frames (0.05 s) of heel touch: too short to report
+    results = feed(classifier, [ground] * 10 + [heel] * 5 + [ground] * 10)
+    assert {label for label, _ in results} == {"Foot On Ground"}
+    assert [event for _, event in results] == ["transition"] + [None] * 24
+    assert classifier.transitions == 1
+
+    # Held for the dwell time, it is reported once
+    classifier = StableClassifier(RULES, min_dwell=0.1, heartbeat=60)
+    results = feed(classifier, [ground] * 10 + [heel] * 20)
+    labels = [label for label, _ in results]
+    events = [event for _, event in results]
+    assert labels.index("Heel Touch") == 20  # 0.1 s after the first heel frame
+    assert events.count("transition") == 2
+    assert events[20] == "transition"
+
+
+def test_heartbeat_and_time_going_back():
+    classifier = StableClassifier(RULES, min_dwell=0, heartbeat=0.5)
+    results = feed(classifier, [bytes(AIR)] * 120)
+    assert [n for n, (_, event) in enumerate(results) if event] == [0, 50, 100]
+    assert classifier.update(bytes(GROUND), 0.0) == ("Foot On Ground", "transition")
+    assert classifier.transitions == 1
@@ -0,0 +1,140 @@
+# test_codec.py
+import random
+
+import pytest
+
+from codec import (HAS_SEQ, KEYFRAME, DeltaDecoder, DeltaEncoder, read_varint, unzigzag, write_varint,
+                   zigzag)
+from frame import NUM_SENSORS
+
+
+def walk(frames, seed=1, start=1700000000.0):
+    """``[(timestamp, seq, values)]`` of slowly changing, jittered frames"""
+    rng = random.Random(seed)
+    values = [50] * NUM_SENSORS
+    result = []
+    for n in range(frames):
+        for index in rng.sample(range(NUM_SENSORS), rng.randint(0, 5)):
+            values[index] = max(0, min(100, values[index] + rng.randint(-8, 8)))
+        result.append((start + n * 0.01 + rng.random() * 0.001, n, bytes(values)))
+    return result
+
+
+def roundtrip(frames, encoder=None):
+    """Encode ``frames`` into one stream and decode it; returns (decoded, tags)"""
+    encoder = encoder or DeltaEncoder()
+    data = bytearray()
+    tags = []
+    for timestamp, seq, values in frames:
+        encoded = encoder.encode(timestamp, seq, values)
+        tags.append(encoded[0])
+        data += encoded
+    decoder = DeltaDecoder()
+    decoded = []
+    pos = 0
+    while pos < len(data):
+        timestamp, seq, values, pos = decoder.decode(data, pos)
+        decoded.append((timestamp, seq, values))
+    return decoded, tags
+
+
+def assert_same(decoded, frames):
+    assert len(decoded) == len(frames)
+    for (timestamp, seq, values), (sent_time, sent_seq, sent_values) in zip(decoded, frames):
+        assert values == sent_values
+        assert seq == sent_seq
+        assert timestamp == pytest.approx(sent_time, abs=1e-6)
+
+
+def test_decode_returns_what_was_encoded():
+    frames = walk(1000)
+    decoded, _ = roundtrip(frames)
+    assert_same(decoded, frames)
+
+
+def test_frames_without_seq():
+    frames = [(timestamp, None, values) for timestamp, _, values in walk(300)]
+    decoded, tags = roundtrip(frames)
+    assert_same(decoded, frames)
+    assert not any(tag & HAS_SEQ for tag in tags)
+
+
+def test_keyframe_every_interval():
+    _, tags = roundtrip(walk(250), DeltaEncoder(keyframe_interval=100))
+    keyframes = [n for n, tag in enumerate(tags) if tag & KEYFRAME]
+    assert keyframes == [0, 100, 200]
+
+    _, tags = roundtrip(walk(250), DeltaEncoder(keyframe_interval=0))
+    assert [n for n, tag in enumerate(tags) if tag & KEYFRAME] == [0]
+
+
+def test_forced_keyframes_stand_alone():
+    frames = walk(50)
+    encoder = DeltaEncoder(keyframe_interval=0)
+    encoded = []
+    for n, (timestamp, seq, values) in enumerate(frames):
+        if n == 30:
+            encoder.force_keyframe()
+        encoded.append(encoder.encode(timestamp, seq, values, keyframe=(n == 10)))
+    assert [n for n, data in enumerate(encoded) if data[0] & KEYFRAME] == [0, 10, 30]
+
+    # A decoder that joins at a keyframe needs nothing before it
+    decoder = DeltaDecoder()
+    decoded = [decoder.decode(data)[:3] for data in encoded[30:]]
+    assert_same(decoded, frames[30:])
+
+
+def test_delta_before_a_keyframe_is_rejected():
+    encoder = DeltaEncoder()
+    encoder.encode(1.0, 0, bytes(NUM_SENSORS))
+    delta = encoder.encode(1.01, 1, bytes(NUM_SENSORS))
+    with pytest.raises(ValueError):
+        DeltaDecoder().decode(delta)
+
+
+def test_largest_value_jumps():
+    low, high = bytes(NUM_SENSORS), bytes([255] * NUM_SENSORS)
+    mixed = bytes(255 if n % 2 else 0 for n in range(NUM_SENSORS))
+    frames = [(1.0 + n * 0.01, n, values) for n, values in enumerate((low, high, low, mixed, high, mixed, low))]
+    decoded, tags = roundtrip(frames)
+    assert_same(decoded, frames)
+    assert [tag & KEYFRAME for tag in tags] == [KEYFRAME] + [0] * 6
+
+
+def test_seq_wrap_and_timestamp_steps_back():
+    values = bytes(range(NUM_SENSORS))
+    frames = [
+        (1000.0, 65534, values),
+        (1000.01, 65535, values),
+        (1000.02, 0, values),  # 16-bit sequence wrap
+        (1000.03, 1, values),
+        (999.5, 2, values),  # Clock stepped back
+        (1000.04, 3, values),
+        (1000.04, 3, values),  # Repeated frame
+    ]
+    decoded, tags = roundtrip(frames)
+    assert_same(decoded, frames)
+    assert not any(tag & KEYFRAME for tag in tags[1:])
+
+
+def test_timestamp_rounding_does_not_accumulate():
+    frames = [(1700000000.0 + n / 3.0, n, bytes(NUM_SENSORS)) for n in range(10000)]
+    decoded, _ = roundtrip(frames, DeltaEncoder(keyframe_interval=0))
+    assert abs(decoded[-1][0] - frames[-1][0]) <= 1e-6
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 63, -64, 64, 255, -255, 2 ** 31, -2 ** 31])
+def test_zigzag_varint_roundtrip(value):
+    out = bytearray()
+    write_varint(out, zigzag(value))
+    decoded, pos = read_varint(bytes(out) + b"\xff", 0)
+    assert unzigzag(decoded) == value
+    assert pos == len(out)
+
+
+def test_zigzag_varint_sizes():
+    assert [zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    for value, size in ((0, 1), (1, 1), (-1, 1), (63, 1), (-64, 1), (64, 2), (255, 2), (-255, 2)):
+        out = bytearray()
+        write_varint(out, zigzag(value))
+        assert len(out) == size, value
@@ -0,0 +1,102 @@
+# test_downsample.py
+import random
+
+import pytest
+
+from downsample import MODES, bucket_bounds, downsample, iter_buckets, lttb, lttb_bounds, plan, reduce_rows
+from frame import NUM_SENSORS, SENSOR_NAMES
+
+
+def series(count, seed=1):
+    rng = random.Random(seed)
+    timestamps = [1000.0 + n * 0.01 for n in range(count)]
+    values = bytes(rng.randint(0, 100) for _ in range(count * NUM_SENSORS))
+    return timestamps, values
+
+
+def assert_covers(bounds, count):
+    assert bounds[0][0] == 0
+    assert bounds[-1][1] == count
+    assert all(lo < hi for lo, hi in bounds)
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+@pytest.mark.parametrize("count,buckets", [(1, 1), (10, 3), (100, 7), (1000, 1000), (5, 50)])
+def test_bucket_bounds(count, buckets):
+    bounds = bucket_bounds(count, buckets)
+    assert_covers(bounds, count)
+    assert len(bounds) == min(count, buckets)
+    sizes = [hi - lo for lo, hi in bounds]
+    assert max(sizes) - min(sizes) <= 1
+
+
+@pytest.mark.parametrize("count,max_points", [(100, 10), (1001, 3), (5000, 999)])
+def test_lttb_bounds_keep_the_ends_on_their_own(count, max_points):
+    bounds = lttb_bounds(count, max_points)
+    assert_covers(bounds, count)
+    assert len(bounds) == max_points
+    assert bounds[0] == (0, 1)
+    assert bounds[-1] == (count - 1, count)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("count,max_points", [(1, 5), (10, 10), (999, 100), (1000, 7), (37, 2)])
+def test_plan_never_exceeds_max_points(mode, count, max_points):
+    bounds = plan(count, max_points, mode)
+    assert_covers(bounds, count)
+    assert len(bounds) <= max_points
+
+
+def test_lttb_keeps_first_last_and_spikes():
+    timestamps = [float(n) for n in range(1000)]
+    rows = [[50] * NUM_SENSORS for _ in timestamps]
+    rows[437][3] = 100  # A single-frame spike
+    values = b"".join(bytes(row) for row in rows)
+    kept = [bucket[0][index] for bucket, index in lttb(iter_buckets(timestamps, values, lttb_bounds(1000, 20)))]
+    assert len(kept) == 20
+    assert kept[0] == 0.0
+    assert kept[-1] == 999.0
+    assert 437.0 in kept
+    assert kept == sorted(kept)
+
+
+def test_minmax_rows_are_two_per_bucket():
+    timestamps, values = series(1000)
+    seqs = list(range(1000))
+    bounds = plan(1000, 25, "minmax")
+    buckets = ((timestamps[lo:hi], values[lo * NUM_SENSORS:hi * NUM_SENSORS], seqs[lo:hi]) for lo, hi in bounds)
+    rows = list(reduce_rows(buckets, "minmax"))
+    assert len(rows) == 2 * len(bounds)
+    for (lo, hi), low, high in zip(bounds, rows[::2], rows[1::2]):
+        block = values[lo * NUM_SENSORS:hi * NUM_SENSORS]
+        assert low[0] == timestamps[lo]
+        assert high[0] == timestamps[hi - 1]
+        assert low[2] == bytes(min(block[i::NUM_SENSORS]) for i in range(NUM_SENSORS))
+        assert high[2] == bytes(max(block[i::NUM_SENSORS]) for i in range(NUM_SENSORS))
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_reduce_rows_matches_downsample(mode):
+    timestamps, values = series(500)
+    seqs = list(range(500))
+    bounds = plan(500, 40, mode)
+    buckets = ((timestamps[lo:hi], values[lo * NUM_SENSORS:hi * NUM_SENSORS], seqs[lo:hi]) for lo, hi in bounds)
+    rows = list(reduce_rows(buckets, mode))
+    result = downsample(timestamps, values, 40, mode)
+    assert len(result["timestamps"]) == len(bounds)
+    assert set(result["values"]) == set(SENSOR_NAMES)
+    if mode == "minmax":
+        assert [row[0] for row in rows[::2]] == result["timestamps"]
+        assert [row[2][0] for row in rows[::2]] == result["min"][SENSOR_NAMES[0]]
+        assert [row[2][0] for row in rows[1::2]] == result["max"][SENSOR_NAMES[0]]
+    else:
+        assert [row[0] for row in rows] == result["timestamps"]
+    if mode in ("stride", "lttb"):
+        assert [row[2][0] for row in rows] == result["values"][SENSOR_NAMES[0]]
+        assert all(row[1] is not None for row in rows)
+
+
+def test_unknown_mode():
+    timestamps, values = series(10)
+    with pytest.raises(ValueError):
+        downsample(timestamps, values, 5, "median")
@@ -0,0 +1,56 @@
+# test_export.py
+import ast
+import struct
+
+import pytest
+
+from downsample import MODES
+from export import NPY_MAGIC, export_recording
+from frame import NUM_SENSORS
+from recorder import CODEC_DELTA, CODEC_RAW, DeviceRecording
+
+ROW = struct.Struct(f"<dI{NUM_SENSORS}s")
+
+
+def make_recording(root, codec, frames=3000):
+    # 10 s segments: three of them, the last one shorter
+    recording = DeviceRecording(str(root), "sock", max_seconds=10, codec=codec)
+    for n in range(frames):
+        recording.append(1000.0 + n * 0.01, n, bytes([(n + i) % 101 for i in range(NUM_SENSORS)]))
+    recording.close()
+    return recording.path
+
+
+def read_npy(data):
+    """``(header dict, header length, rows)`` of an NPY 1.0 file"""
+    assert data[:len(NPY_MAGIC)] == NPY_MAGIC
+    (size,) = struct.unpack_from("<H", data, len(NPY_MAGIC))
+    start = len(NPY_MAGIC) + 2 + size
+    header = ast.literal_eval(data[len(NPY_MAGIC) + 2:start].decode("latin1"))
+    body = data[start:]
+    assert len(body) % ROW.size == 0
+    return header, start, [ROW.unpack_from(body, pos) for pos in range(0, len(body), ROW.size)]
+
+
+@pytest.mark.parametrize("codec", [CODEC_RAW, CODEC_DELTA])
+def test_npy_header_matches_the_rows(tmp_path, codec):
+    path = make_recording(tmp_path, codec)
+    for start, end in ((None, None), (1005.005, 1024.995), (1029.505, None)):
+        header, offset, rows = read_npy(b"".join(export_recording(path, "npy", start, end)))
+        assert offset % 64 == 0
+        assert header["shape"] == (len(rows),)
+        assert header["fortran_order"] is False
+        assert rows[0][0] == pytest.approx(1000.0 if start is None else start + 0.005)
+        if end is not None:
+            assert rows[-1][0] == pytest.approx(end - 0.005)
+        assert [row[1] for row in rows] == list(range(rows[0][1], rows[0][1] + len(rows)))
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("max_points", [2, 3, 101, 500])
+def test_downsampled_npy_shape_is_the_rows_written(tmp_path, mode, max_points):
+    path = make_recording(tmp_path, CODEC_DELTA)
+    header, offset, rows = read_npy(b"".join(export_recording(path, "npy", max_points=max_points, mode=mode)))
+    assert offset % 64 == 0
+    assert header["shape"] == (len(rows),)
+    assert 0 < len(rows) <= max_points
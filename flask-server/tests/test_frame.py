@@ -0,0 +1,22 @@
+# test_frame.py
+from frame import Frame
+
+
+def test_update_skips_values_that_are_not_numbers():
+    frame = Frame(bytes(range(30)))
+    assert frame.update({"sensor_1": "x", "sensor_2": None, "sensor_3": float("nan"),
+                         "sensor_4": float("inf"), "sensor_5": "42", "sensor_6": 7.9})
+    assert list(frame.values[:6]) == [0, 1, 2, 3, 42, 7]
+
+
+def test_update_with_only_bad_values_changes_nothing():
+    frame = Frame(bytes(range(30)))
+    assert not frame.update({"sensor_1": "x", "sensor_2": None, "status": "ready"})
+    assert frame.values == bytearray(range(30))
+
+
+def test_set_rejects_values_that_are_not_numbers():
+    frame = Frame()
+    assert not frame.set("sensor_1", None)
+    assert frame.set("sensor_1", 300)
+    assert frame.get("sensor_1") == 255
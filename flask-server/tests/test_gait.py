@@ -0,0 +1,55 @@
+# test_gait.py
+import json
+
+from classify import DEFAULT_CONFIG, RULES, compile_rules, set_rules
+from gait import GaitGroup, GaitTracker
+
+
+def step(tracker, loaded, start, frames=20, spacing=0.01):
+    """Load the sensors in ``loaded`` for ``frames`` frames, then none; returns the events"""
+    events = []
+    for n in range(frames * 2):
+        values = bytes(90 if n < frames and sensor in loaded else 0 for sensor in range(1, 31))
+        event = tracker.update(values, start + n * spacing)
+        if event:
+            events.append(event)
+    return events
+
+
+def test_regions_follow_reloaded_rules():
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    config["regions"]["heel"] = "1-3"
+    try:
+        tracker = GaitTracker("sock")
+        tracker.update(bytes(30), 0.0)
+        assert step(tracker, {1, 2, 3}, 1.0) == []
+        set_rules(compile_rules(config))
+        assert step(tracker, {1, 2, 3}, 2.0) == ["heel_strike", "toe_off"]
+        assert tracker.contact == "heel"
+    finally:
+        set_rules(RULES)
+
+
+def test_rules_without_gait_regions_use_the_built_in_ones():
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    del config["regions"]["heel"], config["regions"]["toe"]
+    config["classes"] = [{"label": "Foot On Ground", "when": {"active": "foot"}}]
+    tracker = GaitTracker("sock", rules=compile_rules(config))
+    tracker.update(bytes(30), 0.0)
+    assert step(tracker, {16, 17, 18}, 1.0) == ["heel_strike", "toe_off"]
+
+
+def test_double_support_needs_a_shared_group():
+    group = GaitGroup("ann")
+    left, right, alone = GaitTracker("left", group), GaitTracker("right", group), GaitTracker("alone")
+    heel = bytes(90 if 16 <= sensor <= 18 else 0 for sensor in range(1, 31))
+    for tracker in (left, right, alone):
+        tracker.update(bytes(30), 0.0)
+    left.update(heel, 0.2)
+    right.update(heel, 0.3)
+    alone.update(heel, 0.3)
+    left.update(bytes(30), 0.5)
+    assert left.summary()["double_support_time"] == 0.2
+    assert right.summary()["subject"] == "ann"
+    assert alone.summary()["double_support_time"] is None
+    assert alone.summary()["subject"] is None
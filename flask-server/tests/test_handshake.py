@@ -0,0 +1,17 @@
+# test_handshake.py
+import pytest
+
+pytest.importorskip("serial")
+
+from handshake import FIRMWARE_REVERT_SECONDS, SENSOR_LINE_BYTES, ack_timeout  # noqa: E402
+
+
+def test_ack_wait_covers_two_sensor_lines_at_9600():
+    line_time = SENSOR_LINE_BYTES * 10 / 9600
+    assert line_time > 0.4
+    assert ack_timeout(9600) > 2 * line_time
+    assert ack_timeout(9600) >= FIRMWARE_REVERT_SECONDS
+
+
+def test_ack_wait_never_below_firmware_revert_time():
+    assert ack_timeout(1000000) == FIRMWARE_REVERT_SECONDS
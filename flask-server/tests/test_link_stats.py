@@ -0,0 +1,51 @@
+# test_link_stats.py
+from link_stats import SequenceTracker
+
+
+def test_reboot_without_device_time_is_a_reset():
+    tracker = SequenceTracker()
+    for seq in range(5000):
+        tracker.update(seq, None, seq * 0.01)
+    results = [tracker.update(seq, None, 50 + seq * 0.01) for seq in range(3000)]
+    assert results[0] == "reset"
+    assert set(results[1:]) == {"ok"}
+    assert tracker.resets == 1
+    assert tracker.reordered == 0
+    assert tracker.last_seq == 2999
+
+
+def test_late_frames_within_the_window_are_reordered():
+    tracker = SequenceTracker()
+    for seq in (0, 1, 2, 5, 3, 4):
+        tracker.update(seq, None, seq * 0.01)
+    assert tracker.reordered == 2
+    assert tracker.lost == 0
+    assert tracker.resets == 0
+    assert tracker.update(4, None, 0.1) == "duplicate"
+
+
+def test_step_back_after_reconnect_is_a_reset():
+    tracker = SequenceTracker()
+    for seq in range(100):
+        tracker.update(seq, None, seq * 0.01)
+    tracker.reconnected()
+    assert tracker.update(10, None, 5.0) == "reset"
+    assert tracker.update(11, None, 5.01) == "ok"
+    assert tracker.resets == 1
+
+
+def test_reconnect_without_reboot_counts_the_gap():
+    tracker = SequenceTracker()
+    for seq in range(100):
+        tracker.update(seq, None, seq * 0.01)
+    tracker.reconnected()
+    assert tracker.update(150, None, 5.0) == "gap"
+    assert tracker.lost == 50
+
+
+def test_sequence_wraparound_is_not_a_reset():
+    tracker = SequenceTracker()
+    for seq in range(65530, 65536):
+        tracker.update(seq, None, 0.0)
+    assert tracker.update(0, None, 0.0) == "ok"
+    assert tracker.resets == 0
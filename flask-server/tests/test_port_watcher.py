@@ -0,0 +1,42 @@
+# test_port_watcher.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+
+from port_watcher import PortWatcher  # noqa: E402
+
+
+def test_reading_ports_never_waits_for_a_scan():
+    scanning = threading.Event()
+    release = threading.Event()
+    scans = [({"device": "COM1", "description": ""},), ({"device": "COM2", "description": ""},)]
+
+    def slow_scan():
+        result = scans[min(len(scans) - 1, slow_scan.calls)]
+        slow_scan.calls += 1
+        if slow_scan.calls > 1:
+            scanning.set()
+            release.wait(2)
+        return result
+    slow_scan.calls = 0
+
+    changes = []
+    watcher = PortWatcher(lambda ports, added, removed: changes.append(added), interval=0.01, scan=slow_scan)
+    assert watcher.ports()[0]["device"] == "COM1"
+    watcher.start()
+    assert scanning.wait(2)
+
+    started = time.perf_counter()
+    watcher.start()
+    ports = watcher.ports()
+    assert time.perf_counter() - started < 0.1
+    assert ports[0]["device"] == "COM1"
+
+    release.set()
+    watcher.stop()
+    watcher.thread.join(2)
+    assert watcher.ports()[0]["device"] == "COM2"
+    assert changes and changes[0][0]["device"] == "COM2"
@@ -0,0 +1,108 @@
+# test_protocol.py
+import pytest
+
+from protocol import (
+    BINARY_FRAME_SIZE, NUM_SENSORS, SYNC, FrameDecoder, crc16, encode_frame, encode_json_frame, parse_sensor_line
+)
+
+VALUES = list(range(0, 90, 3))
+
+
+def test_binary_v2_round_trip():
+    frame = encode_frame(1234, VALUES, device_time=987654)
+    assert len(frame) == BINARY_FRAME_SIZE == 41
+    assert frame[:2] == SYNC
+    assert FrameDecoder().feed(frame) == [("binary", 1234, bytes(VALUES), 987654)]
+
+
+def test_binary_v1_has_no_device_time():
+    frame = encode_frame(7, VALUES)
+    assert len(frame) == 37
+    assert frame[2] == 1
+    assert FrameDecoder().feed(frame) == [("binary", 7, bytes(VALUES), None)]
+
+
+def test_sequence_and_device_time_wrap():
+    (message,) = FrameDecoder().feed(encode_frame(65536 + 5, VALUES, device_time=(1 << 32) + 9))
+    assert message[1] == 5
+    assert message[3] == 9
+
+
+def test_encode_rejects_wrong_sensor_count():
+    with pytest.raises(ValueError):
+        encode_frame(0, [1] * (NUM_SENSORS - 1))
+
+
+def test_crc_error_is_rejected_and_decoding_resumes():
+    good = encode_frame(1, VALUES, 100)
+    bad = bytearray(encode_frame(2, VALUES, 200))
+    bad[20] ^= 0xFF
+    decoder = FrameDecoder()
+    messages = decoder.feed(bytes(bad) + good)
+    assert [m[1] for m in messages] == [1]
+    assert decoder.crc_errors >= 1
+    assert decoder.frames == 1
+
+
+def test_crc_matches_ccitt_false_check_value():
+    assert crc16(b"123456789") == 0x29B1
+
+
+def test_resync_after_garbage():
+    stream = b"\x00\xff\xaa\x13garbage\xaa" + encode_frame(1, VALUES, 1) + b"\xaa\x55\x02" + encode_frame(2, VALUES, 2)
+    messages = FrameDecoder().feed(stream)
+    assert [m[1] for m in messages] == [1, 2]
+
+
+def test_sync_word_split_across_chunks():
+    stream = encode_frame(1, VALUES, 1) + encode_frame(2, VALUES, 2)
+    decoder = FrameDecoder()
+    messages = []
+    # Split right between 0xAA and 0x55 of the second frame, then byte by byte
+    cut = BINARY_FRAME_SIZE + 1
+    messages += decoder.feed(stream[:cut])
+    for n in range(cut, len(stream)):
+        messages += decoder.feed(stream[n:n + 1])
+    assert [m[1] for m in messages] == [1, 2]
+    assert decoder.crc_errors == 0
+
+
+def test_mixed_json_and_binary_stream():
+    stream = (
+        b'{"status":"ready"}\n'
+        + encode_frame(1, VALUES, 10)
+        + encode_json_frame(VALUES, seq=2, device_time=20)
+        + encode_frame(3, VALUES)
+        + encode_json_frame(VALUES)
+    )
+    decoder = FrameDecoder()
+    messages = decoder.feed(stream[:50]) + decoder.feed(stream[50:])
+    assert messages == [
+        ("json", None, {"status": "ready"}, None),
+        ("binary", 1, bytes(VALUES), 10),
+        ("sensors", 2, bytes(VALUES), 20),
+        ("binary", 3, bytes(VALUES), None),
+        ("sensors", None, bytes(VALUES), None),
+    ]
+    assert decoder.parse_errors == 0
+
+
+def test_line_cut_by_binary_frame_is_dropped():
+    stream = b'{"sensor_1":5,"sen' + encode_frame(1, VALUES, 1) + encode_json_frame(VALUES)
+    decoder = FrameDecoder()
+    messages = decoder.feed(stream)
+    assert [m[0] for m in messages] == ["binary", "sensors"]
+    assert decoder.parse_errors == 1
+
+
+def test_other_json_layouts_fall_back_to_json_loads():
+    line = b'{"sensor_1": 5, "sensor_2": 300}\n'
+    assert FrameDecoder().feed(line) == [("json", None, {"sensor_1": 5, "sensor_2": 300}, None)]
+    assert parse_sensor_line(line.strip(), bytearray(NUM_SENSORS)) is None
+
+
+def test_overlong_line_is_discarded():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"x" * 2000) == []
+    assert decoder.parse_errors == 1
+    assert decoder.feed(encode_json_frame(VALUES))[0][0] == "sensors"
@@ -0,0 +1,42 @@
+# test_recorder.py
+import os
+from collections import namedtuple
+
+from recorder import CODEC_DELTA, INDEX_SUFFIX, DeviceRecording, Recorder, list_recordings
+
+Snapshot = namedtuple("Snapshot", "timestamp seq values")
+
+
+def test_segment_being_written_is_never_scanned(tmp_path):
+    recording = DeviceRecording(str(tmp_path), "sock", max_seconds=10, codec=CODEC_DELTA)
+    for n in range(3000):
+        recording.append(1000.0 + n * 0.01, n, bytes([n % 100] * 30))
+    recording.flush()
+    # Segment 1 (10 s) and 2 are closed, segment 3 is still open
+    assert recording.segments == 3
+
+    (listed,) = list_recordings(str(tmp_path))
+    assert listed["segments"] == 2
+    assert listed["frames"] == 2000
+    names = sorted(os.listdir(recording.path))
+    assert "segment-000003.ssr" in names
+    assert "segment-000003" + INDEX_SUFFIX not in names
+
+    recording.close()
+    (listed,) = list_recordings(str(tmp_path))
+    assert listed["segments"] == 3
+    assert listed["frames"] == 3000
+
+
+def test_stop_all_closes_recordings_by_the_time_flush_returns(tmp_path):
+    recorder = Recorder(str(tmp_path), flush_interval=60, codec="delta")
+    recorder.start("sock")
+    for n in range(100):
+        recorder.record("sock", Snapshot(1000.0 + n * 0.01, n, bytes([n % 100] * 30)))
+    recorder.stop_all()
+    assert recorder.flush()
+
+    assert recorder.active() == {}
+    (listed,) = list_recordings(str(tmp_path))
+    assert listed["segments"] == 1
+    assert listed["frames"] == 100
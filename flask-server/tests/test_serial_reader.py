@@ -0,0 +1,48 @@
+# test_serial_reader.py
+from protocol import encode_frame
+from serial_reader import SerialReader
+
+
+class FakeSerial:
+    """Just enough of serial.Serial: queued bytes handed out by readinto"""
+
+    def __init__(self, baudrate=9600):
+        self.baudrate = baudrate
+        self.queued = bytearray()
+
+    @property
+    def in_waiting(self):
+        return len(self.queued)
+
+    def readinto(self, view):
+        n = min(len(view), len(self.queued))
+        view[:n] = self.queued[:n]
+        del self.queued[:n]
+        return n
+
+
+def test_backlog_is_not_dated_before_earlier_frames():
+    ser = FakeSerial()
+    reader = SerialReader(ser)
+    ser.queued += encode_frame(0, [1] * 30, 0)
+    first = reader.read()
+    # Seconds of frames at 9600 baud queued up before the next wakeup; the
+    # estimate would put most of them long before the first frame
+    for seq in range(1, 200):
+        ser.queued += encode_frame(seq, [seq % 100] * 30, seq * 10)
+    backlog = reader.read()
+
+    times = [frame[4] for frame in first + backlog]
+    assert len(times) == 200
+    assert times == sorted(times)
+    assert min(frame[4] for frame in backlog) >= first[0][4]
+
+
+def test_frames_of_one_read_keep_distinct_times():
+    ser = FakeSerial(baudrate=115200)
+    reader = SerialReader(ser)
+    for seq in range(5):
+        ser.queued += encode_frame(seq, [0] * 30, seq)
+    times = [frame[4] for frame in reader.read()]
+    assert times == sorted(times)
+    assert len(set(times)) == 5
@@ -0,0 +1,36 @@
+# test_supervisor.py
+from devices import DeviceSession
+from supervisor import IngestSupervisor, _Outage
+
+
+def recover(first_frame, last_seq=4999, last_device_time=50000, last_frame_time=100.0, link_frames=()):
+    """Run one outage of a device that sent seq 0..last_seq, then ``link_frames``"""
+    session = DeviceSession("sock", "COM1", "arduino")
+    for seq in range(last_seq + 1):
+        session.link.update(seq, last_device_time - (last_seq - seq) * 10, seq * 0.01)
+    session.last_seq = last_seq
+    outage = _Outage(session, 0.0)
+    outage.last_frame_time = last_frame_time
+    for seq, device_time, rx_time in link_frames:
+        session.link.update(seq, device_time, rx_time)
+    session.first_frame = first_frame
+    supervisor = IngestSupervisor(None, None, None, None, None)
+    supervisor._outages[id(session)] = outage
+    supervisor._recovered(session, outage)
+    return session.stats
+
+
+def test_frames_lost_across_a_gap():
+    stats = recover((102.0, 5009, 50100))
+    assert stats["frames_lost_in_gaps"] == 9
+    assert stats["gap_seconds"] == 2.0
+
+
+def test_reboot_is_not_counted_as_loss():
+    stats = recover((102.0, 0, 5), link_frames=[(0, 5, 102.0)])
+    assert stats["frames_lost_in_gaps"] == 0
+
+
+def test_gap_never_negative():
+    stats = recover((98.8, 5000, 50010))
+    assert stats["gap_seconds"] == 0.0
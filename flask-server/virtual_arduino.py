@@ -0,0 +1,280 @@
+# virtual_arduino.py
+"""Virtual sock on a pseudo-terminal, for load and latency testing.
+
+Creates a pty pair and speaks the same protocol as SensorsWithRandomValues.ino
+on it: the ready banner, JSON or binary sensor frames stamped with a
+sequence number and ``millis()``, and the baud negotiation commands. The server connects to the printed /dev/pts/N path
+through the normal /api/connect flow, so ingestion can be exercised and
+benchmarked on any Linux box without hardware.
+
+Like a real Uno, the device "resets" (re-sends the ready banner and restarts
+its sequence numbers) when a program opens the port, detected here as the
+terminal settings changing while no baud switch is pending. The banner
+follows after a short boot delay, so it isn't lost to the input flush
+pyserial does right after opening.
+
+Usage:
+    python virtual_arduino.py --rate 100 --format binary --count 4
+"""
+import argparse
+import json
+import os
+import random
+import select
+import termios
+import threading
+import time
+import tty
+
+from handshake import FIRMWARE_REVERT_SECONDS, HANDSHAKE_RATES, test_frame_values
+from protocol import NUM_SENSORS, encode_frame
+
+# Stand-in for the bootloader pause after a reset
+BOOT_SECONDS = 0.2
+
+# Base patterns cycled by the "sequence" profile, like the server simulation
+PATTERNS = {
+    "ground": lambda i: 100,
+    "air": lambda i: 0,
+    "heel": lambda i: 100 if 16 <= i <= 18 else 0,
+    "toe": lambda i: 100 if 21 <= i <= 30 else 0,
+}
+
+
+class VirtualArduino:
+    """One emulated sock on its own pty and thread.
+
+    - ``rate``: frames per second (0 = as fast as possible)
+    - ``sensors``: values per frame; binary frames require NUM_SENSORS
+    - ``fmt``: "json" or "binary"
+    - ``noise``: +/- amplitude added to every value
+    - ``profile``: "random" or "sequence" (ground/air/heel/toe, 10 s each)
+    - ``partial_writes``: probability a frame is written in several pieces
+    - ``malformed``: probability a frame is corrupted (truncated JSON or a
+      flipped byte in a binary frame)
+    - ``handshake``: answer baud negotiation commands
+    """
+
+    def __init__(self, rate=10.0, sensors=NUM_SENSORS, fmt="json", noise=5, profile="random",
+                 partial_writes=0.0, malformed=0.0, handshake=True, seed=None):
+        if fmt == "binary" and sensors != NUM_SENSORS:
+            raise ValueError(f"binary frames carry exactly {NUM_SENSORS} sensors")
+        self.rate = rate
+        self.sensors = sensors
+        self.fmt = fmt
+        self.noise = noise
+        self.profile = profile
+        self.partial_writes = partial_writes
+        self.malformed = malformed
+        self.handshake = handshake
+        self.random = random.Random(seed)
+        self.master = None
+        self.slave = None
+        self.port = None
+        self.thread = None
+        self.stopping = False
+        self.seq = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        # seq -> wall-clock send time, for latency measurements
+        self.sent_at = {}
+        self._pending_baud = None
+        self._pending_since = 0.0
+        self._boot_until = 0.0
+        self._booted_at = time.perf_counter()
+        self._commands = b""
+        self._attrs = None
+        self._values = [0] * sensors
+
+    def start(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self._attrs = termios.tcgetattr(self.master)
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"virtual-arduino {self.port}")
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.stopping = True
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master = self.slave = None
+
+    def millis(self):
+        """Milliseconds since the last reset, like the Arduino clock"""
+        return int((time.perf_counter() - self._booted_at) * 1000) & 0xFFFFFFFF
+
+    def _write(self, data):
+        os.write(self.master, data)
+        self.bytes_sent += len(data)
+
+    def _send_json(self, obj):
+        self._write((json.dumps(obj, separators=(",", ":")) + "\r\n").encode("ascii"))
+
+    def _reset(self):
+        """Behave like a board that was just reset by the port opening"""
+        self.seq = 0
+        self._pending_baud = None
+        self._booted_at = time.perf_counter()
+        self._boot_until = self._booted_at + BOOT_SECONDS
+
+    def _run(self):
+        self._reset()
+        interval = 1.0 / self.rate if self.rate else 0.0
+        next_send = time.perf_counter()
+        while not self.stopping:
+            try:
+                if self._boot_until:
+                    self._poll(max(0.0, self._boot_until - time.perf_counter()))
+                    if time.perf_counter() >= self._boot_until:
+                        self._boot_until = 0.0
+                        self._send_json({"status": "ready"})
+                        next_send = time.perf_counter()
+                    continue
+                self._poll(max(0.0, next_send - time.perf_counter()))
+                if self._pending_baud is not None:
+                    # Line stays quiet while a new baud rate is being verified
+                    next_send = time.perf_counter() + interval
+                    continue
+                now = time.perf_counter()
+                if now < next_send:
+                    continue
+                self._send_frame()
+                # Absolute schedule so the rate doesn't drift with write time
+                next_send = max(next_send + interval, now - interval)
+            except OSError:
+                break
+
+    def _poll(self, timeout):
+        """Wait up to ``timeout`` for commands from the host and handle them"""
+        attrs = termios.tcgetattr(self.master)
+        if attrs != self._attrs:
+            self._attrs = attrs
+            if self._pending_baud is None:
+                self._reset()
+        if self._pending_baud is not None and time.time() - self._pending_since > FIRMWARE_REVERT_SECONDS:
+            self._pending_baud = None
+        readable, _, _ = select.select([self.master], [], [], timeout)
+        if not readable:
+            return
+        self._commands += os.read(self.master, 1024)
+        while b"\n" in self._commands:
+            line, self._commands = self._commands.split(b"\n", 1)
+            if self.handshake:
+                self._handle_command(line.strip())
+
+    def _handle_command(self, line):
+        try:
+            command = json.loads(line)
+        except ValueError:
+            return
+        cmd = command.get("cmd")
+        if cmd == "baud":
+            rate = command.get("rate")
+            if rate not in HANDSHAKE_RATES:
+                self._send_json({"status": "baud_nak", "rate": rate})
+                return
+            self._send_json({"status": "baud_ack", "rate": rate})
+            self._pending_baud = rate
+            self._pending_since = time.time()
+        elif cmd == "test":
+            for seq in range(int(command.get("count", 0))):
+                self._write(encode_frame(seq, test_frame_values(seq), self.millis()))
+            self._send_json({"status": "test_done"})
+            self._pending_since = time.time()
+        elif cmd == "commit" and self._pending_baud is not None:
+            self._send_json({"status": "baud_commit", "rate": self._pending_baud})
+            self._pending_baud = None
+            # The host's baud change is not a reset
+            self._attrs = termios.tcgetattr(self.master)
+
+    def _next_values(self):
+        if self.profile == "sequence":
+            names = list(PATTERNS)
+            base = PATTERNS[names[int(time.time() // 10) % len(names)]]
+            targets = [base(i) for i in range(1, self.sensors + 1)]
+        else:
+            # Slowly wandering random pressure, like a smoothed analog read
+            targets = [v + self.random.randint(-10, 10) for v in self._values]
+        noise = self.noise
+        self._values = [
+            max(0, min(100, t + (self.random.randint(-noise, noise) if noise else 0)))
+            for t in targets
+        ]
+        return self._values
+
+    def _send_frame(self):
+        values = self._next_values()
+        seq = self.seq
+        if self.fmt == "binary":
+            data = encode_frame(seq, values, self.millis())
+        else:
+            fields = ",".join(f'"sensor_{i}":{v}' for i, v in enumerate(values, start=1))
+            data = ("{" + fields + f',"seq":{seq},"t":{self.millis()}' + "}\r\n").encode("ascii")
+
+        if self.malformed and self.random.random() < self.malformed:
+            if self.fmt == "binary":
+                # Flip one payload byte so the CRC fails
+                pos = self.random.randrange(5, len(data) - 2)
+                data = data[:pos] + bytes([data[pos] ^ 0xFF]) + data[pos + 1:]
+            else:
+                data = data[:self.random.randrange(1, len(data) - 2)] + b"\r\n"
+
+        self.sent_at[seq] = time.time()
+        if self.partial_writes and self.random.random() < self.partial_writes:
+            # Dribble the frame out in pieces, as a slow UART would
+            cut = sorted(self.random.sample(range(1, len(data)), min(3, len(data) - 1)))
+            for start, end in zip([0] + cut, cut + [len(data)]):
+                self._write(data[start:end])
+                time.sleep(0.0005)
+        else:
+            self._write(data)
+        self.frames_sent += 1
+        self.seq = (seq + 1) % 65536
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate Smart Sock Arduinos on pseudo-terminals")
+    parser.add_argument("--count", type=int, default=1, help="number of virtual socks")
+    parser.add_argument("--rate", type=float, default=10.0, help="frames per second per sock (0 = max)")
+    parser.add_argument("--sensors", type=int, default=NUM_SENSORS, help="sensor values per frame")
+    parser.add_argument("--format", choices=["json", "binary"], default="json", help="wire format")
+    parser.add_argument("--noise", type=int, default=5, help="+/- noise added to each value")
+    parser.add_argument("--profile", choices=["random", "sequence"], default="random", help="pressure pattern")
+    parser.add_argument("--partial-writes", type=float, default=0.0, help="probability of splitting a frame")
+    parser.add_argument("--malformed", type=float, default=0.0, help="probability of corrupting a frame")
+    parser.add_argument("--no-handshake", action="store_true", help="ignore baud negotiation commands")
+    args = parser.parse_args()
+
+    devices = []
+    for _ in range(args.count):
+        device = VirtualArduino(
+            rate=args.rate, sensors=args.sensors, fmt=args.format, noise=args.noise,
+            profile=args.profile, partial_writes=args.partial_writes,
+            malformed=args.malformed, handshake=not args.no_handshake
+        )
+        print(f"Virtual Arduino on {device.start()}")
+        devices.append(device)
+
+    try:
+        while True:
+            time.sleep(5)
+            sent = sum(d.frames_sent for d in devices)
+            print(f"Frames sent: {sent}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for device in devices:
+            device.stop()
+
+
+if __name__ == "__main__":
+    main()